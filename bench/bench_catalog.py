@@ -0,0 +1,87 @@
+# bench/bench_catalog.py
+"""
+Catálogo tipado (src/catalog.py) x DataFrame "como vem do Excel" (object/float64).
+
+Uso:
+  python bench/bench_catalog.py            # 1M produtos
+  python bench/bench_catalog.py 200000
+
+Mostra memória por coluna (deep=True) e o tempo de um casamento de ids típico
+(agenda -> base) com ids inteiros x ids re-stringificados.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.catalog import type_base  # noqa: E402
+
+
+def _synthetic(n: int, seed: int = 7) -> pd.DataFrame:
+    """produtos_base como o read_excel devolve: ids/textos object, preço float64."""
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(10**9, 3 * 10**10, n)
+    cats = np.array([f"Categoria {i} > Sub {i % 7}" for i in range(60)], dtype=object)
+    last = pd.Timestamp("2026-01-01") + pd.to_timedelta(rng.integers(0, 300, n), unit="D")
+    last = pd.Series(last).where(rng.random(n) < 0.7)
+    return pd.DataFrame({
+        "produto_id": ids.astype(str).astype(object),
+        "nome_curto": np.array([f"Produto {i}" for i in range(n)], dtype=object),
+        "link_afiliado": np.array([f"https://s.shopee.com.br/{i:08x}" for i in range(n)], dtype=object),
+        "preco_atual": np.round(rng.uniform(5, 400, n), 2),
+        "avaliacao": np.round(rng.uniform(3.5, 5.0, n), 1),
+        "categoria": cats[rng.integers(0, len(cats), n)],
+        "geracao": np.array(["A", "B", "C"], dtype=object)[rng.integers(0, 3, n)],
+        "ultimo_envio": last.dt.date.astype(object),
+        "status": np.array(["ativo", "pausado"], dtype=object)[(rng.random(n) < 0.05).astype(int)],
+    })
+
+
+def _mb(df: pd.DataFrame) -> pd.Series:
+    return df.memory_usage(deep=True, index=False) / 1e6
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    raw = _synthetic(n)
+
+    t = time.perf_counter()
+    typed = type_base(raw)
+    t_type = time.perf_counter() - t
+
+    before = _mb(raw)
+    after = _mb(typed).rename({"preco_cents": "preco_atual"})
+    table = pd.DataFrame({"antes_MB": before, "depois_MB": after.reindex(before.index)}).round(1)
+    print(f"=== CATÁLOGO ({n} produtos) ===")
+    print(table.to_string())
+    print(f"TOTAL: {before.sum():.1f} MB -> {after.sum():.1f} MB ({before.sum() / after.sum():.1f}x menor)")
+    print(f"type_base: {t_type:.2f}s (uma vez por execução)")
+
+    # casamento agenda -> base: 10k ids procurados na base inteira
+    rng = np.random.default_rng(1)
+    pick = rng.integers(0, n, 10_000)
+    wanted_raw = raw["produto_id"].iloc[pick]
+    wanted_typed = typed["produto_id"].iloc[pick]
+
+    t = time.perf_counter()
+    hit_old = raw["produto_id"].astype(str).str.strip().isin(set(wanted_raw.astype(str).str.strip()))
+    t_old = time.perf_counter() - t
+
+    t = time.perf_counter()
+    hit_new = typed["produto_id"].isin(wanted_typed.dropna())
+    t_new = time.perf_counter() - t
+
+    assert int(hit_old.sum()) == int(hit_new.sum())
+    print(f"isin por id: str {t_old:.3f}s | Int64 {t_new:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
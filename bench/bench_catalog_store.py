@@ -0,0 +1,73 @@
+# bench/bench_catalog_store.py
+"""
+Step3b: preços de 250 picks pelo espelho SQLite (src/catalog_store.py) x o caminho antigo
+(planilha inteira em DataFrame -> centavos -> merge).
+
+Uso:
+  python bench/bench_catalog_store.py                 # catálogos de 10k, 100k e 1M
+  python bench/bench_catalog_store.py 50000 500000
+
+O caminho antigo é medido já com o DataFrame em memória (sem o read_excel, que é a parte
+mais cara), então a diferença real no pipeline é maior que a mostrada.
+"""
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.catalog_store import CatalogStore, price_frame  # noqa: E402
+
+N_PICKS = 250
+
+
+def _synthetic(n: int, seed: int = 7) -> pd.DataFrame:
+    """Planilha do Step0 como o read_excel devolve (ids object, preços float64)."""
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(np.arange(10**9, 10**9 + 40 * n), n, replace=False)
+    return pd.DataFrame({
+        "produto_id": ids.astype(str).astype(object),
+        "preco_atual": np.round(rng.uniform(5, 400, n), 2),
+        "priceMax": np.round(rng.uniform(400, 800, n), 2),
+    })
+
+
+def main() -> None:
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'catálogo':>10} | {'antigo (s)':>10} | {'lookup (s)':>10} | {'espelhar (s)':>12}")
+    for n in sizes:
+        ctrl = _synthetic(n)
+        picks = pd.DataFrame({"itemid": ctrl["produto_id"].sample(N_PICKS, random_state=1).astype("Int64").to_numpy()})
+
+        t0 = time.perf_counter()
+        aux = price_frame(ctrl.copy()).rename(columns={"produto_id": "itemid"})
+        old = picks.merge(aux, on="itemid", how="left")
+        t_old = time.perf_counter() - t0
+
+        with tempfile.TemporaryDirectory() as tmp:
+            xlsx = Path(tmp) / "controle_produtos.xlsx"
+            xlsx.write_bytes(b"")
+            with CatalogStore.for_workbook(xlsx) as store:
+                t0 = time.perf_counter()
+                store.mirror(xlsx, ctrl)
+                t_mirror = time.perf_counter() - t0
+
+                t0 = time.perf_counter()
+                found = store.lookup(picks["itemid"])
+                new = picks.merge(found.rename(columns={"produto_id": "itemid"}), on="itemid", how="left")
+                t_new = time.perf_counter() - t0
+
+        assert new["promo_cents"].equals(old["promo_cents"]) and new["original_cents"].equals(old["original_cents"])
+        print(f"{n:>10,} | {t_old:>10.3f} | {t_new:>10.4f} | {t_mirror:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
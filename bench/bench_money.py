@@ -0,0 +1,202 @@
+# bench/bench_money.py
+"""
+Parser de preço único (src/money.py): matriz de casos + benchmark contra os parsers antigos.
+
+Uso:
+  python bench/bench_money.py            # 1M strings
+  python bench/bench_money.py 200000
+
+A matriz de casos roda antes (e falha com AssertionError se algo mudar). Depois mostra em
+quantos casos cada parser antigo discordava e o tempo de cada um sobre as mesmas strings.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.money import (  # noqa: E402
+    parse_brl_series, format_brl_series, fix_cents_heuristic, parse_brl, format_brl,
+)
+
+NA = None
+
+# (entrada, unidade, centavos esperados)
+CASES = [
+    ("R$ 1.234,56", "brl", 123456),
+    ("R$ 1.234,56", "brl", 123456),
+    ("1234,56", "brl", 123456),
+    ("77,89", "brl", 7789),
+    ("77.89", "brl", 7789),
+    ("29.9", "brl", 2990),
+    ("29,9", "brl", 2990),
+    ("R$ 100", "brl", 10000),
+    ("1.234", "brl", 123400),
+    ("12.345", "brl", 1234500),
+    ("1.234.567", "brl", 123456700),
+    ("1.234.567,89", "brl", 123456789),
+    ("1,234.56", "brl", 123456),
+    ("0,005", "brl", 1),
+    ("1,005", "brl", 101),
+    ("-5,00", "brl", -500),
+    (" 19,90 ", "brl", 1990),
+    ("", "brl", NA),
+    ("abc", "brl", NA),
+    ("R$", "brl", NA),
+    (None, "brl", NA),
+    (np.nan, "brl", NA),
+    (12.5, "brl", 1250),
+    (77.89, "brl", 7789),
+    (1.234, "brl", 123),
+    (7789, "brl", 778900),
+    (7789, "cents", 7789),
+    ("7789", "cents", 7789),
+    (7789000, "micro", 7789),
+    ("7789000", "micro", 7789),
+    (1500, "micro", 2),
+]
+
+FORMAT_CASES = [
+    (123456, "1.234,56"),
+    (5, "0,05"),
+    (100, "1,00"),
+    (99999, "999,99"),
+    (100000000, "1.000.000,00"),
+    (-100, "-1,00"),
+    (NA, ""),
+]
+
+
+# ---- parsers antigos (como estavam em cada step) ----
+def _old_step2(s: pd.Series) -> pd.Series:
+    txt = s.astype(str).fillna("").str.strip()
+    txt = txt.str.replace("R$", "", regex=False).str.replace("r$", "", regex=False)
+    txt = txt.str.replace(" ", " ", regex=False).str.replace(" ", "", regex=False)
+    txt = txt.str.replace(r"[^0-9,.\-]", "", regex=True)
+    has_comma = txt.str.contains(",", regex=False)
+    txt = txt.where(~has_comma, txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(txt, errors="coerce")
+
+
+def _old_step3b(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(
+        s.astype(str).str.replace("R$", "", regex=False).str.replace(" ", "", regex=False)
+        .str.replace(".", "", regex=False).str.replace(",", ".", regex=False).str.strip(),
+        errors="coerce",
+    )
+
+
+def _old_scheduler(x):
+    if x is None:
+        return None
+    if isinstance(x, (int, float)) and not (isinstance(x, float) and pd.isna(x)):
+        return float(x)
+    s = str(x).strip()
+    if not s or s.lower() == "nan":
+        return None
+    s = s.replace("R$", "").replace(" ", "")
+    if "," in s:
+        s = s.replace(".", "").replace(",", ".")
+    try:
+        return float(s)
+    except Exception:
+        return None
+
+
+def _old_step0(x):
+    if pd.isna(x):
+        return None
+    try:
+        return float(str(x).replace("R$", "").strip().replace(",", "."))
+    except Exception:
+        return None
+
+
+def check_cases() -> None:
+    for value, unit, expected in CASES:
+        got = parse_brl(value, unit)
+        assert got == expected, f"parse_brl({value!r}, {unit}) = {got}, esperado {expected}"
+
+    # vetorizado == escalar, por unidade
+    for unit in ("brl", "cents", "micro"):
+        vals = [v for v, u, _ in CASES if u == unit]
+        exp = [e for _, u, e in CASES if u == unit]
+        got = parse_brl_series(pd.Series(vals, dtype=object), unit).tolist()
+        assert [None if pd.isna(g) else g for g in got] == exp, f"série ({unit}) divergiu: {got}"
+
+    # coluna numérica e coluna de texto do pandas
+    assert parse_brl_series(pd.Series([12.5, np.nan])).tolist()[0] == 1250
+    assert parse_brl_series(pd.Series(["1.234,56", None], dtype="string")).tolist()[0] == 123456
+
+    for cents, expected in FORMAT_CASES:
+        assert format_brl(cents) == expected, f"format_brl({cents}) = {format_brl(cents)!r}"
+    got = format_brl_series(pd.Series([c for c, _ in FORMAT_CASES], dtype="Int64")).tolist()
+    assert got == [e for _, e in FORMAT_CASES], got
+    assert format_brl(123456, thousands=False) == "1234,56"
+
+    fixed = fix_cents_heuristic(pd.Series([778900, 499999, 500000, None], dtype="Int64")).tolist()
+    assert fixed[:3] == [7789, 499999, 5000] and pd.isna(fixed[3]), fixed
+    print(f"OK: {len(CASES)} casos de parse + {len(FORMAT_CASES)} de formatação.")
+
+
+def _make_strings(n: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    cents = rng.integers(100, 500_000, n)
+    reais = cents // 100
+    cc = cents % 100
+    br = pd.Series([f"{r:,}".replace(",", ".") for r in reais]) + "," + pd.Series(cc).astype(str).str.zfill(2)
+    plain = pd.Series(reais).astype(str) + "." + pd.Series(cc).astype(str).str.zfill(2)
+    kind = rng.integers(0, 3, n)
+    s = np.where(kind == 0, "R$ " + br, np.where(kind == 1, br, plain))
+    return pd.Series(s, dtype=object), pd.Series(cents)
+
+
+def _t(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def bench(n: int) -> None:
+    s, cents = _make_strings(n)
+    print(f"=== BENCH preços ({n} strings: 'R$ 1.234,56' / '1.234,56' / '1234.56') ===")
+
+    new, t_new = _t(lambda: parse_brl_series(s))
+    assert (new.to_numpy(dtype="int64") == cents.to_numpy()).all()
+
+    def agree(reais) -> float:
+        r = pd.to_numeric(pd.Series(reais), errors="coerce").to_numpy(dtype="float64")
+        return float(np.mean(np.round(r * 100) == cents.to_numpy()) * 100.0)
+
+    olds = [
+        ("step2 _parse_brl_money_series", lambda: _old_step2(s)),
+        ("step3b _to_float_series", lambda: _old_step3b(s)),
+        ("scheduler _to_float (linha)", lambda: s.map(_old_scheduler)),
+        ("step0 to_float (linha)", lambda: s.map(_old_step0)),
+    ]
+    print(f"{'src/money parse_brl_series':32s} {t_new:6.3f}s | corretos=100.0%")
+    for name, fn in olds:
+        out, t = _t(fn)
+        print(f"{name:32s} {t:6.3f}s | corretos={agree(out):5.1f}%")
+
+    txt, t_fmt = _t(lambda: format_brl_series(new))
+    old_fmt, t_old_fmt = _t(lambda: (new.astype("float64") / 100).map(lambda f: f"{f:.2f}".replace(".", ",")))
+    print(f"format_brl_series: {t_fmt:.3f}s | f-string por linha: {t_old_fmt:.3f}s")
+    assert txt.iloc[0] == format_brl(int(new.iloc[0]))
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    check_cases()
+    bench(n)
+
+
+if __name__ == "__main__":
+    main()
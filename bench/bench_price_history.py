@@ -0,0 +1,62 @@
+# bench/bench_price_history.py
+"""
+Histórico de preços (src/price_history.py): gravação diária e estatísticas de 30 dias.
+
+Uso:
+  python bench/bench_price_history.py                 # 100k itens, 60 dias, 5k picks
+  python bench/bench_price_history.py 200000 90 10000
+
+Simula uma busca por dia em que ~5% dos itens mudam de preço e mostra o tamanho da
+tabela (trechos, não observações) e o tempo de stats() + trusted_discount() para os picks.
+"""
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.price_history import PriceHistory, trusted_discount  # noqa: E402
+
+
+def main() -> None:
+    args = [int(a) for a in sys.argv[1:]]
+    n_items = args[0] if len(args) > 0 else 100_000
+    n_days = args[1] if len(args) > 1 else 60
+    n_picks = args[2] if len(args) > 2 else 5_000
+
+    rng = np.random.default_rng(7)
+    ids = rng.choice(np.arange(10**9, 10**9 + 40 * n_items), n_items, replace=False)
+    cents = rng.integers(500, 40_000, n_items)
+    day0 = pd.Timestamp.now().normalize() - pd.Timedelta(days=n_days)
+
+    with tempfile.TemporaryDirectory() as tmp, PriceHistory(Path(tmp) / "h.sqlite") as history:
+        t0 = time.perf_counter()
+        for d in range(n_days):
+            change = rng.random(n_items) < 0.05
+            cents = np.where(change, (cents * rng.uniform(0.7, 1.3, n_items)).astype(np.int64), cents)
+            history.record(ids, cents, day0 + pd.Timedelta(days=d))
+        t_rec = (time.perf_counter() - t0) / n_days
+        size_mb = (Path(tmp) / "h.sqlite").stat().st_size / 1e6
+
+        picks = pd.Series(rng.choice(ids, n_picks, replace=False))
+        sale = pd.Series(rng.integers(500, 40_000, n_picks))
+        t0 = time.perf_counter()
+        stats = history.stats(picks)
+        trusted = trusted_discount(sale, pd.Series(pd.NA, index=sale.index, dtype="Int64"), stats, picks)
+        t_stats = time.perf_counter() - t0
+
+        print(f"itens={n_items:,} | dias={n_days} | observações={n_items * n_days:,} | trechos={len(history):,}")
+        print(f"gravação: {t_rec:.2f}s por busca | arquivo: {size_mb:.1f} MB")
+        print(f"stats+desconto de {n_picks:,} picks: {t_stats:.3f}s | com histórico: {(trusted['discount_source'] == 'historico').sum():,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# bench/bench_senders.py
+"""
+Envio headless contra a página falsa do WhatsApp (tools/fake_whatsapp_server.py):
+envios por minuto, confiabilidade do paste da imagem e fidelidade da legenda, com o
+NullSender como linha de base (custo de tudo que não é o browser).
+
+Uso:
+  python bench/bench_senders.py                 # 30 envios, paste sempre aceito
+  python bench/bench_senders.py 100 0.05        # 100 envios, 5% dos pastes ignorados
+
+Precisa de playwright + chromium (playwright install chromium) e Pillow; roda no Linux:
+a imagem entra por evento de paste sintético (JPEG), sem clipboard do SO.
+Legendas com várias linhas, acentos e emoji (inclusive fora do BMP) para pegar perda de
+caractere ou de quebra de linha no composer.
+"""
+from __future__ import annotations
+
+import io
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.senders import PASTE_EVENT, NullSender, PlaywrightSender  # noqa: E402
+from src.whatsapp_web import PhaseTimeout, _text_key  # noqa: E402
+from tools.fake_whatsapp_server import serve  # noqa: E402
+
+GROUP = "Ofertas Shopee"
+PORT = 8791
+
+
+def _captions(n: int, seed: int = 3):
+    rng = random.Random(seed)
+    titles = ["Fone Bluetooth TWS", "Panela de Pressão 4,5L", "Kit 3 Camisetas Algodão",
+              "Luminária LED Articulável", "Tênis Esportivo Confortável", "Garrafa Térmica 1L Aço Inox"]
+    out = []
+    for i in range(n):
+        price = rng.randint(19, 399)
+        lines = [
+            f"🔥 {rng.choice(titles)} #{i}",
+            "",
+            f"💰 De R$ {price + rng.randint(10, 80)},90 por R$ {price},90 ({rng.randint(10, 60)}% OFF)",
+            "⭐ 4,8 | frete grátis 🚚",
+            "👀 Olha o preço!",
+            f"https://s.shopee.com.br/bench{i:04d}",
+        ]
+        out.append("\n".join(lines))
+    return out
+
+
+def _jpegs(n: int, seed: int = 5):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        img = Image.new("RGB", (800, 800), tuple(rng.randint(0, 255) for _ in range(3)))
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=85)
+        out.append(buf.getvalue())
+    return out
+
+
+def _run(sender, captions, images):
+    ok, media_fail, other_fail = 0, 0, 0
+    phases = {}
+    t0 = time.perf_counter()
+    for i, (cap, img) in enumerate(zip(captions, images)):
+        try:
+            timer = sender.send(cap, img, itemid=f"bench{i:04d}")
+        except PhaseTimeout as e:
+            if e.phase == "midia":
+                media_fail += 1
+            else:
+                other_fail += 1
+            continue
+        ok += 1
+        for k, v in timer.phases.items():
+            phases.setdefault(k, []).append(v)
+    elapsed = time.perf_counter() - t0
+    return ok, media_fail, other_fail, elapsed, phases
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    paste_fail = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    captions, images = _captions(n), _jpegs(n)
+
+    null = NullSender()
+    null.open(GROUP)
+    ok, _, _, elapsed, _ = _run(null, captions, images)
+    print(f"null:       {ok} envios em {elapsed * 1000:.1f} ms")
+
+    server, state = serve(port=PORT, groups=f"{GROUP},Outro grupo", tick_ms=100, paste_fail=paste_fail)
+    sender = PlaywrightSender(
+        url=f"http://127.0.0.1:{PORT}/", headless=True, paste=PASTE_EVENT, media_timeout_ms=2000,
+    )
+    try:
+        t_open = time.perf_counter()
+        sender.open(GROUP)
+        t_open = time.perf_counter() - t_open
+        ok, media_fail, other_fail, elapsed, phases = _run(sender, captions, images)
+        sent = sender.page.evaluate("() => window.__sent")
+        stats = sender.page.evaluate("() => window.__stats")
+    finally:
+        sender.close()
+        server.shutdown()
+
+    expected = {f"https://s.shopee.com.br/bench{i:04d}": c for i, c in enumerate(captions)}
+    exact = same_key = 0
+    for rec in sent:
+        cap = rec["caption"]
+        want = next((c for url, c in expected.items() if url in cap), None)
+        if want is None:
+            continue
+        exact += cap == want.strip()
+        same_key += _text_key(cap) == _text_key(want)
+
+    print(f"playwright: abrir grupo {t_open:.2f}s | {ok}/{n} envios em {elapsed:.1f}s "
+          f"= {ok / elapsed * 60:.1f} envios/min")
+    print(f"paste:      {stats['pastes'] - stats['pastes_dropped']}/{stats['pastes']} aceitos "
+          f"(paste_fail={paste_fail}) | timeouts: midia={media_fail} outros={other_fail}")
+    print(f"legenda:    idêntica {exact}/{len(sent)} | mesmas letras/dígitos {same_key}/{len(sent)}")
+    for k, v in phases.items():
+        print(f"  {k:<8} p50={statistics.median(v):.0f}ms max={max(v):.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# bench/bench_step2_scoring.py
+"""
+Benchmark: scores do Step2 por linha (Series.apply) vs engine vetorizada (src/scoring.py).
+
+Uso:
+  python bench/bench_step2_scoring.py            # 200k linhas
+  python bench/bench_step2_scoring.py 1000000    # 1M linhas
+
+Antes de medir, confere que as duas versões dão resultados idênticos.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.keyword_matcher import KeywordMatcher  # noqa: E402
+from src.scoring import price_impulse_scores, trust_scores, decision_scores  # noqa: E402
+
+PRICE_MIN, PRICE_MAX = 20.0, 250.0
+IDEAL_PRICE_LOW, IDEAL_PRICE_HIGH = 30.0, 120.0
+
+EASY_WORDS = [
+    "kit", "combo", "3 em 1", "2 em 1", "pronto", "recarregável", "universal",
+    "original", "oficial", "premium", "rápido", "turbo", "sem fio", "portable", "portátil",
+]
+HARD_WORDS = [
+    "compatível", "modelo", "versão", "instalação", "adaptador específico",
+    "refil", "reposicao", "reposição", "sem garantia", "genérico", "réplica",
+]
+
+# vocabulário "neutro" grande: títulos realistas têm poucas palavras-chave
+NEUTRAL = [f"termo{i}" for i in range(3000)] + [
+    "fone", "bluetooth", "tws", "i12", "branco", "preto", "capinha", "celular",
+    "garrafa", "térmica", "luminária", "led", "mochila", "organizador", "suporte",
+]
+
+
+# ---- referência: implementação por linha (como era no Step2) ----
+def _clamp(x: float, lo: float, hi: float) -> float:
+    return max(lo, min(hi, x))
+
+
+def _price_impulse_score(price: float) -> float:
+    if pd.isna(price):
+        return 0.0
+    if price < PRICE_MIN or price > PRICE_MAX:
+        return 0.0
+    if IDEAL_PRICE_LOW <= price <= IDEAL_PRICE_HIGH:
+        return 1.0
+    if price < IDEAL_PRICE_LOW:
+        return _clamp((price - PRICE_MIN) / max(1.0, (IDEAL_PRICE_LOW - PRICE_MIN)), 0.0, 1.0)
+    return _clamp((PRICE_MAX - price) / max(1.0, (PRICE_MAX - IDEAL_PRICE_HIGH)), 0.0, 1.0)
+
+
+def _trust_score(rating: float) -> float:
+    if pd.isna(rating):
+        return 0.35
+    return _clamp((float(rating) - 4.0) / 1.0, 0.0, 1.0)
+
+
+def _decision_score(title: str) -> float:
+    t = (title or "").lower()
+    bonus = sum(1 for w in EASY_WORDS if w in t)
+    malus = sum(1 for w in HARD_WORDS if w in t)
+    return _clamp(0.55 + 0.10 * bonus - 0.15 * malus, 0.0, 1.0)
+
+
+def _synthetic(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    price = np.round(rng.uniform(0, 400, n), 2)
+    price[rng.random(n) < 0.05] = np.nan
+    rating = np.round(rng.uniform(3.0, 5.0, n), 1)
+    rating[rng.random(n) < 0.3] = np.nan
+    words = rng.choice(np.array(NEUTRAL, dtype=object), size=(n, 10))
+    kw = np.array(EASY_WORDS + HARD_WORDS, dtype=object)
+    with_kw = rng.random(n) < 0.3
+    words[with_kw, rng.integers(0, 10, with_kw.sum())] = rng.choice(kw, with_kw.sum())
+    titles = [" ".join(w).title() for w in words]
+    return pd.DataFrame({"sale_price": price, "rating": rating, "title": titles})
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    df = _synthetic(n)
+    print(f"=== BENCH Step2 scoring ({n} linhas) ===")
+
+    matcher = KeywordMatcher.from_config(PROJECT_ROOT / "config" / "step2_keywords.json")
+    timings = {}
+
+    def _timed(name, fn):
+        t0 = time.perf_counter()
+        out = np.asarray(fn(), dtype="float64")
+        timings[name] = time.perf_counter() - t0
+        return out
+
+    ref = {
+        "price": _timed("apply/price", lambda: df["sale_price"].apply(_price_impulse_score)),
+        "trust": _timed("apply/trust", lambda: df["rating"].apply(_trust_score)),
+        "decision": _timed("apply/decision", lambda: df["title"].apply(_decision_score)),
+    }
+    vec = {
+        "price": _timed("vec/price", lambda: price_impulse_scores(
+            df["sale_price"], PRICE_MIN, PRICE_MAX, IDEAL_PRICE_LOW, IDEAL_PRICE_HIGH
+        )),
+        "trust": _timed("vec/trust", lambda: trust_scores(df["rating"])),
+        "decision": _timed("vec/decision", lambda: decision_scores(df["title"], matcher)),
+    }
+
+    for name in ref:
+        if not np.array_equal(ref[name], vec[name]):
+            raise SystemExit(f"DIVERGÊNCIA em {name}_score")
+    print("OK: resultados idênticos (price/trust/decision).")
+
+    for name in ref:
+        a, v = timings[f"apply/{name}"], timings[f"vec/{name}"]
+        print(f"{name:<9} apply={a:.3f}s | vetorizado={v:.3f}s | speedup={a / max(v, 1e-9):.1f}x")
+    t_ref = sum(v for k, v in timings.items() if k.startswith("apply/"))
+    t_vec = sum(v for k, v in timings.items() if k.startswith("vec/"))
+    print(f"{'total':<9} apply={t_ref:.3f}s | vetorizado={t_vec:.3f}s | speedup={t_ref / max(t_vec, 1e-9):.1f}x")
+
+    _bench_many_terms(df["title"])
+
+
+def _bench_many_terms(titles: pd.Series, n_terms: int = 400) -> None:
+    """Listas grandes: custo do `w in t` cresce com o nº de termos, o do autômato não."""
+    rng = np.random.default_rng(7)
+    pool = sorted(set(NEUTRAL) | set(EASY_WORDS) | set(HARD_WORDS))
+    terms = [str(t) for t in rng.choice(np.array(pool, dtype=object), n_terms, replace=False)]
+    easy, hard = terms[: n_terms // 2], terms[n_terms // 2:]
+    matcher = KeywordMatcher({"easy": [(w, 0.10) for w in easy], "hard": [(w, -0.15) for w in hard]}, base_score=0.55)
+
+    sample = titles.head(50_000)
+    t0 = time.perf_counter()
+    ref = sample.apply(
+        lambda t: _clamp(
+            0.55 + 0.10 * sum(1 for w in easy if w in t.lower()) - 0.15 * sum(1 for w in hard if w in t.lower()),
+            0.0, 1.0,
+        )
+    ).to_numpy()
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vec = decision_scores(sample, matcher)
+    t_vec = time.perf_counter() - t0
+
+    if not np.array_equal(ref, vec):
+        raise SystemExit("DIVERGÊNCIA no decision_score com listas grandes")
+    print(
+        f"decision c/ {n_terms} termos ({len(sample)} títulos): "
+        f"apply={t_ref:.3f}s | autômato={t_vec:.3f}s | speedup={t_ref / max(t_vec, 1e-9):.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
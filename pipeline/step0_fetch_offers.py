@@ -14,10 +14,19 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.shopee_affiliates_client import ShopeeAffiliatesClient  # noqa: E402
+from src.catalog_store import mirror_workbook  # noqa: E402
+from src.money import parse_brl_series  # noqa: E402
+from src.price_history import PriceHistory  # noqa: E402
+from src.price_drops import append_drops, detect_drops  # noqa: E402
+from src.catalog import parse_ids  # noqa: E402
 
 
 DATA_DIR = PROJECT_ROOT / "data"
 OUT_XLSX = DATA_DIR / "controle_produtos.xlsx"
+PRICE_HISTORY_FILE = Path(os.getenv("PRICE_HISTORY_FILE", str(DATA_DIR / "price_history.sqlite")))
+# quedas de preço entre buscas (>= STEP0_DROP_MIN_PCT) -> stream lido pelo Step6
+PRICE_DROPS_FILE = Path(os.getenv("PRICE_DROPS_FILE", str(DATA_DIR / "price_drops.jsonl")))
+DROP_MIN_PCT = float(os.getenv("STEP0_DROP_MIN_PCT", "20"))
 
 QUERY_NAME = "productOfferV2"
 
@@ -251,6 +260,7 @@ def _upsert_excel(path_xlsx: Path, df_new: pd.DataFrame) -> None:
         df = df.drop_duplicates(subset=[key], keep="last")
 
     df.to_excel(path_xlsx, index=False)
+    mirror_workbook(path_xlsx, df, who="Step0")
 
 
 def main():
@@ -298,6 +308,21 @@ def main():
     df_new = _normalize_nodes(all_nodes)
     _upsert_excel(OUT_XLSX, df_new)
 
+    # uma observação de preço por item por busca (trechos iguais são só estendidos);
+    # o que mudou desde a busca anterior alimenta o stream de quedas (fila prioritária do Step6)
+    with PriceHistory(PRICE_HISTORY_FILE) as history:
+        changes = history.record_changes(df_new["produto_id"], parse_brl_series(df_new["preco_atual"]))
+    offers = df_new.assign(produto_id=parse_ids(df_new["produto_id"]))
+    drops = detect_drops(changes, offers, DROP_MIN_PCT)
+    append_drops(PRICE_DROPS_FILE, drops)
+    n_new = int(changes["prev_cents"].isna().sum())
+    print(
+        f"INFO Step0: histórico de preços -> {n_new} novo(s) | {len(changes) - n_new} mudança(s) | "
+        f"{len(drops)} queda(s) >= {DROP_MIN_PCT:g}% -> {PRICE_DROPS_FILE}"
+    )
+    for r in drops.head(5).itertuples(index=False):
+        print(f"  -{r.drop_pct:.0f}% {r.produto_id} {r.nome_curto}")
+
     print(f"OK: {len(df_new)} ofertas processadas. Excel atualizado em: {OUT_XLSX}")
 
 
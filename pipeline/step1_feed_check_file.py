@@ -2,41 +2,27 @@
 from __future__ import annotations
 
 import os
+import sys
 from pathlib import Path
 import pandas as pd
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.schema_resolver import make_unique_columns  # noqa: E402
+
 DATA_DIR = PROJECT_ROOT / "data"
 SRC_XLSX = DATA_DIR / "controle_produtos.xlsx"
 OUT_CSV = DATA_DIR / "feed_validado.csv"
 
 
-def _make_unique_columns(df: pd.DataFrame) -> pd.DataFrame:
-    cols = list(map(str, df.columns))
-    seen = {}
-    new_cols = []
-    dup_found = False
-    for c in cols:
-        if c in seen:
-            seen[c] += 1
-            new_cols.append(f"{c}__dup{seen[c]}")
-            dup_found = True
-        else:
-            seen[c] = 0
-            new_cols.append(c)
-    if dup_found:
-        df = df.copy()
-        df.columns = new_cols
-        print("INFO Step1: colunas duplicadas detectadas e renomeadas automaticamente.")
-    return df
-
-
 def main() -> None:
     if not SRC_XLSX.exists():
         raise FileNotFoundError(f"Não encontrei: {SRC_XLSX}")
 
     df = pd.read_excel(SRC_XLSX)
-    df = _make_unique_columns(df)
+    df = make_unique_columns(df, who="Step1")
 
     # Colunas mínimas (mantém nomes que seu pipeline já usa)
     keep = []
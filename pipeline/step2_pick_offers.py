@@ -2,17 +2,34 @@
 from __future__ import annotations
 
 import os
-import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, Optional, Tuple, Set, List
+from typing import Dict, Iterator, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
-
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.keyword_matcher import KeywordMatcher  # noqa: E402
+from src.scoring import price_impulse_scores, trust_scores, decision_scores  # noqa: E402
+from src.near_dup import NearDupIndex, keep_best_per_cluster  # noqa: E402
+from src.selection import normalize_titles, category_keys, dense_codes, pick_capped  # noqa: E402
+from src.topk_pool import TopKPool  # noqa: E402
+from src.feature_store import FeatureStore  # noqa: E402
+from src.money import parse_brl_series, cents_to_reais  # noqa: E402
+from src.schema_resolver import SchemaCache, apply_schema  # noqa: E402
+from src.price_history import PriceHistory, trusted_discount  # noqa: E402
+
+
 DATA_DIR = PROJECT_ROOT / "data"
 
 FEED_FILE = os.getenv("SHOPEE_FEED_FILE", "").strip()
+# vários feeds (crawls de palavras-chave, datafeeds por país): separados por ";"
+FEED_FILES = [p.strip() for p in FEED_FILE.split(";") if p.strip()]
 OUTPUT_FILE = DATA_DIR / "picks_refinados.csv"
 
 # ===================== CONFIG =====================
@@ -36,198 +53,106 @@ W_PRICE = float(os.getenv("STEP2_W_PRICE", "40"))
 W_TRUST = float(os.getenv("STEP2_W_TRUST", "35"))
 W_DECISION = float(os.getenv("STEP2_W_DECISION", "25"))
 
-EASY_WORDS = [
-    "kit", "combo", "3 em 1", "2 em 1", "pronto", "recarregável", "universal",
-    "original", "oficial", "premium", "rápido", "turbo", "sem fio", "portable", "portátil",
-]
-HARD_WORDS = [
-    "compatível", "modelo", "versão", "instalação", "adaptador específico",
-    "refil", "reposicao", "reposição", "sem garantia", "genérico", "réplica",
-]
+# Dedupe de títulos quase iguais (MinHash/LSH), com índice persistente entre dias
+NEARDUP = os.getenv("STEP2_NEARDUP", "1").strip() not in ("0", "false", "False")
+NEARDUP_THRESHOLD = float(os.getenv("STEP2_NEARDUP_THRESHOLD", "0.8"))  # Jaccard
+NEARDUP_PERMS = int(os.getenv("STEP2_NEARDUP_PERMS", "64"))
+NEARDUP_INDEX = Path(os.getenv("STEP2_NEARDUP_INDEX", str(DATA_DIR / "near_dup_index.npz")))
+NEARDUP_TTL_DAYS = int(os.getenv("STEP2_NEARDUP_TTL_DAYS", "60"))
+NEARDUP_MAX_ENTRIES = int(os.getenv("STEP2_NEARDUP_MAX_ENTRIES", "500000"))
+
+# Feature store: features de título por (itemid, título) reaproveitadas entre execuções
+FEATURE_STORE = os.getenv("STEP2_FEATURE_STORE", "1").strip() not in ("0", "false", "False")
+FEATURE_STORE_FILE = Path(os.getenv("STEP2_FEATURE_STORE_FILE", str(DATA_DIR / "feature_store.pkl")))
+FEATURE_STORE_TTL_DAYS = int(os.getenv("STEP2_FEATURE_STORE_TTL_DAYS", "30"))
+FEATURE_STORE_MAX_ENTRIES = int(os.getenv("STEP2_FEATURE_STORE_MAX_ENTRIES", "500000"))
+# linhas novas acumuladas antes de incorporar ao store (limita memória em feeds grandes)
+_STORE_FLUSH_ROWS = 200_000
+
+# Mapeamento de colunas por assinatura do cabeçalho (mesmo cabeçalho -> sem medir cobertura)
+SCHEMA_CACHE_FILE = Path(os.getenv("SCHEMA_CACHE_FILE", str(DATA_DIR / "schema_cache.json")))
+
+# Histórico de preços dos picks (observação por execução) + desconto conferido em 30 dias
+PRICE_HISTORY = os.getenv("STEP2_PRICE_HISTORY", "1").strip() not in ("0", "false", "False")
+PRICE_HISTORY_FILE = Path(os.getenv("PRICE_HISTORY_FILE", str(DATA_DIR / "price_history.sqlite")))
+PRICE_HISTORY_DAYS = int(os.getenv("PRICE_HISTORY_DAYS", "30"))
+PRICE_HISTORY_MIN_DAYS = float(os.getenv("PRICE_HISTORY_MIN_DAYS", "7"))
+
+# Modo em blocos (feeds de vários GB, .csv ou .csv.gz): 0 = lê tudo em memória
+CHUNK_ROWS = int(os.getenv("STEP2_CHUNK_ROWS", "0"))
+# Processos para gates/scores por bloco (1 = tudo no processo principal)
+WORKERS = int(os.getenv("STEP2_WORKERS", "1"))
+# Candidatos guardados por combinação de gates no modo em blocos (dobra se não bastar)
+POOL_ROWS = int(os.getenv("STEP2_POOL_ROWS", "20000"))
+
+# Listas de palavras (easy/hard + pesos) para o decision_score
+KEYWORDS_FILE = Path(os.getenv("STEP2_KEYWORDS_FILE", str(PROJECT_ROOT / "config" / "step2_keywords.json")))
 # ===================== /CONFIG =====================
 
 
-def _make_unique_columns(df: pd.DataFrame) -> pd.DataFrame:
-    cols = list(map(str, df.columns))
-    seen: Dict[str, int] = {}
-    new_cols = []
-    dup_found = False
-    for c in cols:
-        if c in seen:
-            seen[c] += 1
-            new_cols.append(f"{c}__dup{seen[c]}")
-            dup_found = True
-        else:
-            seen[c] = 0
-            new_cols.append(c)
-    if dup_found:
-        df = df.copy()
-        df.columns = new_cols
-        print("INFO Step2: colunas duplicadas detectadas e renomeadas automaticamente.")
-    return df
-
-
-def _normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = [str(c).strip() for c in df.columns]
-    return df
-
-
-def _first_existing(df: pd.DataFrame, candidates: list[str]) -> Optional[str]:
-    cols_lower = {c.lower(): c for c in df.columns}
-    for cand in candidates:
-        key = cand.lower()
-        if key in cols_lower:
-            return cols_lower[key]
-    return None
-
-
-def _best_nonempty_col(df: pd.DataFrame, candidates: list[str]) -> Optional[str]:
-    cols_lower = {c.lower(): c for c in df.columns}
-    found = []
-    for cand in candidates:
-        c = cols_lower.get(cand.lower())
-        if c and c not in found:
-            found.append(c)
-    best = None
-    best_cov = 0.0
-    for c in found:
-        s = df[c].astype(str).fillna("").str.strip()
-        cov = float((s.str.len() > 0).mean())
-        if cov > best_cov:
-            best_cov = cov
-            best = c
-    return best
-
-
-def _parse_brl_money_series(s: pd.Series) -> pd.Series:
-    if pd.api.types.is_numeric_dtype(s):
-        return pd.to_numeric(s, errors="coerce")
-    txt = s.astype(str).fillna("").str.strip()
-    txt = txt.str.replace("R$", "", regex=False).str.replace("r$", "", regex=False)
-    txt = txt.str.replace("\u00a0", " ", regex=False).str.replace(" ", "", regex=False)
-    txt = txt.str.replace(r"[^0-9,.\-]", "", regex=True)
-    has_comma = txt.str.contains(",", regex=False)
-    txt = txt.where(~has_comma, txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
-    return pd.to_numeric(txt, errors="coerce")
-
-
-def _schema_map(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str]]:
-    df = _normalize_cols(df)
-    mapping: Dict[str, str] = {}
-
-    c_itemid = _first_existing(df, ["produto_id", "itemid", "item_id", "id", "product_id", "offerid", "offer_id", "itemId"])
-    if c_itemid:
-        mapping["itemid"] = c_itemid
-
-    c_title = _best_nonempty_col(df, ["nome_curto", "productName", "offerName", "title", "name"])
-    if c_title:
-        mapping["title"] = c_title
-
-    c_img = _best_nonempty_col(df, ["imageUrl", "image_link", "imageurl", "image_url", "img"])
-    if c_img:
-        mapping["image_link"] = c_img
-
-    c_sale = _first_existing(df, ["preco_atual", "sale_price", "price", "salePrice", "priceMin"])
-    if c_sale:
-        mapping["sale_price"] = c_sale
-
-    c_link = _best_nonempty_col(df, ["link_afiliado", "productLink", "offerLink", "originalLink", "product_link", "url", "link"])
-    if c_link:
-        mapping["product_link"] = c_link
-
-    c_cat = _best_nonempty_col(df, ["categoria", "category", "categoryName", "category_name"])
-    if c_cat:
-        mapping["category"] = c_cat
-
-    c_rating = _first_existing(df, ["avaliacao", "rating", "itemRating", "item_rating"])
-    if c_rating:
-        mapping["rating"] = c_rating
-
-    df = df.rename(columns={v: k for k, v in mapping.items()})
-    return df, mapping
-
-
-def _clamp(x: float, lo: float, hi: float) -> float:
-    return max(lo, min(hi, x))
-
-
-def _price_impulse_score(price: float) -> float:
-    if pd.isna(price):
-        return 0.0
-    if price < PRICE_MIN or price > PRICE_MAX:
-        return 0.0
-    if IDEAL_PRICE_LOW <= price <= IDEAL_PRICE_HIGH:
-        return 1.0
-    if price < IDEAL_PRICE_LOW:
-        return _clamp((price - PRICE_MIN) / max(1.0, (IDEAL_PRICE_LOW - PRICE_MIN)), 0.0, 1.0)
-    return _clamp((PRICE_MAX - price) / max(1.0, (PRICE_MAX - IDEAL_PRICE_HIGH)), 0.0, 1.0)
-
-
-def _trust_score(rating: float) -> float:
-    # Se rating vier vazio, não mata o item
-    if pd.isna(rating):
-        return 0.35
-    return _clamp((float(rating) - 4.0) / 1.0, 0.0, 1.0)
-
-
-def _decision_score(title: str) -> float:
-    t = (title or "").lower()
-    bonus = sum(1 for w in EASY_WORDS if w in t)
-    malus = sum(1 for w in HARD_WORDS if w in t)
-    return _clamp(0.55 + 0.10 * bonus - 0.15 * malus, 0.0, 1.0)
-
-
-def _normalize_title(t: str) -> str:
-    t = (t or "").lower()
-    t = re.sub(r"\s+", " ", t).strip()
-    t = re.sub(r"\b(novo|promoção|oferta|frete|grátis|original)\b", "", t)
-    return re.sub(r"\s+", " ", t).strip()
-
-
-def _pick_pass(
-    df_sorted: pd.DataFrame,
-    used_titles: Set[str],
-    per_cat: Dict[str, int],
-    respect_category_cap: bool,
-) -> List[dict]:
-    picked: List[dict] = []
-
-    for _, row in df_sorted.iterrows():
-        title = str(row.get("title", "")).strip()
-        tnorm = _normalize_title(title)
-        if not tnorm or tnorm in used_titles:
-            continue
-
-        cat = (str(row.get("category_norm", "")).strip() or "sem_categoria")
-
-        if respect_category_cap:
-            if per_cat.get(cat, 0) >= MAX_PER_CATEGORY:
-                continue
-
-        picked.append(row.to_dict())
-        used_titles.add(tnorm)
-        per_cat[cat] = per_cat.get(cat, 0) + 1
+# coluna padrão -> candidatas no feed ("first": primeira que existir; "best": maior cobertura)
+STEP2_SCHEMA = [
+    ("itemid", ["produto_id", "itemid", "item_id", "id", "product_id", "offerid", "offer_id", "itemId"], "first"),
+    ("title", ["nome_curto", "productName", "offerName", "title", "name"], "best"),
+    ("image_link", ["imageUrl", "image_link", "imageurl", "image_url", "img"], "best"),
+    ("sale_price", ["preco_atual", "sale_price", "price", "salePrice", "priceMin"], "first"),
+    ("product_link", ["link_afiliado", "productLink", "offerLink", "originalLink", "product_link", "url", "link"], "best"),
+    ("category", ["categoria", "category", "categoryName", "category_name"], "best"),
+    ("rating", ["avaliacao", "rating", "itemRating", "item_rating"], "first"),
+]
 
-        if len(picked) >= MAX_ITEMS:
-            break
 
-    return picked
+_STD_COLS = ["itemid", "title", "sale_price", "product_link", "image_link", "category", "rating"]
+_POOL_COLS = _STD_COLS + ["sale_price_cents", "category_norm", "_score", "_row"]
 
+# (gate de preço aplicado?, gate de rating aplicado?) -> só se sabe qual vale no fim do feed
+_GATE_COMBOS = [(p, r) for p in (True, False) for r in (True, False)]
 
-def main() -> None:
-    if not FEED_FILE:
-        raise RuntimeError("SHOPEE_FEED_FILE não definido. Use: $env:SHOPEE_FEED_FILE='data\\feed_validado.csv'")
 
-    df_raw = pd.read_csv(FEED_FILE)
-    if df_raw.empty:
-        print("⚠️ FEED vazio.")
+def _read_feed(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Feed inteiro (chunk_rows=0) ou em blocos; compressão (.gz, .zip...) pela extensão."""
+    if chunk_rows <= 0:
+        yield pd.read_csv(path)
         return
-
-    df_raw = _make_unique_columns(df_raw)
-    df, mapping = _schema_map(df_raw)
-    df = _make_unique_columns(df)
-
-    for col in ["itemid", "title", "sale_price", "product_link", "image_link", "category", "rating"]:
+    with pd.read_csv(path, chunksize=chunk_rows) as reader:
+        yield from reader
+
+
+def _iter_blocks(
+    mappings: Dict[str, Dict[str, str]], split: int = 1, schema_cache: Optional[SchemaCache] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Blocos de todos os feeds, em ordem, já com o schema mapeado e a coluna `_row`
+    (feed << 40 | linha) para desempate estável entre feeds. O schema de cada feed é
+    decidido no 1º bloco (ou vem do cache, se o cabeçalho já foi visto) e reaplicado
+    (por posição) nos demais.
+    split>1 fatia cada bloco (útil no modo em memória com vários workers).
+    """
+    for feed_no, path in enumerate(FEED_FILES):
+        columns: Optional[list] = None
+        offset = 0
+        for chunk in _read_feed(path, CHUNK_ROWS):
+            if chunk.empty:
+                continue
+            if columns is None:
+                df, mappings[path], _ = apply_schema(chunk, STEP2_SCHEMA, schema_cache, who="Step2")
+                columns = list(df.columns)
+            else:
+                df = chunk
+                df.columns = columns
+
+            df["_row"] = np.arange(offset, offset + len(df), dtype=np.int64) + (feed_no << 40)
+            offset += len(df)
+            if split > 1 and len(df) > 1:
+                for part in np.array_split(np.arange(len(df)), min(split, len(df))):
+                    yield df.iloc[part]
+            else:
+                yield df
+
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas padrão + parse de preço/rating + gates mínimos (título e link)."""
+    for col in _STD_COLS:
         if col not in df.columns:
             df[col] = ""
 
@@ -236,71 +161,310 @@ def main() -> None:
     df["image_link"] = df["image_link"].astype(str).fillna("").str.strip()
     df["category"] = df["category"].astype(str).fillna("").str.strip()
 
-    df["sale_price"] = _parse_brl_money_series(df["sale_price"])
+    # centavos inteiros (fonte da verdade) + reais em float para os scores
+    df["sale_price_cents"] = parse_brl_series(df["sale_price"])
+    df["sale_price"] = cents_to_reais(df["sale_price_cents"])
     df["rating"] = pd.to_numeric(df["rating"], errors="coerce")
 
-    # gates mínimos
-    df = df[(df["title"].str.len() > 0) & (df["product_link"].str.len() > 0)].copy()
+    return df[(df["title"].str.len() > 0) & (df["product_link"].str.len() > 0)].copy()
 
-    # gate preço (se ficar pequeno, relaxa)
-    df_price = df[(df["sale_price"].notna()) & (df["sale_price"] >= PRICE_MIN) & (df["sale_price"] <= PRICE_MAX)].copy()
-    if len(df_price) >= MAX_ITEMS:
-        df = df_price
-    else:
-        print(f"INFO Step2: gate preço relaxado (na faixa {PRICE_MIN}-{PRICE_MAX}: {len(df_price)})")
 
-    # imagem obrigatória
+def _new_scan_state(pool_rows: Optional[int]):
+    """(contadores, um TopKPool por combinação de gates, categorias vistas por combinação)"""
+    stats: Dict[object, int] = {"rows": 0, "base": 0, "price": 0}
+    for p in (True, False):
+        for k in ("before_img", "img", "rated", "rating_ok"):
+            stats[(p, k)] = 0
+    pools = {combo: TopKPool(pool_rows) for combo in _GATE_COMBOS}
+    cats_seen: Dict[Tuple[bool, bool], set] = {combo: set() for combo in _GATE_COMBOS}
+    return stats, pools, cats_seen
+
+
+def _scan_block(df: pd.DataFrame, matcher: KeywordMatcher, state, store: Optional[FeatureStore] = None) -> None:
+    """Gates + scores de um bloco; acumula contadores e candidatos em `state`."""
+    stats, pools, cats_seen = state
+    stats["rows"] += len(df)
+
+    df = _prepare(df.copy())
+    stats["base"] += len(df)
+
+    price_ok = (df["sale_price"].notna() & (df["sale_price"] >= PRICE_MIN) & (df["sale_price"] <= PRICE_MAX)).to_numpy()
+    stats["price"] += int(price_ok.sum())
+    stats[(True, "before_img")] += int(price_ok.sum())
+    stats[(False, "before_img")] += len(df)
+
     if REQUIRE_IMAGE:
-        before = len(df)
-        df = df[df["image_link"].str.len() > 0].copy()
-        print(f"INFO Step2: REQUIRE_IMAGE=ON -> {before} -> {len(df)}")
-
-    # rating gate (apenas se coverage ok)
-    rating_cov = float(df["rating"].notna().mean() * 100.0)
-    if rating_cov >= RATING_COVERAGE_MIN:
-        before = len(df)
-        df = df[df["rating"] >= MIN_RATING].copy()
-        print(f"INFO Step2: rating gate aplicado (coverage={rating_cov:.2f}%) -> {before} -> {len(df)}")
-    else:
-        print(f"INFO Step2: rating gate IGNORADO (coverage={rating_cov:.2f}% < {RATING_COVERAGE_MIN}%)")
+        img_ok = (df["image_link"].str.len() > 0).to_numpy()
+        df = df[img_ok].copy()
+        price_ok = price_ok[img_ok]
+
+    rated = df["rating"].notna().to_numpy()
+    rating_ok = (df["rating"] >= MIN_RATING).to_numpy()
+    for p in (True, False):
+        sel = price_ok if p else np.ones(len(df), dtype=bool)
+        stats[(p, "img")] += int(sel.sum())
+        stats[(p, "rated")] += int((sel & rated).sum())
+        stats[(p, "rating_ok")] += int((sel & rating_ok).sum())
 
     if df.empty:
-        print("⚠️ Nenhum item após gates.")
         return
 
     # scores
-    df["price_score"] = df["sale_price"].apply(_price_impulse_score)
-    df["trust_score"] = df["rating"].apply(_trust_score)
-    df["decision_score"] = df["title"].apply(_decision_score)
+    df["price_score"] = price_impulse_scores(
+        df["sale_price"], PRICE_MIN, PRICE_MAX, IDEAL_PRICE_LOW, IDEAL_PRICE_HIGH
+    )
+    df["trust_score"] = trust_scores(df["rating"])
+    counts = store.features(df["itemid"], df["title"])["counts"] if store is not None else None
+    df["decision_score"] = decision_scores(df["title"], matcher, group_counts=counts)
 
     df["_score"] = (
         (W_PRICE / 100.0) * df["price_score"] +
         (W_TRUST / 100.0) * df["trust_score"] +
         (W_DECISION / 100.0) * df["decision_score"]
     )
-
     df["category_norm"] = df["category"].astype(str).str.lower().str.strip()
-    df_sorted = df.sort_values("_score", ascending=False).reset_index(drop=True)
+    df = df[_POOL_COLS]
+
+    for p, r in _GATE_COMBOS:
+        mask = np.ones(len(df), dtype=bool)
+        if p:
+            mask &= price_ok
+        if r:
+            mask &= rating_ok
+        part = df[mask]
+        pools[(p, r)].push(part)
+        if pools[(p, r)].k is not None:
+            cats_seen[(p, r)].update(category_keys(part["category_norm"]).unique().tolist())
+
+
+def _merge_scan_state(state, part) -> None:
+    stats, pools, cats_seen = state
+    p_stats, p_pools, p_cats = part
+    for k, v in p_stats.items():
+        stats[k] += v
+    for combo in _GATE_COMBOS:
+        pools[combo].merge(p_pools[combo])
+        cats_seen[combo] |= p_cats[combo]
+
+
+# ---------- workers (STEP2_WORKERS > 1) ----------
+_WORKER_MATCHER: Optional[KeywordMatcher] = None
+_WORKER_STORE: Optional[FeatureStore] = None
+
+
+def _init_worker(keywords_file: str, store_file: Optional[str]) -> None:
+    global _WORKER_MATCHER, _WORKER_STORE
+    _WORKER_MATCHER = KeywordMatcher.from_config(keywords_file)
+    if store_file:
+        # só leitura: o que o worker calcular volta como delta para o processo principal
+        _WORKER_STORE = FeatureStore.load(Path(store_file), _WORKER_MATCHER, NEARDUP_PERMS)
+
+
+def _worker_scan(df: pd.DataFrame, pool_rows: Optional[int]):
+    state = _new_scan_state(pool_rows)
+    _scan_block(df, _WORKER_MATCHER, state, _WORKER_STORE)
+    delta = _WORKER_STORE.take_delta() if _WORKER_STORE is not None else None
+    return state, delta
+
+
+def _scan_feed(
+    matcher: KeywordMatcher,
+    pool_rows: Optional[int],
+    store: Optional[FeatureStore] = None,
+    schema_cache: Optional[SchemaCache] = None,
+):
+    """
+    Uma passada nos feeds, bloco a bloco: gates + scores por bloco, contadores globais para as
+    decisões que dependem do feed inteiro (relaxar preço, coverage de rating) e um TopKPool
+    por combinação de gates. pool_rows=None -> pools sem limite (caminho em memória).
+
+    Com STEP2_WORKERS > 1 os blocos são processados num pool de processos e os candidatos de
+    cada bloco são mesclados no pool global (top-K da união = união dos top-K).
+
+    Retorna (contadores, pools, categorias por combinação, mappings por feed) ou None se vazio.
+    """
+    state = _new_scan_state(pool_rows)
+    mappings: Dict[str, Dict[str, str]] = {}
+
+    def merge(result) -> None:
+        part, delta = result
+        _merge_scan_state(state, part)
+        if store is not None:
+            store.apply_delta(delta)
+            store.flush(min_pending=_STORE_FLUSH_ROWS)
+
+    if WORKERS <= 1:
+        for df in _iter_blocks(mappings, schema_cache=schema_cache):
+            _scan_block(df, matcher, state, store)
+            if store is not None:
+                store.flush(min_pending=_STORE_FLUSH_ROWS)
+    else:
+        # cada worker carrega o store salvo em disco (sem arquivo -> store vazio)
+        store_file = str(FEATURE_STORE_FILE) if store is not None else None
+        with ProcessPoolExecutor(
+            max_workers=WORKERS, initializer=_init_worker, initargs=(str(KEYWORDS_FILE), store_file)
+        ) as ex:
+            pending = set()
+            # no máximo 2 blocos por worker em voo: memória continua limitada
+            for df in _iter_blocks(mappings, split=WORKERS if CHUNK_ROWS <= 0 else 1, schema_cache=schema_cache):
+                if len(pending) >= 2 * WORKERS:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        merge(fut.result())
+                pending.add(ex.submit(_worker_scan, df, pool_rows))
+            for fut in pending:
+                merge(fut.result())
+
+    if store is not None:
+        store.flush()
+
+    if state[0]["rows"] == 0:
+        return None
+    return state[0], state[1], state[2], mappings
+
+
+def _decide_gates(stats: Dict[object, int]) -> Tuple[bool, bool, int]:
+    """Mesmas regras do caminho em memória, a partir dos contadores. -> (preço?, rating?, itens)"""
+    price_on = stats["price"] >= MAX_ITEMS
+    if not price_on:
+        print(f"INFO Step2: gate preço relaxado (na faixa {PRICE_MIN}-{PRICE_MAX}: {stats['price']})")
+
+    if REQUIRE_IMAGE:
+        print(f"INFO Step2: REQUIRE_IMAGE=ON -> {stats[(price_on, 'before_img')]} -> {stats[(price_on, 'img')]}")
+
+    n = stats[(price_on, "img")]
+    rating_cov = (stats[(price_on, "rated")] / n * 100.0) if n else float("nan")
+    rating_on = rating_cov >= RATING_COVERAGE_MIN
+    if rating_on:
+        print(
+            f"INFO Step2: rating gate aplicado (coverage={rating_cov:.2f}%) -> {n} -> {stats[(price_on, 'rating_ok')]}"
+        )
+        n = stats[(price_on, "rating_ok")]
+    else:
+        print(f"INFO Step2: rating gate IGNORADO (coverage={rating_cov:.2f}% < {RATING_COVERAGE_MIN}%)")
+    return price_on, rating_on, n
+
+
+def _pool_is_exact(cats: pd.Series, idx: np.ndarray, n_first: int, all_cats: set) -> bool:
+    """
+    Com o pool truncado, a escolha só é igual à do feed inteiro se as linhas de fora não
+    poderiam entrar: o PASSO 1 encheu dentro do pool, ou todas as categorias do feed já
+    bateram o cap no PASSO 1 e o PASSO 2 completou só com linhas do pool.
+    """
+    if n_first >= MAX_ITEMS:
+        return True
+    if len(idx) < MAX_ITEMS:
+        return False
+    first_counts = cats.iloc[idx[:n_first]].value_counts()
+    saturated = set(first_counts.index[first_counts >= MAX_PER_CATEGORY])
+    return all_cats <= saturated
+
+
+def _select(df_sorted: pd.DataFrame, truncated: bool, all_cats: set, store: Optional[FeatureStore] = None):
+    """Near-dup + seleção com cap por categoria sobre candidatos já ordenados. -> (picks, índice, exato?)"""
+    signatures = None
+    if store is not None:
+        # candidatos já passaram pelo store no scan; features() só recalcula se algo foi despejado
+        found, feats = store.lookup(df_sorted["itemid"], df_sorted["title"])
+        if not found.all():
+            feats = store.features(df_sorted["itemid"], df_sorted["title"])
+        title_keys = pd.Series(feats["title_key"], dtype=str)
+        signatures = (feats["sigs"], feats["has_sig"])
+    else:
+        title_keys = normalize_titles(df_sorted["title"])
+
+    # quase-duplicados: fica só o melhor score de cada cluster
+    near_dup_index = None
+    if NEARDUP:
+        near_dup_index = NearDupIndex.load(NEARDUP_INDEX, NEARDUP_THRESHOLD, NEARDUP_PERMS)
+        df_sorted["title_cluster"] = near_dup_index.assign(title_keys, df_sorted["itemid"], signatures=signatures)
+        keep = keep_best_per_cluster(df_sorted["title_cluster"].to_numpy())
+        print(
+            f"INFO Step2: near-dup (jaccard>={NEARDUP_THRESHOLD}) -> {len(df_sorted)} -> {int(keep.sum())} "
+            f"| índice={len(near_dup_index)}"
+        )
+        df_sorted = df_sorted[keep].reset_index(drop=True)
+        title_keys = title_keys[keep].reset_index(drop=True)
+
+    # chaves pré-computadas: título normalizado + categoria em códigos densos
+    t_codes, c_codes = dense_codes(title_keys, df_sorted["category_norm"])
+
+    # PASSO 1 (cap por categoria) + PASSO 2 (completa ignorando o cap) numa varredura
+    idx, n_first = pick_capped(t_codes, c_codes, MAX_ITEMS, MAX_PER_CATEGORY, return_first_pass=True)
+
+    exact = (not truncated) or _pool_is_exact(category_keys(df_sorted["category_norm"]), idx, n_first, all_cats)
+    return df_sorted.iloc[idx].reset_index(drop=True), near_dup_index, exact
+
+
+def _price_history(out: pd.DataFrame) -> pd.DataFrame:
+    """
+    Grava o preço de hoje dos picks no histórico e anexa mínimo/mediana de 30 dias e o
+    desconto real contra a mediana (o feed não traz preço "de"; o Step3b refaz com ele).
+    """
+    with PriceHistory(PRICE_HISTORY_FILE) as history:
+        rec = history.record(out["itemid"], out["sale_price_cents"])
+        stats = history.stats(out["itemid"], days=PRICE_HISTORY_DAYS)
+    no_decl = pd.Series(pd.NA, index=out.index, dtype="Int64")
+    trusted = trusted_discount(out["sale_price_cents"], no_decl, stats, out["itemid"], min_days=PRICE_HISTORY_MIN_DAYS)
+    out = out.copy()
+    out["price_min_30d"] = cents_to_reais(trusted["min_30d_cents"])
+    out["price_median_30d"] = cents_to_reais(trusted["median_30d_cents"])
+    out["discount_pct"] = trusted["discount_pct"]
+    n_hist = int((trusted["discount_source"] == "historico").sum())
+    print(
+        f"INFO Step2: histórico de preços -> {rec['new']} mudança(s)/novo(s) | {rec['extended']} sem mudança | "
+        f"{n_hist}/{len(out)} picks com {PRICE_HISTORY_MIN_DAYS:g}+ dias de histórico"
+    )
+    return out
+
+
+def main() -> None:
+    if not FEED_FILES:
+        raise RuntimeError("SHOPEE_FEED_FILE não definido. Use: $env:SHOPEE_FEED_FILE='data\\feed_validado.csv'")
 
-    used_titles: Set[str] = set()
-    per_cat: Dict[str, int] = {}
+    # autômato das palavras-chave: compilado 1x por execução
+    matcher = KeywordMatcher.from_config(KEYWORDS_FILE)
 
-    # PASSO 1: com diversidade por categoria (cap)
-    picked = _pick_pass(df_sorted, used_titles, per_cat, respect_category_cap=True)
+    store: Optional[FeatureStore] = None
+    if FEATURE_STORE:
+        store = FeatureStore.load(FEATURE_STORE_FILE, matcher, NEARDUP_PERMS, FEATURE_STORE_MAX_ENTRIES)
+
+    schema_cache = SchemaCache(SCHEMA_CACHE_FILE)
+
+    pool_rows: Optional[int] = POOL_ROWS if CHUNK_ROWS > 0 else None
+    while True:
+        scan = _scan_feed(matcher, pool_rows, store, schema_cache)
+        if scan is None:
+            print("⚠️ FEED vazio.")
+            return
+        stats, pools, cats_seen, mappings = scan
+
+        price_on, rating_on, n_items = _decide_gates(stats)
+        if n_items == 0:
+            print("⚠️ Nenhum item após gates.")
+            return
+
+        pool = pools[(price_on, rating_on)]
+        out, near_dup_index, exact = _select(pool.frame(), pool.truncated, cats_seen[(price_on, rating_on)], store)
+        if exact:
+            break
+        # pool pequeno demais para garantir a mesma escolha do feed inteiro: relê com o dobro
+        pool_rows *= 2
+        print(f"INFO Step2: pool de candidatos insuficiente, relendo o feed com pool={pool_rows}")
 
-    # PASSO 2: completa ignorando cap de categoria (corrige seu caso de "6")
-    if len(picked) < MAX_ITEMS:
-        picked2 = _pick_pass(df_sorted, used_titles, per_cat, respect_category_cap=False)
-        # picked2 pode conter até MAX_ITEMS, mas vamos só completar o que falta
-        needed = MAX_ITEMS - len(picked)
-        picked.extend(picked2[:needed])
+    if WORKERS > 1:
+        print(f"INFO Step2: {WORKERS} workers | {len(FEED_FILES)} feed(s)")
+    if CHUNK_ROWS > 0:
+        print(f"INFO Step2: modo em blocos ({CHUNK_ROWS} linhas) -> {stats['rows']} linhas lidas | pool={len(pool)}")
 
-    out = pd.DataFrame(picked)
     if out.empty:
         print("⚠️ Nenhum pick final.")
         return
 
-    cols_out = ["itemid", "title", "sale_price", "image_link", "product_link", "category", "rating", "_score"]
+    cols_out = ["itemid", "title", "sale_price", "sale_price_cents", "image_link", "product_link", "category", "rating", "_score", "title_cluster"]
+    if PRICE_HISTORY:
+        out = _price_history(out)
+        cols_out += ["price_min_30d", "price_median_30d", "discount_pct"]
     for c in cols_out:
         if c not in out.columns:
             out[c] = ""
@@ -308,8 +472,18 @@ def main() -> None:
 
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     out.to_csv(OUTPUT_FILE, index=False, encoding="utf-8")
+    if near_dup_index is not None:
+        near_dup_index.save(NEARDUP_INDEX, ttl_days=NEARDUP_TTL_DAYS, max_entries=NEARDUP_MAX_ENTRIES)
+    schema_cache.save()
+    if store is not None:
+        store.save(FEATURE_STORE_FILE, ttl_days=FEATURE_STORE_TTL_DAYS)
+        print(f"INFO Step2: feature store -> {store.hits} reaproveitados | {store.misses} calculados | total={len(store)}")
     print(f"OK Step2: {len(out)} picks salvos em: {OUTPUT_FILE}")
-    print(f"INFO Step2: schema mapping usado: {mapping}")
+    for path, mapping in mappings.items():
+        prefix = f"[{Path(path).name}] " if len(mappings) > 1 else ""
+        print(f"INFO Step2: {prefix}schema mapping usado: {mapping}")
+    if schema_cache.hits:
+        print(f"INFO Step2: schema do cache (cabeçalho já visto) em {schema_cache.hits} leitura(s)")
 
 
 if __name__ == "__main__":
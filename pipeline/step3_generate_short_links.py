@@ -1,40 +1,41 @@
 # pipeline/step3_generate_short_links.py
 from __future__ import annotations
 
+import os
+import sys
+import time
 from pathlib import Path
 import pandas as pd
 
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.schema_resolver import SchemaCache, normalize_cols, resolve  # noqa: E402
+
 DATA_DIR = PROJECT_ROOT / "data"
 OUTPUTS_DIR = PROJECT_ROOT / "outputs"
 
 PICKS_FILE = DATA_DIR / "picks_refinados.csv"
 OUTPUT_FILE = OUTPUTS_DIR / "picks_refinados_com_links.csv"
+SCHEMA_CACHE_FILE = Path(os.getenv("SCHEMA_CACHE_FILE", str(DATA_DIR / "schema_cache.json")))
 
+# Links curtos de afiliado via API (generateShortLink); 0 = só copia product_link
+SHORT_LINKS = os.getenv("STEP3_SHORT_LINKS", "1").strip() not in ("0", "false", "False")
+SHORT_LINK_CACHE_FILE = Path(os.getenv("STEP3_SHORT_LINK_CACHE", str(DATA_DIR / "short_links.csv")))
+# um conjunto de links por canal: o 1º preenche product_short_link, os outros
+# product_short_link_<canal>; sub-ids de cada canal = [canal] + STEP3_SUB_IDS
+CHANNELS = [c.strip() for c in os.getenv("STEP3_CHANNELS", "whatsapp").split(",") if c.strip()]
+SUB_IDS = [s.strip() for s in os.getenv("STEP3_SUB_IDS", "").split(",") if s.strip()]
+WORKERS = int(os.getenv("STEP3_WORKERS", "8"))
+RATE_PER_S = float(os.getenv("STEP3_RATE_PER_S", "5"))
+MAX_RETRIES = int(os.getenv("STEP3_MAX_RETRIES", "3"))
 
-def _normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = [str(c).strip() for c in df.columns]
-    return df
-
-
-def _best_nonempty_col(df: pd.DataFrame, candidates: list[str]) -> str | None:
-    cols_lower = {c.lower(): c for c in df.columns}
-    found: list[str] = []
-    for cand in candidates:
-        c = cols_lower.get(cand.lower())
-        if c and c not in found:
-            found.append(c)
-
-    best = None
-    best_cov = 0.0
-    for c in found:
-        s = df[c].astype(str).fillna("").str.strip()
-        cov = float((s.str.len() > 0).mean())
-        if cov > best_cov:
-            best_cov = cov
-            best = c
-    return best
+# coluna de link do produto: a de melhor cobertura entre as candidatas
+STEP3_SCHEMA = [
+    ("product_link", ["product_link", "link_afiliado", "productLink", "offerLink", "originalLink", "url", "link"], "best"),
+]
 
 
 def _clean_link(s: pd.Series) -> pd.Series:
@@ -44,14 +45,55 @@ def _clean_link(s: pd.Series) -> pd.Series:
     return s
 
 
+def _short_links(df: pd.DataFrame) -> None:
+    """
+    Preenche os links curtos por canal (só onde ainda está vazio). Sem credenciais da API
+    ou com erro numa URL, fica o product_link (mesmo comportamento de antes).
+    """
+    from src.shopee_affiliates_client import ShopeeAffiliatesClient, ShopeeAffiliatesClientError
+    from src.short_links import ShortLinkCache, generate_short_links
+
+    try:
+        client = ShopeeAffiliatesClient.from_env()
+    except ShopeeAffiliatesClientError as e:
+        print(f"INFO Step3: sem API de afiliados ({str(e).splitlines()[0]}) -> usando product_link.")
+        return
+
+    cache = ShortLinkCache(SHORT_LINK_CACHE_FILE)
+    for i, channel in enumerate(CHANNELS):
+        col = "product_short_link" if i == 0 else f"product_short_link_{channel}"
+        if col not in df.columns:
+            df[col] = ""
+        df[col] = _clean_link(df[col])
+        empty = (df[col].str.len() == 0) & (df["product_link"].str.len() > 0)
+        if not empty.any():
+            continue
+
+        t0 = time.perf_counter()
+        links, stats = generate_short_links(
+            client, df.loc[empty, "product_link"].tolist(), [channel] + SUB_IDS, cache,
+            workers=WORKERS, rate_per_s=RATE_PER_S, max_retries=MAX_RETRIES,
+        )
+        df.loc[empty, col] = df.loc[empty, "product_link"].map(links).fillna("")
+        cache.save()
+        print(
+            f"INFO Step3: [{channel}] {stats['urls']} links -> {stats['cache']} do cache | "
+            f"{stats['api']} via API | {stats['errors']} falhas | {stats['retries']} retries | "
+            f"{time.perf_counter() - t0:.1f}s"
+        )
+
+
 def main() -> None:
     if not PICKS_FILE.exists():
         raise SystemExit(f"picks_refinados.csv não encontrado em: {PICKS_FILE}")
 
-    df = _normalize_cols(pd.read_csv(PICKS_FILE, low_memory=False))
+    df = normalize_cols(pd.read_csv(PICKS_FILE, low_memory=False))
 
-    # Detecta coluna de link do produto (melhor cobertura)
-    link_col = _best_nonempty_col(df, ["product_link", "link_afiliado", "productLink", "offerLink", "originalLink", "url", "link"])
+    # Detecta coluna de link do produto (melhor cobertura; cabeçalho já visto -> cache)
+    schema_cache = SchemaCache(SCHEMA_CACHE_FILE)
+    mapping, _ = resolve(df, STEP3_SCHEMA, schema_cache)
+    schema_cache.save()
+    link_col = mapping.get("product_link")
     if not link_col:
         raise SystemExit(f"picks_refinados.csv não tem coluna de link. Colunas atuais: {list(df.columns)}")
 
@@ -66,8 +108,13 @@ def main() -> None:
 
     df["product_short_link"] = _clean_link(df["product_short_link"])
 
+    if SHORT_LINKS:
+        _short_links(df)
+
     # ✅ FIX: preencher vazios (e NÃO só criar a coluna)
-    df.loc[df["product_short_link"].str.len() == 0, "product_short_link"] = df["product_link"]
+    for col in [c for c in df.columns if c.startswith("product_short_link")]:
+        df[col] = _clean_link(df[col])
+        df.loc[df[col].str.len() == 0, col] = df["product_link"]
 
     # Sanidade: remove linhas sem link
     df = df[(df["product_link"].str.len() > 0) & (df["product_short_link"].str.len() > 0)].copy()
@@ -82,6 +129,9 @@ def main() -> None:
     print(f"OK: arquivo gerado em: {OUTPUT_FILE}")
     print(f"Linhas: {len(df)}")
     print(f"INFO: product_short_link preenchido: {pct:.0f}% (fallback aplicado quando vazio).")
+    if SHORT_LINKS:
+        n_short = int((df["product_short_link"] != df["product_link"]).sum())
+        print(f"INFO: links curtos de afiliado: {n_short}/{total}")
 
 
 if __name__ == "__main__":
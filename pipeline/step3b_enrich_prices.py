@@ -1,33 +1,27 @@
 import os
+import sys
 import pandas as pd
 from pathlib import Path
 
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.money import column_cents, cents_to_reais  # noqa: E402
+from src.catalog import parse_ids  # noqa: E402
+from src.catalog_store import lookup_prices  # noqa: E402
+from src.price_history import PriceHistory, trusted_discount  # noqa: E402
+from src.schema_resolver import SchemaCache  # noqa: E402
+
 
 PICKS_FILE = Path(os.getenv("WA_PICKS_FILE", r"outputs\picks_refinados_com_links.csv"))
 CONTROLE_XLSX = Path(os.getenv("STEP0_CONTROLE_XLSX", r"data\controle_produtos.xlsx"))
+SCHEMA_CACHE_FILE = Path(os.getenv("SCHEMA_CACHE_FILE", str(PROJECT_ROOT / "data" / "schema_cache.json")))
 
-
-def _col(df: pd.DataFrame, names: list[str]) -> str | None:
-    """Retorna o nome real da primeira coluna existente (case-insensitive)."""
-    lower_map = {c.lower(): c for c in df.columns}
-    for n in names:
-        key = n.lower()
-        if key in lower_map:
-            return lower_map[key]
-    return None
-
-
-def _to_float_series(s: pd.Series) -> pd.Series:
-    """Converte série para float aceitando 'R$ 1.234,56' e números."""
-    return pd.to_numeric(
-        s.astype(str)
-        .str.replace("R$", "", regex=False)
-        .str.replace(" ", "", regex=False)
-        .str.replace(".", "", regex=False)
-        .str.replace(",", ".", regex=False)
-        .str.strip(),
-        errors="coerce",
-    )
+# histórico de preços (gravado pelo Step0 e pelo Step2): janela e dias mínimos para confiar
+PRICE_HISTORY_FILE = Path(os.getenv("PRICE_HISTORY_FILE", str(PROJECT_ROOT / "data" / "price_history.sqlite")))
+PRICE_HISTORY_DAYS = int(os.getenv("PRICE_HISTORY_DAYS", "30"))
+PRICE_HISTORY_MIN_DAYS = float(os.getenv("PRICE_HISTORY_MIN_DAYS", "7"))
 
 
 def main():
@@ -41,69 +35,54 @@ def main():
     if "itemid" not in picks.columns:
         raise RuntimeError("picks_refinados_com_links.csv não tem coluna 'itemid'.")
 
-    picks["itemid"] = picks["itemid"].astype(str).fillna("").str.strip()
-
-    ctrl = pd.read_excel(CONTROLE_XLSX)
-
-    # id no controle
-    id_col = _col(ctrl, ["itemid", "itemId", "produto_id", "product_id"])
-    if not id_col:
-        raise RuntimeError(
-            "controle_produtos.xlsx: não encontrei coluna de id (itemid/itemId/produto_id/product_id)."
-        )
-
-    ctrl[id_col] = ctrl[id_col].astype(str).fillna("").str.strip()
+    # join por id inteiro (nada de "123" x "123.0" vindo do Excel)
+    picks["itemid"] = parse_ids(picks["itemid"])
 
+    # Só os ids dos picks, por chave, no espelho SQLite do controle (a planilha inteira só é
+    # lida se mudou desde o último espelhamento; colunas de preço resolvidas via cache)
     # Step0/productOfferV2 costuma ter: price, priceMin, priceMax
-    price_col = _col(ctrl, ["price", "preco", "preco_atual", "sale_price", "preco_promocional"])
-    price_min_col = _col(ctrl, ["pricemin", "price_min", "preco_min"])
-    price_max_col = _col(ctrl, ["pricemax", "price_max", "preco_max", "preco_cheio", "preco_original"])
-
-    aux = pd.DataFrame({"itemid": ctrl[id_col]})
+    schema_cache = SchemaCache(SCHEMA_CACHE_FILE)
+    found, _ = lookup_prices(CONTROLE_XLSX, picks["itemid"], schema_cache, who="Step3b")
+    schema_cache.save()
 
-    if price_min_col:
-        aux["promo_price_from_ctrl"] = _to_float_series(ctrl[price_min_col])
-    elif price_col:
-        aux["promo_price_from_ctrl"] = _to_float_series(ctrl[price_col])
-    else:
-        aux["promo_price_from_ctrl"] = pd.NA
-
-    if price_max_col:
-        aux["original_price_from_ctrl"] = _to_float_series(ctrl[price_max_col])
-    elif price_col:
-        aux["original_price_from_ctrl"] = _to_float_series(ctrl[price_col])
-    else:
-        aux["original_price_from_ctrl"] = pd.NA
+    aux = found.rename(columns={
+        "produto_id": "itemid",
+        "promo_cents": "promo_price_from_ctrl",
+        "original_cents": "original_price_from_ctrl",
+    })
 
     # merge nos picks
     out = picks.merge(aux, on="itemid", how="left")
 
     # sale_price do picks (promo atual)
-    if "sale_price" in out.columns:
-        sale = _to_float_series(out["sale_price"])
-    else:
-        sale = pd.Series([pd.NA] * len(out))
+    sale = column_cents(out, "sale_price")
 
     # original_price já existente ou vindo do ctrl
-    if "original_price" in out.columns:
-        orig = _to_float_series(out["original_price"])
+    if "original_price" in out.columns or "original_price_cents" in out.columns:
+        orig = column_cents(out, "original_price")
     else:
-        orig = _to_float_series(out["original_price_from_ctrl"])
-
-    out["original_price"] = orig
+        orig = out["original_price_from_ctrl"].astype("Int64")
 
     # fallback: se original_price vazio e promo_from_ctrl > sale, usa promo_from_ctrl como "cheio"
-    promo_from_ctrl = _to_float_series(out["promo_price_from_ctrl"])
-
-    mask_fill = out["original_price"].isna() & promo_from_ctrl.notna() & sale.notna() & (promo_from_ctrl > sale)
-    out.loc[mask_fill, "original_price"] = promo_from_ctrl[mask_fill]
-
-    # discount_pct (opcional)
-    out["discount_pct"] = pd.NA
-    mask_disc = out["original_price"].notna() & sale.notna() & (out["original_price"] > 0)
-    out.loc[mask_disc, "discount_pct"] = (
-        ((out["original_price"] - sale) / out["original_price"] * 100).round(0)
-    )
+    promo_from_ctrl = out["promo_price_from_ctrl"].astype("Int64")
+
+    mask_fill = (orig.isna() & promo_from_ctrl.notna() & sale.notna() & (promo_from_ctrl > sale)).fillna(False)
+    orig = orig.where(~mask_fill, promo_from_ctrl)
+
+    # "de/por" conferido contra o histórico de preços (mediana/mínimo de 30 dias):
+    # "de" inflado não vira desconto; sem histórico suficiente fica o declarado
+    with PriceHistory(PRICE_HISTORY_FILE) as history:
+        stats = history.stats(out["itemid"], days=PRICE_HISTORY_DAYS)
+    trusted = trusted_discount(sale, orig, stats, out["itemid"], min_days=PRICE_HISTORY_MIN_DAYS)
+    orig = trusted["original_cents"]
+
+    out["sale_price_cents"] = sale
+    out["original_price_cents"] = orig
+    out["original_price"] = cents_to_reais(orig)
+    out["discount_pct"] = trusted["discount_pct"]
+    out["discount_source"] = trusted["discount_source"]
+    out["price_min_30d"] = cents_to_reais(trusted["min_30d_cents"])
+    out["price_median_30d"] = cents_to_reais(trusted["median_30d_cents"])
 
     # remove colunas auxiliares
     out.drop(
@@ -113,7 +92,9 @@ def main():
     )
 
     out.to_csv(PICKS_FILE, index=False, encoding="utf-8")
+    n_hist = int((out["discount_source"] == "historico").sum())
     print(f"OK Step3b: enriquecido {PICKS_FILE} com original_price e discount_pct.")
+    print(f"INFO Step3b: desconto conferido pelo histórico em {n_hist}/{len(out)} picks.")
 
 
 if __name__ == "__main__":
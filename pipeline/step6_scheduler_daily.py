@@ -2,20 +2,35 @@ from __future__ import annotations
 
 import os
 import random
-import time
-from datetime import datetime, date
+import sys
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date, timedelta
 from pathlib import Path
-from io import BytesIO
+from typing import TYPE_CHECKING
 
 import pandas as pd
 from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright
 
-import ctypes
-from ctypes import wintypes
-
-import requests
-from PIL import Image
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.money import column_cents, fix_cents_heuristic, format_brl, parse_brl  # noqa: E402
+from src.price_drops import DropStream  # noqa: E402
+from src.day_queue import DEAD, FAILED, INFLIGHT, SENT, UNCONFIRMED, DayQueue  # noqa: E402
+from src.slot_planner import SlotPlanner, parse_peaks  # noqa: E402
+from src.clock import RealClock, VirtualClock  # noqa: E402
+from src.simulation import FakeSender, Timeline, parse_range, synthetic_picks  # noqa: E402
+from src.senders import DaemonSender, NullSender, PlaywrightSender, Sender  # noqa: E402
+from src.telemetry import EV_DEAD, EV_RETRY, EV_SENT, EV_SKIP, EV_UNCONFIRMED, SendTelemetry  # noqa: E402
+from src.whatsapp_web import WHATSAPP_URL, SendUnconfirmed  # noqa: E402
+
+if TYPE_CHECKING:
+    # só nas anotações: em runtime PIL/requests carregam dentro do main (a simulação não usa)
+    from src.image_cache import ImageCache
+    from src.image_prefetch import ImagePrefetcher
 
 load_dotenv()
 
@@ -30,6 +45,13 @@ WINDOW_END = os.getenv("WA_WINDOW_END", "23:50").strip()
 INTERVALS = [int(x.strip()) for x in os.getenv("WA_INTERVALS", "8,10,12").split(",") if x.strip()]
 JITTER_SECONDS = int(os.getenv("WA_JITTER_SECONDS", "25"))
 
+# Planejador de slots: espalha a meta do dia pela janela (WA_INTERVALS só com WA_SLOT_PLANNER=0)
+SLOT_PLANNER = os.getenv("WA_SLOT_PLANNER", "1").strip().lower() in ("1", "true", "yes", "y")
+# picos com mais envios por hora: "12:00-14:00:2,19:00-22:00:3" (HH:MM-HH:MM:peso)
+PEAKS = os.getenv("WA_PEAKS", "").strip()
+# latência de envio inicial (s); depois vale a média medida
+SEND_LATENCY_S = float(os.getenv("WA_SEND_LATENCY_S", "20"))
+
 DAILY_SENDS = int(os.getenv("WA_DAILY_SENDS", "75"))
 TEST_MODE = os.getenv("WA_TEST_MODE", "0").strip().lower() in ("1", "true", "yes", "y")
 TEST_PICK_ITEMID = os.getenv("WA_TEST_PICK_ITEMID", "").strip()
@@ -41,34 +63,70 @@ HEADLESS = os.getenv("WA_HEADLESS", "0").strip().lower() in ("1", "true", "yes",
 TODAY = date.today().isoformat()
 LEDGER_FILE = Path(os.getenv("WA_SENT_LEDGER", f"outputs/sent_ledger_media_{TODAY}.csv"))
 
+# Fila persistente do dia (retoma após queda do processo) com retentativas
+DAY_QUEUE_FILE = Path(os.getenv("WA_DAY_QUEUE_FILE", f"data/day_queue_{TODAY}.sqlite"))
+SEND_MAX_ATTEMPTS = int(os.getenv("WA_SEND_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF_S = float(os.getenv("WA_RETRY_BACKOFF_S", "120"))
+
+# Fila prioritária: quedas de preço detectadas pelo Step0 entram nos próximos slots do dia
+PRICE_DROPS = os.getenv("WA_PRICE_DROPS", "1").strip().lower() in ("1", "true", "yes", "y")
+PRICE_DROPS_FILE = Path(os.getenv("PRICE_DROPS_FILE", "data/price_drops.jsonl"))
+PRICE_DROPS_MAX_AGE_H = float(os.getenv("WA_PRICE_DROPS_MAX_AGE_H", "12"))
+
+# Imagens dos próximos WA_PREFETCH_AHEAD itens baixadas em segundo plano
+PREFETCH_AHEAD = int(os.getenv("WA_PREFETCH_AHEAD", "3"))
+PREFETCH_WORKERS = int(os.getenv("WA_PREFETCH_WORKERS", "4"))
+IMAGE_TIMEOUT = float(os.getenv("WA_IMAGE_TIMEOUT", "15"))
+
+# Cache em disco das imagens já prontas para colar (compartilhado com o step6_send_one)
+IMAGE_CACHE_DIR = Path(os.getenv("WA_IMAGE_CACHE_DIR", "data/image_cache"))
+IMAGE_CACHE_MAX_MB = int(os.getenv("WA_IMAGE_CACHE_MAX_MB", "500"))
+IMAGE_MAX_SIDE = int(os.getenv("WA_IMAGE_MAX_SIDE", "1280"))
+# variante reduzida pedida ao CDN da Shopee (sufixo no nome do arquivo; vazio = original)
+IMAGE_VARIANT = os.getenv("WA_IMAGE_VARIANT", "_tn").strip()
+# processos para reduzir localmente quando o CDN não tem a variante (0 = na própria thread)
+IMAGE_PROCS = int(os.getenv("WA_IMAGE_PROCS", "2"))
+IMAGE_STATS_FILE = Path(os.getenv("WA_IMAGE_STATS_FILE", "data/image_stats.json"))
+
+# envio pelo daemon (step6_sender_daemon.py) em vez de abrir um browser próprio
+USE_DAEMON = os.getenv("WA_USE_DAEMON", "0").strip().lower() in ("1", "true", "yes", "y")
+# backend de envio: playwright | daemon | null (vazio = daemon se WA_USE_DAEMON=1, senão playwright)
+SENDER = os.getenv("WA_SENDER", "").strip().lower() or ("daemon" if USE_DAEMON else "playwright")
+# página aberta pelo backend playwright (a falsa de tools/fake_whatsapp_server.py para testes)
+WHATSAPP_PAGE_URL = os.getenv("WA_WHATSAPP_URL", WHATSAPP_URL).strip()
+# como a imagem chega no composer: clipboard (Windows, Ctrl+V) | event (paste sintético, qualquer SO)
+PASTE_MODE = os.getenv("WA_PASTE_MODE", "clipboard").strip().lower()
+SEND_QUEUE_FILE = Path(os.getenv("WA_SEND_QUEUE_FILE", "data/send_queue.sqlite"))
+DAEMON_JOB_TIMEOUT = float(os.getenv("WA_DAEMON_JOB_TIMEOUT", "300"))
+
+# limites (ms) das esperas por estado do WhatsApp: grupo na busca, conversa aberta,
+# mídia colada no editor, bolha de saída com relógio/check
+SEARCH_TIMEOUT_MS = int(os.getenv("WA_SEARCH_TIMEOUT_MS", "10000"))
+CHAT_TIMEOUT_MS = int(os.getenv("WA_CHAT_TIMEOUT_MS", "30000"))
+MEDIA_TIMEOUT_MS = int(os.getenv("WA_MEDIA_TIMEOUT_MS", "15000"))
+SEND_TIMEOUT_MS = int(os.getenv("WA_SEND_TIMEOUT_MS", "20000"))
+
+# Telemetria: um evento JSONL por tentativa (fases em ms) + resumo do dia (p50/p95 por fase,
+# envios x meta, tempo perdido em falhas), uma linha por dia no CSV
+TELEMETRY_FILE = Path(os.getenv("WA_TELEMETRY_FILE", f"outputs/send_events_{TODAY}.jsonl"))
+TELEMETRY_SUMMARY_FILE = Path(os.getenv("WA_TELEMETRY_SUMMARY", "outputs/send_summary_daily.csv"))
+
+# Simulação: relógio virtual + envio falso, nada sai para o WhatsApp e nada é gravado no
+# ledger; um dia inteiro roda em segundos e gera a linha do tempo em CSV
+SIMULATE = os.getenv("WA_SIMULATE", "0").strip().lower() in ("1", "true", "yes", "y")
+SIM_START = os.getenv("WA_SIM_START", "").strip()  # HH:MM em que o processo "sobe" (vazio = 1h antes da janela)
+SIM_ITEMS = int(os.getenv("WA_SIM_ITEMS", "0"))  # picks sintéticos (0 = meta + 10)
+SIM_LATENCY_S = os.getenv("WA_SIM_LATENCY_S", "8-40").strip()  # latência de envio sorteada nesse intervalo
+SIM_FAIL_RATE = float(os.getenv("WA_SIM_FAIL_RATE", "0.05"))
+SIM_SEED = int(os.getenv("WA_SIM_SEED", "42"))
+SIM_TIMELINE_FILE = Path(os.getenv("WA_SIM_TIMELINE", f"outputs/sim_timeline_{TODAY}.csv"))
+
 # CTA
 CTA_LINE = os.getenv("WA_CTA_LINE", "👀 Olha o preço!").strip() or "👀 Olha o preço!"
 
 
-# ==========================
-# Windows Clipboard (CF_DIB)
-# ==========================
-user32 = ctypes.WinDLL("user32", use_last_error=True)
-kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
-
-CF_DIB = 8
-GMEM_MOVEABLE = 0x0002
-
-user32.OpenClipboard.argtypes = [wintypes.HWND]
-user32.OpenClipboard.restype = wintypes.BOOL
-user32.CloseClipboard.argtypes = []
-user32.CloseClipboard.restype = wintypes.BOOL
-user32.EmptyClipboard.argtypes = []
-user32.EmptyClipboard.restype = wintypes.BOOL
-user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
-user32.SetClipboardData.restype = wintypes.HANDLE
-
-kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
-kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
-kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
-kernel32.GlobalLock.restype = ctypes.c_void_p
-kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
-kernel32.GlobalUnlock.restype = wintypes.BOOL
+# relógio de tudo que espera/compara horário (VirtualClock na simulação)
+CLOCK = RealClock()
 
 
 def _safe_str(x) -> str:
@@ -84,7 +142,7 @@ def _safe_str(x) -> str:
 
 def _to_float(x):
     """
-    Converte preço/rating vindo como:
+    Converte rating/desconto vindo como:
     - float/int (pandas)
     - "77,89"
     - "77.89"
@@ -122,77 +180,25 @@ def _to_float(x):
         return None
 
 
-def _fix_cents_if_needed(v: float | None) -> float | None:
+def _add_price_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Heurística anti-"centavos":
-    Se vier 7789 (deveria ser 77.89), converte para 77.89.
-    Regra: valores muito altos e divisíveis por 1 centavo comum.
+    Preços em centavos (uma passada vetorizada no CSV inteiro, com a heurística
+    anti-"centavos": 7789 -> 77,89). As legendas só leem essas colunas.
     """
-    if v is None:
+    df["sale_price_cents"] = fix_cents_heuristic(column_cents(df, "sale_price"))
+    df["original_price_cents"] = fix_cents_heuristic(column_cents(df, "original_price"))
+    return df
+
+
+def _row_cents(row: dict, col: str) -> int | None:
+    v = row.get(f"{col}_cents")
+    if v is not None and not pd.isna(v):
+        return int(v)
+    # linha montada à mão (sem _add_price_columns)
+    c = parse_brl(row.get(col))
+    if c is None:
         return None
-    # Se vier preço absurdo para Shopee (ex: > 5000), tenta dividir por 100
-    if v >= 5000:
-        vv = v / 100.0
-        # Só aceita se o valor virar algo plausível (>0 e <5000)
-        if 0 < vv < 5000:
-            return vv
-    return v
-
-
-def _format_brl(v) -> str:
-    f = _to_float(v)
-    if f is None:
-        return ""
-    f = _fix_cents_if_needed(f)
-    return f"{f:.2f}".replace(".", ",")
-
-
-def _winerr(msg: str) -> RuntimeError:
-    err = ctypes.get_last_error()
-    return RuntimeError(f"{msg} (winerr={err})")
-
-
-def set_clipboard_image_from_pil(img: Image.Image) -> None:
-    """
-    Coloca uma imagem (PIL) no clipboard como CF_DIB (Windows).
-    """
-    if img.mode != "RGB":
-        img = img.convert("RGB")
-
-    with BytesIO() as output:
-        img.save(output, "BMP")
-        data = output.getvalue()[14:]  # remove BMP file header, mantém DIB
-
-    if not user32.OpenClipboard(None):
-        raise _winerr("OpenClipboard falhou")
-    try:
-        if not user32.EmptyClipboard():
-            raise _winerr("EmptyClipboard falhou")
-
-        hglob = kernel32.GlobalAlloc(GMEM_MOVEABLE, len(data))
-        if not hglob:
-            raise _winerr("GlobalAlloc falhou")
-
-        ptr = kernel32.GlobalLock(hglob)
-        if not ptr:
-            raise _winerr("GlobalLock falhou")
-
-        try:
-            ctypes.memmove(ptr, data, len(data))
-        finally:
-            kernel32.GlobalUnlock(hglob)
-
-        if not user32.SetClipboardData(CF_DIB, hglob):
-            raise _winerr("SetClipboardData falhou")
-    finally:
-        user32.CloseClipboard()
-
-
-def download_image_force_rgb(image_url: str) -> Image.Image:
-    headers = {"User-Agent": "Mozilla/5.0"}
-    r = requests.get(image_url, headers=headers, timeout=30)
-    r.raise_for_status()
-    return Image.open(BytesIO(r.content)).convert("RGB")
+    return int(fix_cents_heuristic(pd.Series([c])).iloc[0])
 
 
 # ==========================
@@ -230,12 +236,157 @@ def _append_ledger(itemid: str):
     df.to_csv(LEDGER_FILE, index=False, encoding="utf-8")
 
 
+# ==========================
+# Fila prioritária (quedas de preço)
+# ==========================
+def _drop_row(ev: dict) -> dict:
+    """Evento do stream -> linha no formato do CSV de picks (preço anterior vira o "de")."""
+    return {
+        "itemid": str(ev.get("itemid", "")).strip(),
+        "title": ev.get("title", ""),
+        "sale_price": ev.get("sale_price", ""),
+        "sale_price_cents": ev.get("sale_price_cents"),
+        "original_price_cents": ev.get("original_price_cents"),
+        "discount_pct": ev.get("discount_pct", ""),
+        "image_link": ev.get("image_link", ""),
+        "product_link": ev.get("product_link", ""),
+        "_priority": True,
+    }
+
+
+def _fast_track(queue: deque, stream: DropStream, skip: set[str]) -> int:
+    """
+    Quedas novas no stream vão para a frente da fila (maior queda primeiro). Item que já
+    estava na fila sobe para a frente; item em `skip` (enviado, sem confirmação, em envio ou
+    dead hoje) é ignorado. O offset é gravado
+    ao ler (no máximo uma vez: se o processo cair, a queda não volta).
+    """
+    events = stream.poll()
+    if not events:
+        return 0
+    stream.commit()
+
+    queued = {_safe_str(r.get("itemid")): r for r in queue}
+    fresh: list[dict] = []
+    seen: set[str] = set()
+    for ev in events:
+        iid = str(ev.get("itemid", "")).strip()
+        if iid and iid not in skip and iid not in seen:
+            seen.add(iid)
+            # já estava na fila: mantém o que a linha do CSV tinha (link curto etc.)
+            fresh.append({**queued.get(iid, {}), **_drop_row(ev)})
+    if not fresh:
+        return 0
+
+    rest = [r for r in queue if _safe_str(r.get("itemid")) not in seen]
+    queue.clear()
+    queue.extend(fresh + rest)
+    return len(fresh)
+
+
+def _row_image(row: dict) -> str:
+    return _safe_str(row.get("image_link") or row.get("imageUrl") or row.get("image_url"))
+
+
+def _prefetch_ahead(
+    queue: deque, prefetcher: ImagePrefetcher | None, ahead: int, day_queue: DayQueue | None = None
+) -> list[str]:
+    """
+    Tira da fila os itens (entre os próximos `ahead`) cuja imagem já se mostrou morta
+    (marcados dead na fila do dia) e dispara o download dos próximos `ahead`.
+    Retorna os itemid descartados.
+    """
+    if prefetcher is None:
+        return []
+    dropped: list[str] = []
+    keep: list[dict] = []
+    n_checked = 0
+    while queue and n_checked < ahead:
+        row = queue.popleft()
+        url = _row_image(row)
+        if url and prefetcher.status(url) == "dead":
+            print(f"[SKIP] item {_safe_str(row.get('itemid'))}: {prefetcher.error(url)}", flush=True)
+            if day_queue is not None:
+                day_queue.mark_dead(_safe_str(row.get("itemid")), f"imagem: {prefetcher.error(url)}")
+            prefetcher.discard(url)
+            dropped.append(_safe_str(row.get("itemid")))
+            continue
+        keep.append(row)
+        n_checked += 1
+    queue.extendleft(reversed(keep))
+    for row in keep:
+        prefetcher.prefetch(_row_image(row))
+    return dropped
+
+
+def _pop_ready(queue: deque) -> dict | None:
+    """Tira e devolve o primeiro item que não está esperando backoff de retentativa."""
+    now = CLOCK.time()
+    for i, row in enumerate(queue):
+        if float(row.get("_next_try") or 0) <= now:
+            del queue[i]
+            return row
+    return None
+
+
+def _report_queue(day_queue: DayQueue, slots: int) -> None:
+    c = day_queue.counts()
+    print(
+        f"[FILA] {c[SENT]}/{slots} enviados | slots perdidos: {max(0, slots - c[SENT] - c[UNCONFIRMED])} | "
+        f"sem confirmação: {c[UNCONFIRMED]} | mortos: {c[DEAD]} | aguardando retentativa: {c[FAILED]} | "
+        f"tentativas falhas: {day_queue.failed_attempts()}",
+        flush=True,
+    )
+
+
+def _report_images(prefetcher: ImagePrefetcher, image_cache: ImageCache) -> None:
+    """Resumo das imagens desta execução + acumulado do dia (bytes economizados)."""
+    st = prefetcher.stats
+    day = st.save_daily(IMAGE_STATS_FILE, TODAY)
+    c = st.counts
+    print(
+        f"[IMG] {c['images']} imagens | {c['cache_hits']} do cache | {c['variants']} variante CDN "
+        f"({c['variant_fallbacks']} sem variante) | {image_cache.downscaled} reduzidas localmente | "
+        f"{c['bytes_downloaded'] / 1e6:.1f} MB baixados, {st.bytes_saved / 1e6:.1f} MB economizados",
+        flush=True,
+    )
+    print(
+        f"[IMG] hoje: {day.get('bytes_downloaded', 0) / 1e6:.1f} MB baixados | "
+        f"{day.get('bytes_saved', 0) / 1e6:.1f} MB economizados",
+        flush=True,
+    )
+
+
+def _report_telemetry(telemetry: SendTelemetry, target: int) -> None:
+    """Resumo do dia (todas as execuções de hoje) no log e no CSV de resumos diários."""
+    summary = telemetry.summary(target)
+    for line in telemetry.lines(summary):
+        print(f"[TEL] {line}", flush=True)
+    if telemetry.path is not None:
+        telemetry.save_daily(TELEMETRY_SUMMARY_FILE, summary)
+        print(f"[TEL] Eventos: {telemetry.path} | resumo diário: {TELEMETRY_SUMMARY_FILE}", flush=True)
+
+
 # ==========================
 # Window / timing
 # ==========================
+def _wait_next(planner: SlotPlanner | None, rng: random.Random, t_send: float, remaining: int) -> float:
+    """Segundos até o próximo envio (slot planejado ou WA_INTERVALS + jitter)."""
+    if planner is not None:
+        # replaneja do agora: atraso deste envio se dilui nos intervalos restantes
+        planner.observe(CLOCK.monotonic() - t_send)
+        nxt = planner.next_slot(CLOCK.now(), remaining)
+        wait_sec = max(0.0, (nxt - CLOCK.now()).total_seconds())
+        print(f"[WAIT] Próximo às {nxt:%H:%M:%S} (~{wait_sec / 60:.1f} min | faltam {remaining}).", flush=True)
+        return wait_sec
+    wait_min = rng.choice(INTERVALS)
+    print(f"[WAIT] Próximo em ~{wait_min} min (± jitter).", flush=True)
+    return wait_min * 60 + rng.randint(0, JITTER_SECONDS)
+
+
 def _parse_hhmm(t: str) -> datetime:
     h, m = [int(x) for x in t.split(":")]
-    now = datetime.now()
+    now = CLOCK.now()
     return now.replace(hour=h, minute=m, second=0, microsecond=0)
 
 
@@ -246,12 +397,12 @@ def _in_window(now: datetime) -> bool:
 
 
 def _sleep_to_window_start():
-    now = datetime.now()
+    now = CLOCK.now()
     start = _parse_hhmm(WINDOW_START)
     if now < start:
         secs = (start - now).total_seconds()
         print(f"[WAIT] Fora da janela. Dormindo até {WINDOW_START} ({int(secs)}s).", flush=True)
-        time.sleep(secs)
+        CLOCK.sleep(secs)
 
 
 # ==========================
@@ -262,8 +413,8 @@ def build_caption(row: dict) -> str:
 
     link = _safe_str(row.get("product_short_link") or row.get("product_link"))
 
-    sale_val = _fix_cents_if_needed(_to_float(row.get("sale_price")))
-    orig_val = _fix_cents_if_needed(_to_float(row.get("original_price")))
+    sale_val = _row_cents(row, "sale_price")
+    orig_val = _row_cents(row, "original_price")
     disc_in = _to_float(row.get("discount_pct"))
 
     rating_val = _to_float(row.get("rating"))
@@ -284,7 +435,7 @@ def build_caption(row: dict) -> str:
         lines.append(f"🔥 {title}")
 
     if sale_val is not None:
-        price_txt = f"R$ {_format_brl(sale_val)}"
+        price_txt = f"R$ {format_brl(sale_val)}"
         if disc_pct is not None:
             lines.append(f"💰 {price_txt} (-{disc_pct}%)")
         else:
@@ -307,93 +458,49 @@ def build_caption(row: dict) -> str:
 
 
 # ==========================
-# WhatsApp Web automation
+# Main
 # ==========================
-def open_whatsapp_and_group(page, group_name: str) -> None:
-    page.goto("https://web.whatsapp.com/", wait_until="domcontentloaded")
-    page.wait_for_selector("#pane-side, div[role='textbox']", timeout=120_000)
-
-    for sel in [
-        "div[contenteditable='true'][data-tab='3']",
-        "div[role='textbox'][contenteditable='true']",
-        "#side div[contenteditable='true']",
-        "div[contenteditable='true']",
-    ]:
-        try:
-            loc = page.locator(sel).first
-            if loc.count() > 0:
-                loc.click(timeout=2500)
-                break
-        except Exception:
-            pass
-
-    page.keyboard.type(group_name, delay=25)
-    page.wait_for_timeout(900)
-    page.keyboard.press("Enter")
-    page.wait_for_timeout(1200)
-
-    page.wait_for_selector("footer div[role='textbox']", timeout=30_000)
-
-
-def focus_footer_box(page) -> None:
-    try:
-        page.locator("footer div[role='textbox']").last.focus(timeout=2500)
-        return
-    except Exception:
-        pass
-
-    try:
-        page.locator("footer").first.click(timeout=2000, position={"x": 260, "y": 20})
-    except Exception:
-        pass
-
-
-def type_multiline_shift_enter(page, text: str) -> None:
-    lines = text.splitlines()
-    if not lines:
-        return
-
-    page.keyboard.type(lines[0], delay=10)
-    for line in lines[1:]:
-        page.keyboard.down("Shift")
-        page.keyboard.press("Enter")
-        page.keyboard.up("Shift")
-        if line:
-            page.keyboard.type(line, delay=10)
-
-
-def send_image_with_caption_via_clipboard(page, image_url: str, caption: str) -> None:
-    img = download_image_force_rgb(image_url)
-    set_clipboard_image_from_pil(img)
-
-    focus_footer_box(page)
-    page.keyboard.press("Control+V")
-
-    page.wait_for_timeout(1200)
-
-    type_multiline_shift_enter(page, caption)
-
-    page.keyboard.press("Enter")
-    page.wait_for_timeout(1200)
-
-
-def send_text_only(page, caption: str) -> None:
-    focus_footer_box(page)
-    type_multiline_shift_enter(page, caption)
-    page.keyboard.press("Enter")
-    page.wait_for_timeout(800)
+def _sim_start() -> datetime:
+    """Instante inicial do relógio virtual: WA_SIM_START ou 1h antes da janela (testa a espera)."""
+    start = _parse_hhmm(SIM_START or WINDOW_START)
+    return start if SIM_START else start - timedelta(hours=1)
+
+
+def _make_sender() -> Sender:
+    """Backend de envio conforme WA_SIMULATE / WA_SENDER."""
+    if SIMULATE:
+        return FakeSender(CLOCK, parse_range(SIM_LATENCY_S, (8.0, 40.0)), fail_rate=SIM_FAIL_RATE, seed=SIM_SEED)
+    if SENDER == "playwright":
+        return PlaywrightSender(
+            url=WHATSAPP_PAGE_URL,
+            profile_dir=PROFILE_DIR,
+            headless=HEADLESS,
+            paste=PASTE_MODE,
+            search_timeout_ms=SEARCH_TIMEOUT_MS,
+            chat_timeout_ms=CHAT_TIMEOUT_MS,
+            media_timeout_ms=MEDIA_TIMEOUT_MS,
+            send_timeout_ms=SEND_TIMEOUT_MS,
+        )
+    if SENDER == "daemon":
+        return DaemonSender(SEND_QUEUE_FILE, timeout=DAEMON_JOB_TIMEOUT)
+    if SENDER == "null":
+        return NullSender()
+    raise RuntimeError(f"WA_SENDER inválido: {SENDER!r} (playwright | daemon | null)")
 
 
-# ==========================
-# Main
-# ==========================
 def main():
-    if not GROUP_NAME:
+    global CLOCK
+    if SIMULATE:
+        CLOCK = VirtualClock(_sim_start())
+    elif not GROUP_NAME:
         raise RuntimeError("Defina WA_GROUP_NAME.")
-    if not PICKS_FILE.exists():
-        raise RuntimeError(f"Não encontrei PICKS_FILE: {PICKS_FILE}")
 
-    df = pd.read_csv(PICKS_FILE)
+    if SIMULATE:
+        df = pd.DataFrame(synthetic_picks(SIM_ITEMS or DAILY_SENDS + 10))
+    elif not PICKS_FILE.exists():
+        raise RuntimeError(f"Não encontrei PICKS_FILE: {PICKS_FILE}")
+    else:
+        df = pd.read_csv(PICKS_FILE)
 
     if "itemid" not in df.columns:
         raise RuntimeError("CSV não tem coluna itemid.")
@@ -416,8 +523,9 @@ def main():
             df[col] = ""
 
     df["itemid"] = df["itemid"].astype(str).fillna("").str.strip()
+    df = _add_price_columns(df)
 
-    sent_today = _load_ledger_today()
+    sent_today = set() if SIMULATE else _load_ledger_today()
 
     if TEST_PICK_ITEMID:
         df = df[df["itemid"] == TEST_PICK_ITEMID]
@@ -433,63 +541,245 @@ def main():
 
     to_send = df.head(1 if TEST_MODE else DAILY_SENDS).to_dict(orient="records")
 
+    # simulação, WA_SENDER=null e a página falsa não enviam de verdade: sem ledger nem fila em disco
+    dry_run = SIMULATE or SENDER == "null" or WHATSAPP_PAGE_URL != WHATSAPP_URL
+    # fila persistente do dia: um reinício no mesmo dia retoma os mesmos slots e a mesma ordem
+    testing = TEST_MODE or bool(TEST_PICK_ITEMID) or dry_run
+    day_queue = DayQueue(
+        ":memory:" if testing else DAY_QUEUE_FILE,
+        max_attempts=SEND_MAX_ATTEMPTS,
+        backoff_s=RETRY_BACKOFF_S,
+        clock=CLOCK.time,
+    )
+    resumed = day_queue.resume(sent_today) if not testing else {"recovered_sent": 0, "unconfirmed": 0}
+    n_new = day_queue.load(to_send, slots=len(to_send))
+    slots = day_queue.slots
+    n_sent = day_queue.counts()[SENT]
+
     print("=== STEP6 DAILY SCHEDULER (MEDIA) ===", flush=True)
     print(f"Grupo:     {GROUP_NAME}", flush=True)
     print(f"Picks:     {PICKS_FILE}", flush=True)
     print(f"Ledger:    {LEDGER_FILE} (diário)", flush=True)
     print(f"Janela:    {WINDOW_START} -> {WINDOW_END}", flush=True)
-    print(f"Envios:    {len(to_send)} | Test={TEST_MODE}", flush=True)
-    print(f"Intervals: {INTERVALS} min | jitter={JITTER_SECONDS}s", flush=True)
+    print(f"Envios:    {slots - n_sent} de {slots} | Test={TEST_MODE}", flush=True)
+    if SIMULATE:
+        print(
+            f"SIMULAÇÃO: início {CLOCK.now():%H:%M} | latência {SIM_LATENCY_S}s | "
+            f"falhas {SIM_FAIL_RATE:.0%} | seed {SIM_SEED}",
+            flush=True,
+        )
+    if not testing:
+        print(
+            f"Fila dia:  {DAY_QUEUE_FILE} | {n_sent} já enviados, {n_new} novos, "
+            f"{resumed['unconfirmed']} interrompidos no envio (sem confirmação, não reenviados)",
+            flush=True,
+        )
+    if SLOT_PLANNER:
+        print(f"Slots:     planejados na janela | jitter={JITTER_SECONDS}s | picos={PEAKS or '-'}", flush=True)
+    else:
+        print(f"Intervals: {INTERVALS} min | jitter={JITTER_SECONDS}s", flush=True)
     print("====================================", flush=True)
 
     _sleep_to_window_start()
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch_persistent_context(
-            user_data_dir=PROFILE_DIR,
-            headless=HEADLESS,
-            args=["--disable-blink-features=AutomationControlled"],
+    rng = random.Random(SIM_SEED) if SIMULATE else random.Random()
+    planner = None
+    if SLOT_PLANNER and not TEST_MODE:
+        planner = SlotPlanner(
+            _parse_hhmm(WINDOW_START), _parse_hhmm(WINDOW_END),
+            jitter_s=JITTER_SECONDS, peaks=parse_peaks(PEAKS), latency_s=SEND_LATENCY_S, rng=rng,
         )
-        page = browser.new_page()
-
-        print("[LOGIN] Se necessário, escaneie o QR.", flush=True)
-        open_whatsapp_and_group(page, GROUP_NAME)
-        print("[OK] Grupo aberto.", flush=True)
-
-        for idx, row in enumerate(to_send, start=1):
-            now = datetime.now()
+        todo = slots - n_sent
+        plan = planner.plan(CLOCK.now(), todo, first=True)
+        if plan:
+            gap = (plan[-1] - plan[0]).total_seconds() / max(1, len(plan) - 1) / 60
+            print(
+                f"[PLAN] {len(plan)} envios {plan[0]:%H:%M} -> {plan[-1]:%H:%M} | "
+                f"intervalo médio {gap:.1f} min | picos: {PEAKS or '-'}",
+                flush=True,
+            )
+        fits = planner.fits(CLOCK.now(), todo, first=True)
+        if fits < todo:
+            print(f"[WARN] Só cabem {fits} de {todo} envios no que resta da janela.", flush=True)
+
+    # execuções de teste medem igual, mas não entram no histórico do dia
+    telemetry = SendTelemetry(None if testing else TELEMETRY_FILE, TODAY)
+
+    with ExitStack() as stack:
+        timeline = Timeline() if SIMULATE else None
+        sender = _make_sender()
+        stack.callback(sender.close)
+        if sender.name == "playwright":
+            print(f"[LOGIN] Se necessário, escaneie o QR. ({WHATSAPP_PAGE_URL} | paste={PASTE_MODE})", flush=True)
+        sender.open(GROUP_NAME)
+        if sender.name == "daemon":
+            # o daemon (step6_sender_daemon.py) já está com o WhatsApp aberto: só enfileira
+            print(f"[OK] Envios pela fila do daemon: {SEND_QUEUE_FILE}", flush=True)
+        elif sender.name == "playwright":
+            print("[OK] Grupo aberto.", flush=True)
+        elif sender.name == "null":
+            print("[OK] WA_SENDER=null: nada é enviado de verdade.", flush=True)
+
+        # fila do dia: os slots são fixos; quedas de preço furam a fila e empurram os
+        # últimos picks para fora do dia
+        queue = deque(day_queue.pending_rows())
+        drops = None
+        if PRICE_DROPS and not (TEST_MODE or TEST_PICK_ITEMID or dry_run):
+            drops = DropStream(PRICE_DROPS_FILE, max_age_h=PRICE_DROPS_MAX_AGE_H)
+
+        # imagens (PIL/requests só carregam aqui: a simulação não precisa deles)
+        image_pool = image_cache = prefetcher = None
+        if not SIMULATE:
+            from src.image_cache import ImageCache
+            from src.image_prefetch import ImageFetchError, ImagePrefetcher
+
+            # no ExitStack (fecha na ordem inversa, inclusive se o loop estourar): prefetch
+            # termina os downloads em andamento antes do cache fechar, cache antes do pool
+            if IMAGE_PROCS > 0:
+                image_pool = ProcessPoolExecutor(max_workers=IMAGE_PROCS)
+                stack.callback(image_pool.shutdown, cancel_futures=True)
+            image_cache = ImageCache(
+                IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024, max_side=IMAGE_MAX_SIDE, pool=image_pool
+            )
+            stack.callback(image_cache.close)
+            prefetcher = ImagePrefetcher(
+                image_cache, workers=PREFETCH_WORKERS, timeout=IMAGE_TIMEOUT, variant=IMAGE_VARIANT,
+                kind=sender.payload_kind,
+            )
+            stack.callback(prefetcher.close)
+            _prefetch_ahead(queue, prefetcher, PREFETCH_AHEAD, day_queue)
+
+        # slots gastos = envios feitos (falha não gasta slot: o item volta com backoff)
+        idx = n_sent
+        while queue and idx < slots:
+            now = CLOCK.now()
             if not _in_window(now):
                 print("[STOP] Fora da janela, encerrando.", flush=True)
                 break
 
+            if drops is not None:
+                # fora: já enviado (ledger ou fila do dia), sem confirmação, em envio ou dead
+                done = day_queue.itemids(SENT, UNCONFIRMED, INFLIGHT, DEAD)
+                n_fast = _fast_track(queue, drops, sent_today | done)
+                if n_fast:
+                    day_queue.push_front(list(queue)[:n_fast])
+                    print(f"[DROP] {n_fast} queda(s) de preço na frente da fila.", flush=True)
+
+            # imagens mortas saem antes da vez delas (sem gastar slot)
+            _prefetch_ahead(queue, prefetcher, PREFETCH_AHEAD, day_queue)
+            if not queue:
+                break
+            row = _pop_ready(queue)
+            if row is None:
+                # só sobraram retentativas esperando o backoff
+                wait_sec = max(1.0, min(float(r["_next_try"]) for r in queue) - CLOCK.time())
+                print(f"[WAIT] Só retentativas na fila; próxima em {wait_sec:.0f}s.", flush=True)
+                CLOCK.sleep(wait_sec)
+                continue
+
             itemid = _safe_str(row.get("itemid"))
-            image_url = _safe_str(row.get("image_link") or row.get("imageUrl") or row.get("image_url"))
+            image_url = _row_image(row)
             caption = build_caption(row)
 
+            image = None
+            phases = {}
+            if image_url and prefetcher is not None:
+                t_img = CLOCK.monotonic()
+                try:
+                    image = prefetcher.get(image_url)
+                except ImageFetchError as e:
+                    print(f"[SKIP] item {itemid}: {e}", flush=True)
+                    day_queue.mark_dead(itemid, f"imagem: {e}")
+                    telemetry.record(CLOCK.now(), EV_SKIP, itemid, CLOCK.monotonic() - t_img, error=str(e))
+                    continue
+                finally:
+                    # download/decode/encode (prefetch) + quanto o envio esperou a imagem
+                    phases = prefetcher.phases(image_url)
+                    phases["imagem"] = (CLOCK.monotonic() - t_img) * 1000
+                    prefetcher.discard(image_url)
+            # enquanto este envio acontece (e durante a espera), as próximas imagens baixam
+            _prefetch_ahead(queue, prefetcher, PREFETCH_AHEAD, day_queue)
+
+            if not day_queue.mark_inflight(itemid):
+                # a linha na memória ficou velha (item já saiu, dead ou em envio): não reenvia
+                print(f"[SKIP] item {itemid}: já resolvido na fila do dia, não reenvia.", flush=True)
+                continue
+            t_send = CLOCK.monotonic()
+            sent_at = CLOCK.now()
             try:
-                if image_url:
-                    send_image_with_caption_via_clipboard(page, image_url, caption)
-                else:
-                    send_text_only(page, caption)
-
-                if not TEST_PICK_ITEMID:
-                    _append_ledger(itemid)
-
-                print(f"[SENT] {idx}/{len(to_send)} item {itemid}", flush=True)
-
+                # o daemon lê a imagem do cache em disco que o prefetch acabou de preencher
+                timer = sender.send(
+                    caption, image, itemid=itemid, image_url=image_url,
+                    priority=1 if row.get("_priority") else 0,
+                )
+            except SendUnconfirmed as e:
+                # Enter já foi: reenviar arriscaria postar duas vezes. Gasta o slot e segue.
+                day_queue.mark_unconfirmed(itemid, str(e))
+                idx += 1
+                sent_today.add(itemid)
+                telemetry.record(
+                    sent_at, EV_UNCONFIRMED, itemid, CLOCK.monotonic() - t_send, phases, error=str(e), phase=e.phase
+                )
+                if timeline is not None:
+                    timeline.add(sent_at, "unconfirmed", itemid, CLOCK.monotonic() - t_send, str(e))
+                print(f"[UNCONFIRMED] {idx}/{slots} item {itemid}: {e} (não será reenviado)", flush=True)
                 if TEST_MODE:
-                    print("✅ Test mode: parando após 1 envio.", flush=True)
                     break
-
-                wait_min = random.choice(INTERVALS)
-                wait_sec = wait_min * 60 + random.randint(0, JITTER_SECONDS)
-                print(f"[WAIT] Próximo em ~{wait_min} min (± jitter).", flush=True)
-                time.sleep(wait_sec)
-
+                remaining = min(slots - idx, len(queue))
+                if remaining > 0:
+                    CLOCK.sleep(_wait_next(planner, rng, t_send, remaining))
+                continue
             except Exception as e:
-                print(f"[ERR] item {itemid}: {e}", flush=True)
+                next_try = day_queue.mark_failed(itemid, f"{type(e).__name__}: {e}")
+                telemetry.record(
+                    sent_at, EV_DEAD if next_try is None else EV_RETRY, itemid, CLOCK.monotonic() - t_send,
+                    phases, error=f"{type(e).__name__}: {e}", phase=getattr(e, "phase", ""),
+                )
+                if timeline is not None:
+                    timeline.add(
+                        sent_at, "dead" if next_try is None else "retry", itemid, CLOCK.monotonic() - t_send, str(e)
+                    )
+                if next_try is None:
+                    print(f"[DEAD] item {itemid}: {e} (tentativas esgotadas)", flush=True)
+                else:
+                    row["_next_try"] = next_try
+                    queue.appendleft(row)
+                    print(f"[RETRY] item {itemid}: {e} | nova tentativa em {max(0.0, next_try - CLOCK.time()):.0f}s", flush=True)
+                continue
+
+            day_queue.mark_sent(itemid)
+            idx += 1
+            telemetry.record(sent_at, EV_SENT, itemid, CLOCK.monotonic() - t_send, {**phases, **timer.phases})
+            if timeline is not None:
+                timeline.add(sent_at, "sent", itemid, CLOCK.monotonic() - t_send)
+            if not (TEST_PICK_ITEMID or dry_run):
+                _append_ledger(itemid)
+                sent_today.add(itemid)
+
+            tag = " (queda de preço)" if row.get("_priority") else ""
+            print(f"[SENT] {idx}/{slots} item {itemid}{tag} | {timer.summary()}", flush=True)
+
+            if TEST_MODE:
+                print("✅ Test mode: parando após 1 envio.", flush=True)
+                break
 
-        browser.close()
+            remaining = min(slots - idx, len(queue))
+            if remaining <= 0:
+                continue
+            CLOCK.sleep(_wait_next(planner, rng, t_send, remaining))
+
+        _report_queue(day_queue, slots)
+        day_queue.close()
+        _report_telemetry(telemetry, slots if TEST_MODE else DAILY_SENDS)
+        if prefetcher is not None:
+            # espera os downloads em andamento para o resumo sair completo (o ExitStack fecha o resto)
+            prefetcher.close()
+            _report_images(prefetcher, image_cache)
+        if timeline is not None:
+            timeline.save_csv(SIM_TIMELINE_FILE)
+            for line in timeline.summary(slots, _parse_hhmm(WINDOW_END)):
+                print(f"[SIM] {line}", flush=True)
+            print(f"[SIM] Linha do tempo: {SIM_TIMELINE_FILE}", flush=True)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,23 @@
 from __future__ import annotations
 
 import os
+import sys
 from pathlib import Path
-from io import BytesIO
 
 import pandas as pd
 from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright
-
-import ctypes
-from ctypes import wintypes
 
 import requests
-from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.money import parse_brl, format_brl  # noqa: E402
+from src.send_queue import QueueSender, SendQueue  # noqa: E402
+from src.whatsapp_web import open_whatsapp_and_group, send_image_with_caption_via_clipboard  # noqa: E402
+from src.image_cache import ImageCache  # noqa: E402
+from src.image_prefetch import ImageStats, fetch_payload  # noqa: E402
 
 
 load_dotenv()
@@ -24,28 +29,22 @@ WA_HEADLESS = os.getenv("WA_HEADLESS", "0").strip().lower() in ("1", "true")
 PICKS_FILE = Path(os.getenv("WA_PICKS_FILE", r"outputs\picks_refinados_com_links.csv"))
 TEST_ITEMID = os.getenv("WA_TEST_PICK_ITEMID", "").strip()
 
-# ===== Windows Clipboard (CF_DIB) safe bindings =====
-user32 = ctypes.WinDLL("user32", use_last_error=True)
-kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
-
-CF_DIB = 8
-GMEM_MOVEABLE = 0x0002
+# Mesmo cache de imagens do scheduler (item já enviado antes = só ler o DIB do disco)
+IMAGE_CACHE_DIR = Path(os.getenv("WA_IMAGE_CACHE_DIR", "data/image_cache"))
+IMAGE_CACHE_MAX_MB = int(os.getenv("WA_IMAGE_CACHE_MAX_MB", "500"))
+IMAGE_MAX_SIDE = int(os.getenv("WA_IMAGE_MAX_SIDE", "1280"))
+IMAGE_VARIANT = os.getenv("WA_IMAGE_VARIANT", "_tn").strip()
 
-user32.OpenClipboard.argtypes = [wintypes.HWND]
-user32.OpenClipboard.restype = wintypes.BOOL
-user32.CloseClipboard.argtypes = []
-user32.CloseClipboard.restype = wintypes.BOOL
-user32.EmptyClipboard.argtypes = []
-user32.EmptyClipboard.restype = wintypes.BOOL
-user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
-user32.SetClipboardData.restype = wintypes.HANDLE
+# envio pelo daemon (step6_sender_daemon.py) em vez de abrir um browser próprio
+USE_DAEMON = os.getenv("WA_USE_DAEMON", "0").strip().lower() in ("1", "true", "yes", "y")
+SEND_QUEUE_FILE = Path(os.getenv("WA_SEND_QUEUE_FILE", "data/send_queue.sqlite"))
+DAEMON_JOB_TIMEOUT = float(os.getenv("WA_DAEMON_JOB_TIMEOUT", "300"))
 
-kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
-kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
-kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
-kernel32.GlobalLock.restype = ctypes.c_void_p
-kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
-kernel32.GlobalUnlock.restype = wintypes.BOOL
+# limites (ms) das esperas por estado do WhatsApp (mesmas variáveis do scheduler)
+SEARCH_TIMEOUT_MS = int(os.getenv("WA_SEARCH_TIMEOUT_MS", "10000"))
+CHAT_TIMEOUT_MS = int(os.getenv("WA_CHAT_TIMEOUT_MS", "30000"))
+MEDIA_TIMEOUT_MS = int(os.getenv("WA_MEDIA_TIMEOUT_MS", "15000"))
+SEND_TIMEOUT_MS = int(os.getenv("WA_SEND_TIMEOUT_MS", "20000"))
 
 
 def _safe_str(v) -> str:
@@ -59,67 +58,15 @@ def _safe_str(v) -> str:
     return str(v).strip()
 
 
-def _winerr(msg: str) -> RuntimeError:
-    err = ctypes.get_last_error()
-    return RuntimeError(f"{msg} (winerr={err})")
-
-
-def set_clipboard_image_from_pil(img: Image.Image) -> None:
-    output = BytesIO()
-    img.convert("RGB").save(output, "BMP")
-    bmp = output.getvalue()
-    output.close()
-
-    dib = bmp[14:]
-    size = len(dib)
-
-    if not user32.OpenClipboard(None):
-        raise _winerr("OpenClipboard falhou")
-
-    try:
-        if not user32.EmptyClipboard():
-            raise _winerr("EmptyClipboard falhou")
-
-        hglob = kernel32.GlobalAlloc(GMEM_MOVEABLE, size)
-        if not hglob:
-            raise _winerr("GlobalAlloc falhou")
-
-        ptr = kernel32.GlobalLock(hglob)
-        if not ptr:
-            raise _winerr("GlobalLock falhou")
-
-        try:
-            ctypes.memmove(ptr, dib, size)
-        finally:
-            kernel32.GlobalUnlock(hglob)
-
-        hset = user32.SetClipboardData(CF_DIB, hglob)
-        if not hset:
-            raise _winerr("SetClipboardData falhou")
-    finally:
-        user32.CloseClipboard()
-
-
-def download_image_force_jpg(image_url: str) -> Image.Image:
-    headers = {"User-Agent": "Mozilla/5.0"}
-    r = requests.get(image_url, headers=headers, timeout=30)
-    r.raise_for_status()
-    return Image.open(BytesIO(r.content)).convert("RGB")
-
-
 def build_caption(row: dict) -> str:
     title = _safe_str(row.get("title"))
     link = _safe_str(row.get("product_short_link") or row.get("product_link"))
 
     # preço
-    price_txt = ""
-    price = row.get("sale_price")
-    try:
-        if price is not None and _safe_str(price) != "":
-            p = float(price)
-            price_txt = f"{p:.2f}".replace(".", ",")
-    except Exception:
-        price_txt = _safe_str(price)
+    cents = row.get("sale_price_cents")
+    if cents is None or pd.isna(cents):
+        cents = parse_brl(row.get("sale_price"))
+    price_txt = format_brl(cents) or _safe_str(row.get("sale_price"))
 
     blocks = []
 
@@ -138,64 +85,6 @@ def build_caption(row: dict) -> str:
     return "\n\n".join(blocks).strip()
 
 
-
-def open_whatsapp_and_group(page, group_name: str) -> None:
-    page.goto("https://web.whatsapp.com/", wait_until="domcontentloaded")
-    page.wait_for_selector("#pane-side, div[role='textbox']", timeout=120_000)
-
-    # foco busca
-    for sel in [
-        "div[contenteditable='true'][data-tab='3']",
-        "div[role='textbox'][contenteditable='true']",
-        "#side div[contenteditable='true']",
-        "div[contenteditable='true']",
-    ]:
-        try:
-            loc = page.locator(sel).first
-            if loc.count() > 0:
-                loc.click(timeout=2500)
-                break
-        except Exception:
-            pass
-
-    try:
-        page.keyboard.press("Control+Alt+/")
-    except Exception:
-        pass
-
-    page.keyboard.type(group_name, delay=25)
-    page.wait_for_timeout(900)
-    page.keyboard.press("Enter")
-    page.wait_for_timeout(1200)
-
-    page.wait_for_selector("footer div[role='textbox']", timeout=30_000)
-
-
-def focus_footer_box(page) -> None:
-    # tenta focar sem click arriscado: usa atalho e um click leve no footer container
-    try:
-        page.locator("footer").first.click(timeout=2000, position={"x": 200, "y": 20})
-    except Exception:
-        pass
-    try:
-        page.locator("footer div[role='textbox']").last.click(timeout=2000, force=True)
-    except Exception:
-        pass
-
-
-def type_multiline_shift_enter(page, text: str) -> None:
-    lines = text.splitlines()
-    if not lines:
-        return
-    page.keyboard.type(lines[0], delay=10)
-    for line in lines[1:]:
-        page.keyboard.down("Shift")
-        page.keyboard.press("Enter")
-        page.keyboard.up("Shift")
-        if line:
-            page.keyboard.type(line, delay=10)
-
-
 def main() -> None:
     if not WA_GROUP_NAME:
         raise RuntimeError("Defina WA_GROUP_NAME (nome EXATO do grupo no WhatsApp Web).")
@@ -231,10 +120,29 @@ def main() -> None:
     print(f"Imagem:  {image_url[:90]}...")
     print("================================")
 
-    # clipboard
-    img = download_image_force_jpg(image_url)
-    set_clipboard_image_from_pil(img)
-    print("[OK] Imagem copiada para o clipboard.")
+    # imagem (DIB pronto para o clipboard, colado só na hora do envio)
+    cache = ImageCache(IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024, max_side=IMAGE_MAX_SIDE)
+    stats = ImageStats()
+    dib = fetch_payload(requests.Session(), image_url, cache, timeout=30, variant=IMAGE_VARIANT, stats=stats)
+    origem = "cache" if cache.hits else ("variante CDN" if stats.counts["variants"] else "original")
+    print(f"[IMG] {origem} ({len(dib) // 1024} KB | {stats.counts['bytes_downloaded'] // 1024} KB baixados)")
+    cache.close()
+
+    if USE_DAEMON:
+        # daemon com o WhatsApp já aberto: enfileira (prioridade na frente do scheduler) e espera
+        send_queue = SendQueue(SEND_QUEUE_FILE)
+        try:
+            if not send_queue.daemon_alive():
+                raise RuntimeError(f"WA_USE_DAEMON=1 mas o daemon de envio não está no ar ({SEND_QUEUE_FILE}).")
+            timer = QueueSender(send_queue, source="manual", timeout=DAEMON_JOB_TIMEOUT).send(
+                WA_GROUP_NAME, caption, image_url, itemid, priority=2
+            )
+        finally:
+            send_queue.close()
+        print(f"[SENT] Enviado pelo daemon (imagem + legenda em UMA mensagem) | {timer.summary()}")
+        return
+
+    from playwright.sync_api import sync_playwright
 
     with sync_playwright() as p:
         browser = p.chromium.launch_persistent_context(
@@ -244,27 +152,16 @@ def main() -> None:
         page = browser.new_page()
 
         print("[LOGIN] Se necessário, escaneie o QR...")
-        open_whatsapp_and_group(page, WA_GROUP_NAME)
+        open_whatsapp_and_group(page, WA_GROUP_NAME, SEARCH_TIMEOUT_MS, CHAT_TIMEOUT_MS)
         print("[OK] Grupo aberto.")
 
-        # foco e cola
-        focus_footer_box(page)
-        page.keyboard.press("Control+V")
-
-        # espera o WhatsApp "prender" a mídia no composer
-        page.wait_for_timeout(1200)
-
-        # IMPORTANTE: NÃO clicar em textbox (interceptado pelo botão de anexo).
-        # Só digitar via teclado. Quebras com Shift+Enter.
-        type_multiline_shift_enter(page, caption)
-
-        # envia (Enter envia a mídia + legenda em um único envio)
-        page.keyboard.press("Enter")
-
-        page.wait_for_timeout(1200)
-        print("[SENT] Enviado (imagem + legenda em UMA mensagem).")
+        # clipboard + Ctrl+V, legenda por insert_text e Enter (mídia + legenda em um único
+        # envio); o browser fecha logo depois, então espera o check (upload concluído)
+        timer = send_image_with_caption_via_clipboard(
+            page, dib, caption, MEDIA_TIMEOUT_MS, SEND_TIMEOUT_MS, sent=True
+        )
+        print(f"[SENT] Enviado (imagem + legenda em UMA mensagem) | {timer.summary()}")
         browser.close()
 
-
 if __name__ == "__main__":
     main()
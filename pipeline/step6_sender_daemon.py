@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+from playwright.sync_api import sync_playwright
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.image_cache import ImageCache  # noqa: E402
+from src.image_prefetch import ImageFetchError, fetch_payload  # noqa: E402
+from src.send_queue import SendJob, SendQueue  # noqa: E402
+from src.whatsapp_web import (  # noqa: E402
+    SendUnconfirmed,
+    open_whatsapp_and_group,
+    page_alive,
+    send_image_with_caption_via_clipboard,
+    send_text_only,
+)
+
+load_dotenv()
+
+# ==========================
+# Config
+# ==========================
+SEND_QUEUE_FILE = Path(os.getenv("WA_SEND_QUEUE_FILE", "data/send_queue.sqlite"))
+PROFILE_DIR = os.getenv("WA_PROFILE_DIR", ".wa_chrome_profile").strip()
+HEADLESS = os.getenv("WA_HEADLESS", "0").strip().lower() in ("1", "true", "yes", "y")
+
+# grupo aberto já na subida (opcional; sem ele, abre no primeiro job)
+GROUP_NAME = os.getenv("WA_GROUP_NAME", "").strip()
+
+POLL_SECONDS = float(os.getenv("WA_DAEMON_POLL_SECONDS", "1"))
+HEALTH_EVERY_S = float(os.getenv("WA_DAEMON_HEALTH_EVERY_S", "30"))
+
+IMAGE_CACHE_DIR = Path(os.getenv("WA_IMAGE_CACHE_DIR", "data/image_cache"))
+IMAGE_CACHE_MAX_MB = int(os.getenv("WA_IMAGE_CACHE_MAX_MB", "500"))
+IMAGE_MAX_SIDE = int(os.getenv("WA_IMAGE_MAX_SIDE", "1280"))
+IMAGE_VARIANT = os.getenv("WA_IMAGE_VARIANT", "_tn").strip()
+IMAGE_TIMEOUT = float(os.getenv("WA_IMAGE_TIMEOUT", "15"))
+
+SEARCH_TIMEOUT_MS = int(os.getenv("WA_SEARCH_TIMEOUT_MS", "10000"))
+CHAT_TIMEOUT_MS = int(os.getenv("WA_CHAT_TIMEOUT_MS", "30000"))
+MEDIA_TIMEOUT_MS = int(os.getenv("WA_MEDIA_TIMEOUT_MS", "15000"))
+SEND_TIMEOUT_MS = int(os.getenv("WA_SEND_TIMEOUT_MS", "20000"))
+
+
+class WhatsAppSession:
+    """
+    Um contexto persistente (login) e UMA aba do WhatsApp Web: o WhatsApp só deixa uma
+    aba ativa por sessão, então trocar de grupo é só buscar outro chat na mesma página.
+    Aba/browser morto -> reabre no próximo uso.
+    """
+
+    def __init__(self, playwright):
+        self.playwright = playwright
+        self.context = None
+        self.page = None
+        self.group = ""
+
+    def _launch(self) -> None:
+        self.close()
+        self.context = self.playwright.chromium.launch_persistent_context(
+            user_data_dir=PROFILE_DIR,
+            headless=HEADLESS,
+            args=["--disable-blink-features=AutomationControlled"],
+        )
+        self.page = self.context.pages[0] if self.context.pages else self.context.new_page()
+        self.group = ""
+
+    def close(self) -> None:
+        if self.context is not None:
+            try:
+                self.context.close()
+            except Exception:
+                pass
+        self.context = None
+        self.page = None
+        self.group = ""
+
+    def page_for(self, group_name: str):
+        if self.page is None or self.page.is_closed():
+            print("[DAEMON] Abrindo WhatsApp Web (se necessário, escaneie o QR).", flush=True)
+            self._launch()
+            open_whatsapp_and_group(self.page, group_name, SEARCH_TIMEOUT_MS, CHAT_TIMEOUT_MS)
+        elif self.group != group_name:
+            open_whatsapp_and_group(self.page, group_name, SEARCH_TIMEOUT_MS, CHAT_TIMEOUT_MS, load=False)
+        self.group = group_name
+        return self.page
+
+    def healthy(self) -> bool:
+        return self.page is not None and page_alive(self.page)
+
+    def reopen(self) -> None:
+        """Recarrega a aba (ou relança o browser, se nem a aba responde) no grupo atual."""
+        group = self.group
+        if not group:
+            # nem chegou a abrir um grupo: o próximo job relança do zero
+            self.close()
+            return
+        try:
+            if self.page is None or self.page.is_closed():
+                raise RuntimeError("aba fechada")
+            open_whatsapp_and_group(self.page, group, SEARCH_TIMEOUT_MS, CHAT_TIMEOUT_MS)
+        except Exception as e:
+            print(f"[DAEMON] Recarregar falhou ({e}); relançando o browser.", flush=True)
+            try:
+                self._launch()
+                open_whatsapp_and_group(self.page, group, SEARCH_TIMEOUT_MS, CHAT_TIMEOUT_MS)
+            except Exception as e2:
+                # sem derrubar o daemon: o próximo job tenta abrir de novo
+                print(f"[DAEMON] Relançar falhou ({e2}); nova tentativa no próximo job.", flush=True)
+                self.close()
+                return
+        self.group = group
+
+
+def _send(session: WhatsAppSession, job: SendJob, cache: ImageCache, http: requests.Session):
+    dib = None
+    image_phases = {}
+    if job.image_url:
+        # quem enfileirou normalmente já baixou (prefetch do scheduler): leitura do cache em disco
+        dib = fetch_payload(
+            http, job.image_url, cache, timeout=IMAGE_TIMEOUT, variant=IMAGE_VARIANT, phases=image_phases
+        )
+
+    page = session.page_for(job.group_name)
+    if dib is not None:
+        timer = send_image_with_caption_via_clipboard(page, dib, job.caption, MEDIA_TIMEOUT_MS, SEND_TIMEOUT_MS)
+    else:
+        timer = send_text_only(page, job.caption, SEND_TIMEOUT_MS)
+    timer.phases = {**image_phases, **timer.phases}
+    return timer
+
+
+def main():
+    queue = SendQueue(SEND_QUEUE_FILE)
+    stale = queue.fail_stale()
+    cache = ImageCache(IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024, max_side=IMAGE_MAX_SIDE)
+    http = requests.Session()
+
+    print("=== STEP6 SENDER DAEMON ===", flush=True)
+    print(f"Fila:      {SEND_QUEUE_FILE} ({queue.pending()} pendentes, {stale} interrompidos sem confirmação)", flush=True)
+    print(f"Perfil:    {PROFILE_DIR} | headless={HEADLESS}", flush=True)
+    print("===========================", flush=True)
+
+    with sync_playwright() as p:
+        session = WhatsAppSession(p)
+        queue.heartbeat("starting")
+        if GROUP_NAME:
+            session.page_for(GROUP_NAME)
+            print(f"[OK] Grupo aberto: {GROUP_NAME}", flush=True)
+
+        last_health = time.monotonic()
+        try:
+            while True:
+                queue.heartbeat()
+                job = queue.claim()
+                if job is None:
+                    if session.page is not None and time.monotonic() - last_health >= HEALTH_EVERY_S:
+                        last_health = time.monotonic()
+                        if not session.healthy():
+                            print("[DAEMON] Health check falhou; reabrindo a página.", flush=True)
+                            queue.heartbeat("reopening")
+                            session.reopen()
+                    time.sleep(POLL_SECONDS)
+                    continue
+
+                label = f"job {job.id} ({job.source or '?'} item {job.itemid or '-'})"
+                try:
+                    timer = _send(session, job, cache, http)
+                    queue.mark_sent(job.id, timer)
+                    print(f"[SENT] {label} -> {job.group_name} | {timer.summary()}", flush=True)
+                except SendUnconfirmed as e:
+                    # Enter já foi: não volta para a fila, quem enfileirou não reenvia
+                    queue.mark_unconfirmed(job.id, str(e))
+                    print(f"[UNCONFIRMED] {label}: {e}", flush=True)
+                    if not session.healthy():
+                        queue.heartbeat("reopening")
+                        session.reopen()
+                except ImageFetchError as e:
+                    queue.mark_failed(job.id, f"imagem: {e}")
+                    print(f"[SKIP] {label}: {e}", flush=True)
+                except Exception as e:
+                    queue.mark_failed(job.id, f"{type(e).__name__}: {e}")
+                    print(f"[ERR] {label}: {e}", flush=True)
+                    # a aba pode ter travado no meio do envio: confere antes do próximo job
+                    if not session.healthy():
+                        queue.heartbeat("reopening")
+                        session.reopen()
+                last_health = time.monotonic()
+        except KeyboardInterrupt:
+            print("[STOP] Daemon encerrado.", flush=True)
+        finally:
+            queue.heartbeat("stopped")
+            session.close()
+            cache.close()
+            queue.close()
+
+
+if __name__ == "__main__":
+    main()
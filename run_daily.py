@@ -1,6 +1,7 @@
 import os
 import subprocess
 import sys
+import time
 from pathlib import Path
 
 
@@ -9,6 +10,28 @@ def run(cmd, env=None):
     subprocess.run(cmd, shell=True, check=True, env=env)
 
 
+def ensure_sender_daemon(venv_python: Path, env: dict, wait_s: float = 180.0):
+    """WA_USE_DAEMON=1: sobe o daemon de envio em segundo plano se ele não estiver no ar."""
+    from src.send_queue import SendQueue
+
+    queue = SendQueue(Path(env.get("WA_SEND_QUEUE_FILE", "data/send_queue.sqlite")))
+    try:
+        if queue.daemon_alive():
+            print(f"[OK] Daemon de envio no ar (pid {queue.daemon_info().get('pid')}).", flush=True)
+            return
+        cmd = f'"{venv_python}" pipeline\\step6_sender_daemon.py'
+        print(f"\n[CMD] {cmd} (segundo plano)", flush=True)
+        subprocess.Popen(cmd, shell=True, env=env)
+        deadline = time.monotonic() + wait_s
+        while not queue.daemon_alive():
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"daemon de envio não respondeu em {wait_s:.0f}s")
+            time.sleep(1)
+        print("[OK] Daemon de envio no ar.", flush=True)
+    finally:
+        queue.close()
+
+
 def main():
     project_root = Path(__file__).resolve().parent
     venv_python = project_root / ".venv" / "Scripts" / "python.exe"
@@ -46,7 +69,9 @@ def main():
     # 1) Gera picks do dia (SEM Step5)
     run(f'"{venv_python}" run_pipeline_daily.py', env=env)
 
-    # 2) Scheduler abre WhatsApp e envia
+    # 2) Scheduler abre WhatsApp e envia (ou enfileira no daemon, que mantém o WhatsApp aberto)
+    if env.get("WA_USE_DAEMON", "0").strip().lower() in ("1", "true", "yes", "y"):
+        ensure_sender_daemon(venv_python, env)
     run(f'"{venv_python}" pipeline\\step6_scheduler_daily.py', env=env)
 
     print("\n✅ run_daily finalizado.", flush=True)
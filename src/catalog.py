@@ -0,0 +1,273 @@
+# src/catalog.py
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.money import parse_brl_series
+
+
+# ==========================
+# Abas do controle_produtos.xlsx
+# ==========================
+ABA_BASE = "produtos_base"
+ABA_AGENDA = "agenda_dia"
+ABA_LOG = "log_envios"
+
+# colunas como ficam no Excel (o arquivo não muda de formato)
+BASE_COLS = [
+    "produto_id", "nome_curto", "link_afiliado", "preco_atual", "avaliacao",
+    "categoria", "geracao", "ultimo_envio", "status",
+]
+AGENDA_COLS = ["horario", "produto_id", "geracao", "valido", "motivo"]
+LOG_COLS = ["data", "horario", "produto_id", "geracao"]
+
+GERACOES = ["A", "B", "C"]
+STATUS = ["ativo", "pausado"]
+VALIDO = ["SIM", "NAO"]
+
+# ==========================
+# Dtypes em memória
+# ==========================
+# produto_id: inteiro (Int64 = int64 + máscara; linha sem id vira <NA> em vez de "nan")
+ID_DTYPE = "Int64"
+# preço em centavos: int32 cobre até R$ 21 milhões
+CENTS_DTYPE = "Int32"
+RATING_DTYPE = np.float32
+
+# em memória o preço fica só em centavos; "preco_atual" (reais) existe só no Excel
+PRICE_COL = "preco_atual"
+CENTS_COL = "preco_cents"
+
+
+def parse_ids(values) -> pd.Series:
+    """
+    IDs de produto -> Int64. Aceita int, float do Excel (123.0), " 123 " e "123.0".
+    Vazio / "nan" / não numérico -> <NA>.
+    """
+    s = pd.Series(values)
+    if pd.api.types.is_integer_dtype(s):
+        return s.astype(ID_DTYPE)
+    if pd.api.types.is_float_dtype(s):
+        whole = s.notna() & (s == np.floor(s))
+        return s.where(whole).astype(ID_DTYPE)
+    txt = s.where(s.notna(), "").astype(str).str.strip().str.removesuffix(".0")
+    ok = (txt.str.isdigit() & txt.str.isascii() & (txt.str.len() <= 18)).to_numpy(dtype=bool)
+    ids = np.zeros(len(txt), dtype=np.int64)
+    ids[ok] = txt.to_numpy(dtype=object)[ok].astype(np.int64)
+    return pd.Series(pd.arrays.IntegerArray(ids, ~ok), index=s.index)
+
+
+def _clean_labels(values, upper: Optional[bool]) -> pd.Series:
+    """
+    Normaliza rótulos repetidos (strip + caixa; vazio/"nan" -> NA) só nos valores
+    distintos (factorize) e expande de volta: 1M linhas com 3 valores = 3 strings tratadas.
+    """
+    s = pd.Series(values)
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    u = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    if upper is not None:
+        u = u.str.upper() if upper else u.str.lower()
+    u = u.mask(u.str.lower().isin(["", "nan", "none", "<na>"]))
+    out = u.to_numpy(dtype=object)[codes] if len(u) else np.full(len(s), None, dtype=object)
+    out[codes < 0] = None
+    return pd.Series(out, index=s.index, dtype=object)
+
+
+def to_categorical(values, known: List[str], upper: bool = False) -> pd.Series:
+    """
+    Texto livre -> Categorical com as categorias conhecidas primeiro (ordem estável)
+    e qualquer valor extra do arquivo depois (nada se perde ao regravar).
+    """
+    s = _clean_labels(values, upper)
+    extra = sorted(set(s.dropna().unique()) - set(known))
+    return pd.Series(pd.Categorical(s, categories=list(known) + extra), index=s.index)
+
+
+def _dates(values) -> pd.Series:
+    """Datas (date, datetime, string) -> datetime64 à meia-noite; vazio -> NaT."""
+    return pd.to_datetime(pd.Series(values), errors="coerce").dt.normalize()
+
+
+def _text(values) -> pd.Series:
+    s = pd.Series(values)
+    return s.where(s.notna(), "").astype(str).str.strip()
+
+
+# ==========================
+# produtos_base
+# ==========================
+def empty_base() -> pd.DataFrame:
+    return type_base(pd.DataFrame(columns=BASE_COLS))
+
+
+def type_base(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aba produtos_base (como vem do Excel ou montada em memória) -> dtypes compactos:
+    produto_id Int64, categoria/geracao/status Categorical, preco_cents Int32,
+    avaliacao float32, ultimo_envio datetime64.
+    """
+    df = df.copy()
+    for c in BASE_COLS:
+        if c not in df.columns and not (c == PRICE_COL and CENTS_COL in df.columns):
+            df[c] = pd.NA
+
+    df["produto_id"] = parse_ids(df["produto_id"])
+    df["nome_curto"] = _text(df["nome_curto"])
+    df["link_afiliado"] = _text(df["link_afiliado"])
+    if CENTS_COL in df.columns:
+        cents = pd.to_numeric(df[CENTS_COL], errors="coerce")
+    else:
+        cents = parse_brl_series(df[PRICE_COL])
+    df[CENTS_COL] = cents.astype(CENTS_DTYPE)
+    df["avaliacao"] = pd.to_numeric(df["avaliacao"], errors="coerce").astype(RATING_DTYPE)
+
+    df["categoria"] = _clean_labels(df["categoria"], None).fillna("").astype("category")
+    df["geracao"] = to_categorical(df["geracao"], GERACOES, upper=True)
+    df["status"] = to_categorical(df["status"], STATUS)
+    df["ultimo_envio"] = _dates(df["ultimo_envio"])
+
+    extra = [c for c in df.columns if c not in BASE_COLS and c != CENTS_COL]
+    cols = [CENTS_COL if c == PRICE_COL else c for c in BASE_COLS]
+    return df[cols + extra].reset_index(drop=True)
+
+
+def base_to_excel(df: pd.DataFrame) -> pd.DataFrame:
+    """Volta para o formato do Excel: preco_atual em reais, datas sem hora, categorias como texto."""
+    out = df.copy()
+    out.insert(out.columns.get_loc(CENTS_COL), PRICE_COL, out[CENTS_COL].astype("float64") / 100.0)
+    out = out.drop(columns=[CENTS_COL])
+    # float32 -> float64 arredondado (senão o Excel grava 4.599999904632568)
+    out["avaliacao"] = out["avaliacao"].astype("float64").round(2)
+    out["ultimo_envio"] = _excel_dates(out["ultimo_envio"])
+    return _plain(out)
+
+
+# ==========================
+# agenda_dia / log_envios
+# ==========================
+def type_agenda(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for c in AGENDA_COLS:
+        if c not in df.columns:
+            df[c] = ""
+    df["horario"] = _text(df["horario"])
+    df["produto_id"] = parse_ids(df["produto_id"])
+    df["geracao"] = to_categorical(df["geracao"], GERACOES, upper=True)
+    df["valido"] = to_categorical(df["valido"], VALIDO, upper=True)
+    df["motivo"] = _text(df["motivo"])
+    return df.reset_index(drop=True)
+
+
+def type_log(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for c in LOG_COLS:
+        if c not in df.columns:
+            df[c] = ""
+    df = df[LOG_COLS]
+    df["data"] = _dates(df["data"])
+    df["horario"] = _text(df["horario"])
+    df["produto_id"] = parse_ids(df["produto_id"])
+    df["geracao"] = to_categorical(df["geracao"], GERACOES, upper=True)
+    return df.reset_index(drop=True)
+
+
+def log_to_excel(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.copy()
+    out["data"] = out["data"].dt.strftime("%Y-%m-%d").fillna("")
+    return _plain(out)
+
+
+def _excel_dates(s: pd.Series) -> pd.Series:
+    d = pd.to_datetime(s, errors="coerce")
+    return pd.Series([x.date() if pd.notna(x) else None for x in d], index=s.index, dtype=object)
+
+
+def _plain(df: pd.DataFrame) -> pd.DataFrame:
+    """Categorical -> texto e <NA> -> vazio (o Excel não entende os dtypes do pandas)."""
+    out = df.copy()
+    for c in out.columns:
+        if isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(object).where(out[c].notna(), "")
+        elif pd.api.types.is_extension_array_dtype(out[c].dtype):
+            out[c] = out[c].astype(object).where(out[c].notna(), None)
+    return out
+
+
+_TYPERS = {ABA_BASE: type_base, ABA_AGENDA: type_agenda, ABA_LOG: type_log}
+_TO_EXCEL = {ABA_BASE: base_to_excel, ABA_AGENDA: _plain, ABA_LOG: log_to_excel}
+
+
+# ==========================
+# Leitura / escrita (uma vez por execução)
+# ==========================
+def load_sheet(
+    path: str, sheet: str, missing_ok: bool = False, required: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Lê uma aba já tipada (produtos_base/agenda_dia/log_envios). Com missing_ok=True,
+    arquivo/aba inexistente -> DataFrame vazio com os dtypes certos. `required`: colunas
+    que o arquivo precisa ter (ValueError se faltar).
+    """
+    try:
+        df = pd.read_excel(path, sheet_name=sheet)
+    except Exception:
+        if not missing_ok:
+            raise
+        cols = {ABA_BASE: BASE_COLS, ABA_AGENDA: AGENDA_COLS, ABA_LOG: LOG_COLS}.get(sheet, [])
+        df = pd.DataFrame(columns=cols)
+    faltando = [c for c in (required or []) if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Colunas faltando na aba '{sheet}': {faltando}")
+    typer = _TYPERS.get(sheet)
+    return typer(df) if typer else df
+
+
+def load_base(path: str, missing_ok: bool = False, required: Optional[List[str]] = None) -> pd.DataFrame:
+    return load_sheet(path, ABA_BASE, missing_ok=missing_ok, required=required)
+
+
+def save_sheets(path: str, sheets: Dict[str, pd.DataFrame], keep_others: bool = True) -> None:
+    """
+    Regrava o arquivo inteiro: as abas de `sheets` (convertidas de volta para o formato do
+    Excel) e, com keep_others, as outras abas que já existiam, sem mexer no conteúdo.
+    Atualiza também o espelho SQLite de preços (src/catalog_store.py).
+    """
+    out: Dict[str, pd.DataFrame] = {}
+    existing: List[str] = []
+    if keep_others:
+        try:
+            existing = pd.ExcelFile(path).sheet_names
+        except Exception:
+            existing = []
+    for s in existing:
+        out[s] = sheets[s] if s in sheets else pd.read_excel(path, sheet_name=s)
+    for s, df in sheets.items():
+        out.setdefault(s, df)
+
+    frames: Dict[str, pd.DataFrame] = {}
+    for name, df in out.items():
+        conv = _TO_EXCEL.get(name) if name in sheets else None
+        frames[name] = conv(df) if conv else df
+
+    with pd.ExcelWriter(path, engine="openpyxl", mode="w") as writer:
+        for name, df in frames.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+
+    # espelho SQLite por produto_id (primeira aba, a que os leitores por id consultam)
+    if frames:
+        from src.catalog_store import mirror_workbook
+
+        mirror_workbook(path, next(iter(frames.values())))
+
+
+def mark_sent(df_base: pd.DataFrame, ids, when: Optional[date] = None) -> pd.DataFrame:
+    """ultimo_envio = hoje (ou `when`) para os produto_id em `ids` (comparação inteira, sem str)."""
+    when = when or date.today()
+    df_base = df_base.copy()
+    hit = df_base["produto_id"].isin(parse_ids(pd.Series(list(ids))).dropna()).fillna(False).to_numpy(dtype=bool)
+    df_base.loc[hit, "ultimo_envio"] = pd.Timestamp(when)
+    return df_base
@@ -0,0 +1,187 @@
+# src/catalog_store.py
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from src.catalog import parse_ids
+from src.money import parse_brl_series
+from src.schema_resolver import SchemaCache, normalize_cols, resolve
+
+
+# Colunas de id/preço no controle: productOfferV2 (Step0 da API) ou produtos_base.
+# Mesma precedência que o step3b sempre usou.
+PRICE_SCHEMA = [
+    ("produto_id", ["itemid", "itemId", "produto_id", "product_id"], "first"),
+    ("price", ["price", "preco", "preco_atual", "sale_price", "preco_promocional"], "first"),
+    ("price_min", ["pricemin", "price_min", "preco_min"], "first"),
+    ("price_max", ["pricemax", "price_max", "preco_max", "preco_cheio", "preco_original"], "first"),
+]
+
+# SQLite aceita no máximo 999 parâmetros por comando nas versões antigas
+_IN_CHUNK = 500
+
+
+def store_path(xlsx_path) -> Path:
+    """O espelho fica ao lado da planilha: data/controle_produtos.xlsx -> data/controle_produtos.sqlite."""
+    return Path(xlsx_path).with_suffix(".sqlite")
+
+
+def file_signature(path) -> str:
+    """Tamanho + mtime: planilha regravada (por nós ou à mão) -> assinatura diferente."""
+    st = Path(path).stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def price_frame(df: pd.DataFrame, cache: Optional[SchemaCache] = None) -> pd.DataFrame:
+    """
+    Planilha do controle (formato do Excel) -> produto_id + preços em centavos:
+    promo = priceMin (ou price) e original = priceMax (ou price). Linhas sem id saem.
+    """
+    df = normalize_cols(df)
+    mapping, _ = resolve(df, PRICE_SCHEMA, cache)
+    if "produto_id" not in mapping:
+        raise RuntimeError(
+            "controle_produtos.xlsx: não encontrei coluna de id (itemid/itemId/produto_id/product_id)."
+        )
+
+    def cents(*keys: str) -> pd.Series:
+        for k in keys:
+            if k in mapping:
+                return parse_brl_series(df[mapping[k]])
+        return pd.Series(pd.NA, index=df.index, dtype="Int64")
+
+    out = pd.DataFrame({
+        "produto_id": parse_ids(df[mapping["produto_id"]]),
+        "promo_cents": cents("price_min", "price"),
+        "original_cents": cents("price_max", "price"),
+    })
+    return out[out["produto_id"].notna()]
+
+
+class CatalogStore:
+    """
+    Espelho SQLite (chave produto_id) dos preços do controle_produtos.xlsx. Quem só precisa
+    de alguns itens (step3b: ~250 picks) busca por id aqui em vez de abrir a planilha inteira.
+
+    Quem grava a planilha atualiza o espelho junto (mirror). A assinatura da planilha fica
+    guardada: se ela mudou por fora (editada à mão), is_fresh() dá False e o leitor
+    reconstrói o espelho uma vez.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(str(self.path))
+        self.con.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS prices (
+                produto_id     INTEGER PRIMARY KEY,
+                promo_cents    INTEGER,
+                original_cents INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key   TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+
+    @classmethod
+    def for_workbook(cls, xlsx_path) -> "CatalogStore":
+        return cls(store_path(xlsx_path))
+
+    def close(self) -> None:
+        self.con.close()
+
+    def __enter__(self) -> "CatalogStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self.con.execute("SELECT COUNT(*) FROM prices").fetchone()[0])
+
+    # ---------- sincronização ----------
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.con.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self, xlsx_path) -> bool:
+        p = Path(xlsx_path)
+        return p.exists() and self._meta("source_signature") == file_signature(p)
+
+    def replace(self, prices: pd.DataFrame, source_signature: str) -> int:
+        """Troca o conteúdo inteiro numa transação (id repetido: vale a última linha)."""
+        rows = _rows(prices)
+        with self.con:
+            self.con.execute("DELETE FROM prices")
+            self.con.executemany(
+                "INSERT OR REPLACE INTO prices (produto_id, promo_cents, original_cents) VALUES (?, ?, ?)", rows
+            )
+            self.con.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('source_signature', ?)", (source_signature,)
+            )
+        return len(rows)
+
+    def mirror(self, xlsx_path, df_excel: pd.DataFrame, cache: Optional[SchemaCache] = None) -> int:
+        """Chamado logo depois de gravar a planilha, com o DataFrame que foi gravado."""
+        return self.replace(price_frame(df_excel, cache), file_signature(xlsx_path))
+
+    def rebuild(self, xlsx_path, cache: Optional[SchemaCache] = None) -> int:
+        """Planilha mudou por fora: lê a primeira aba (a mesma que o step3b sempre leu) e espelha."""
+        sig = file_signature(xlsx_path)
+        df = pd.read_excel(xlsx_path)
+        return self.replace(price_frame(df, cache), sig)
+
+    # ---------- consulta ----------
+    def lookup(self, ids: Iterable) -> pd.DataFrame:
+        """produto_id, promo_cents, original_cents (Int64) só dos ids pedidos que existem."""
+        wanted = [int(i) for i in pd.unique(parse_ids(pd.Series(list(ids))).dropna())]
+        found: List[Tuple[int, Optional[int], Optional[int]]] = []
+        for i in range(0, len(wanted), _IN_CHUNK):
+            chunk = wanted[i: i + _IN_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            found.extend(self.con.execute(
+                f"SELECT produto_id, promo_cents, original_cents FROM prices WHERE produto_id IN ({marks})", chunk
+            ).fetchall())
+        out = pd.DataFrame(found, columns=["produto_id", "promo_cents", "original_cents"])
+        return out.astype({"produto_id": "Int64", "promo_cents": "Int64", "original_cents": "Int64"})
+
+
+def _rows(prices: pd.DataFrame) -> List[Tuple[int, Optional[int], Optional[int]]]:
+    def ints(s: pd.Series) -> List[Optional[int]]:
+        return [None if pd.isna(v) else int(v) for v in s.astype(object)]
+
+    return list(zip(ints(prices["produto_id"]), ints(prices["promo_cents"]), ints(prices["original_cents"])))
+
+
+def mirror_workbook(xlsx_path, df_excel: pd.DataFrame, who: str = "Catalog") -> None:
+    """
+    Atualiza o espelho depois de gravar a planilha. Falha aqui não derruba quem gravou:
+    a assinatura antiga não bate mais e o próximo leitor reconstrói.
+    """
+    try:
+        with CatalogStore.for_workbook(xlsx_path) as store:
+            store.mirror(xlsx_path, df_excel)
+    except Exception as e:
+        print(f"INFO {who}: espelho SQLite do controle não atualizado ({e}); será reconstruído na leitura.")
+
+
+def lookup_prices(
+    xlsx_path, ids: Iterable, cache: Optional[SchemaCache] = None, who: str = "Catalog"
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Preços (centavos) dos ids pedidos, pelo espelho SQLite; reconstrói antes se a planilha
+    mudou desde o último espelhamento. Retorna (DataFrame, {"rebuilt": n linhas ou 0}).
+    """
+    with CatalogStore.for_workbook(xlsx_path) as store:
+        rebuilt = 0
+        if not store.is_fresh(xlsx_path):
+            rebuilt = store.rebuild(xlsx_path, cache)
+            print(f"INFO {who}: espelho do controle reconstruído ({rebuilt} itens).")
+        return store.lookup(ids), {"rebuilt": rebuilt}
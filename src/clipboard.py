@@ -0,0 +1,81 @@
+# src/clipboard.py
+from __future__ import annotations
+
+import ctypes
+from typing import Optional
+
+
+# ==========================
+# Windows Clipboard (CF_DIB)
+# ==========================
+CF_DIB = 8
+GMEM_MOVEABLE = 0x0002
+
+_api: Optional[tuple] = None
+
+
+def _win():
+    """user32/kernel32 com argtypes, carregados na primeira cópia (só existem no Windows)."""
+    global _api
+    if _api is None:
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL("user32", use_last_error=True)
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+        user32.OpenClipboard.argtypes = [wintypes.HWND]
+        user32.OpenClipboard.restype = wintypes.BOOL
+        user32.CloseClipboard.argtypes = []
+        user32.CloseClipboard.restype = wintypes.BOOL
+        user32.EmptyClipboard.argtypes = []
+        user32.EmptyClipboard.restype = wintypes.BOOL
+        user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+        user32.SetClipboardData.restype = wintypes.HANDLE
+
+        kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
+        kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+        kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+        kernel32.GlobalLock.restype = ctypes.c_void_p
+        kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+        kernel32.GlobalUnlock.restype = wintypes.BOOL
+        _api = (user32, kernel32)
+    return _api
+
+
+def _winerr(msg: str) -> RuntimeError:
+    err = ctypes.get_last_error()
+    return RuntimeError(f"{msg} (winerr={err})")
+
+
+def set_clipboard_dib(dib: bytes) -> None:
+    """
+    Coloca um DIB já codificado (BMP sem o cabeçalho de arquivo) no clipboard como CF_DIB.
+    Vindo do cache de imagens, é só uma cópia dos bytes para a memória global.
+    """
+    user32, kernel32 = _win()
+    size = len(dib)
+
+    if not user32.OpenClipboard(None):
+        raise _winerr("OpenClipboard falhou")
+    try:
+        if not user32.EmptyClipboard():
+            raise _winerr("EmptyClipboard falhou")
+
+        hglob = kernel32.GlobalAlloc(GMEM_MOVEABLE, size)
+        if not hglob:
+            raise _winerr("GlobalAlloc falhou")
+
+        ptr = kernel32.GlobalLock(hglob)
+        if not ptr:
+            raise _winerr("GlobalLock falhou")
+
+        try:
+            ctypes.memmove(ptr, dib, size)
+        finally:
+            kernel32.GlobalUnlock(hglob)
+
+        if not user32.SetClipboardData(CF_DIB, hglob):
+            raise _winerr("SetClipboardData falhou")
+    finally:
+        user32.CloseClipboard()
+
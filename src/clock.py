@@ -0,0 +1,51 @@
+# src/clock.py
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+
+
+class RealClock:
+    """Relógio do sistema (o que o scheduler usa em produção)."""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Relógio simulado: sleep() só avança o ponteiro, então um dia inteiro de esperas
+    roda em milissegundos. now()/time()/monotonic() andam juntos a partir de `start`.
+    """
+
+    def __init__(self, start: datetime):
+        self.start = start
+        self.elapsed = 0.0
+        self._epoch0 = start.timestamp()
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def time(self) -> float:
+        return self._epoch0 + self.elapsed
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self.elapsed += float(seconds)
+
+    def advance(self, seconds: float) -> None:
+        """Tempo gasto "trabalhando" (envio simulado), mesmo efeito de sleep."""
+        self.sleep(seconds)
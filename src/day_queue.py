@@ -0,0 +1,236 @@
+# src/day_queue.py
+from __future__ import annotations
+
+import json
+import math
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+# estados de um item no dia
+QUEUED = "queued"
+INFLIGHT = "inflight"
+SENT = "sent"
+FAILED = "failed"   # falhou, espera o backoff para tentar de novo
+DEAD = "dead"       # tentativas esgotadas (ou imagem morta): não sai hoje
+UNCONFIRMED = "unconfirmed"  # falhou depois do Enter: pode ter saído, não reenvia
+
+STATES = (QUEUED, INFLIGHT, SENT, FAILED, DEAD, UNCONFIRMED)
+
+MAX_ATTEMPTS = 3
+BACKOFF_S = 120.0
+BACKOFF_MAX_S = 1800.0
+
+
+def _jsonable(x):
+    # numpy/pandas escalares -> python
+    if hasattr(x, "item"):
+        return x.item()
+    return str(x)
+
+
+class DayQueue:
+    """
+    Fila persistente dos envios do dia (SQLite, um arquivo por dia).
+
+    Cada item guarda a linha do CSV (JSON), a posição, a prioridade (quedas de preço na
+    frente) e o estado: queued -> inflight -> sent, ou failed (nova tentativa depois de
+    BACKOFF_S * 2^(tentativa-1), até max_attempts) -> dead. Falha depois do Enter vai
+    direto para unconfirmed (a mensagem pode ter saído: nunca é reenviada).
+
+    Um scheduler que reinicia no mesmo dia retoma dessa fila: mesmos slots, mesma ordem;
+    o item que estava inflight quando o processo caiu vira sent (no ledger) ou unconfirmed.
+    path=":memory:" dá a mesma fila sem persistência (modo teste); `clock` (epoch em s)
+    permite rodar com relógio simulado.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff_s: float = BACKOFF_S,
+        backoff_max_s: float = BACKOFF_MAX_S,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = str(path)
+        self._now = clock
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_s = float(backoff_s)
+        self.backoff_max_s = float(backoff_max_s)
+        self.con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.con.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                itemid     TEXT PRIMARY KEY,
+                position   INTEGER NOT NULL,
+                priority   INTEGER NOT NULL DEFAULT 0,
+                row        TEXT NOT NULL,
+                status     TEXT NOT NULL,
+                attempts   INTEGER NOT NULL DEFAULT 0,
+                next_try   REAL NOT NULL DEFAULT 0,
+                error      TEXT NOT NULL DEFAULT '',
+                updated_at REAL NOT NULL,
+                sent_at    REAL
+            );
+            CREATE INDEX IF NOT EXISTS items_next ON items (status, priority, position);
+            CREATE TABLE IF NOT EXISTS meta (
+                key   TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+
+    def close(self) -> None:
+        self.con.close()
+
+    # ---------- montagem ----------
+    @property
+    def slots(self) -> int:
+        row = self.con.execute("SELECT value FROM meta WHERE key = 'slots'").fetchone()
+        return int(row[0]) if row else 0
+
+    def load(self, rows: Iterable[Dict], slots: int) -> int:
+        """
+        Acrescenta ao fim os itens que ainda não estão na fila (numa retomada, os já
+        conhecidos mantêm estado e posição). Os slots do dia ficam os da primeira carga.
+        Retorna quantos itens entraram.
+        """
+        now = self._now()
+        pos = int(self.con.execute("SELECT COALESCE(MAX(position), 0) FROM items").fetchone()[0])
+        n = 0
+        self.con.execute("BEGIN")
+        for r in rows:
+            iid = str(r.get("itemid", "")).strip()
+            if not iid:
+                continue
+            pos += 1
+            cur = self.con.execute(
+                "INSERT OR IGNORE INTO items (itemid, position, row, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (iid, pos, json.dumps(r, default=_jsonable, ensure_ascii=False), QUEUED, now),
+            )
+            n += cur.rowcount
+        self.con.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('slots', ?)", (str(int(slots)),))
+        self.con.execute("COMMIT")
+        return n
+
+    def push_front(self, rows: List[Dict]) -> None:
+        """Itens prioritários (quedas de preço): entram/sobem para a frente, na ordem dada."""
+        now = self._now()
+        first = int(self.con.execute("SELECT COALESCE(MIN(position), 0) FROM items").fetchone()[0])
+        self.con.execute("BEGIN")
+        for i, r in enumerate(rows):
+            iid = str(r.get("itemid", "")).strip()
+            pos = first - len(rows) + i
+            data = json.dumps(r, default=_jsonable, ensure_ascii=False)
+            self.con.execute(
+                "INSERT INTO items (itemid, position, priority, row, status, updated_at) VALUES (?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT(itemid) DO UPDATE SET position = excluded.position, priority = 1, row = excluded.row, "
+                "updated_at = excluded.updated_at WHERE status IN (?, ?)",
+                (iid, pos, data, QUEUED, now, QUEUED, FAILED),
+            )
+        self.con.execute("COMMIT")
+
+    def resume(self, sent_ids: Iterable[str]) -> Dict[str, int]:
+        """
+        Na subida: item inflight (o processo anterior caiu no meio do envio) vira sent se
+        está no ledger; senão unconfirmed - o Enter pode ter saído (ou o daemon ainda
+        posta o job), então nunca é reenviado. Item do ledger ainda pendente (enviado por
+        outro caminho) vira sent.
+        """
+        sent_ids = [str(s) for s in sent_ids]
+        out = {"recovered_sent": 0, "unconfirmed": 0}
+        rows = self.con.execute("SELECT itemid FROM items WHERE status = ?", (INFLIGHT,)).fetchall()
+        sent_set = set(sent_ids)
+        for (iid,) in rows:
+            if iid in sent_set:
+                self.mark_sent(iid)
+                out["recovered_sent"] += 1
+            else:
+                self.mark_unconfirmed(iid, "processo interrompido durante o envio")
+                out["unconfirmed"] += 1
+        for iid in sent_set:
+            cur = self.con.execute(
+                "UPDATE items SET status = ?, sent_at = COALESCE(sent_at, ?), updated_at = ? "
+                "WHERE itemid = ? AND status IN (?, ?)",
+                (SENT, self._now(), self._now(), iid, QUEUED, FAILED),
+            )
+            out["recovered_sent"] += cur.rowcount
+        return out
+
+    # ---------- leitura ----------
+    def pending_rows(self) -> List[Dict]:
+        """Itens queued/failed na ordem de envio; failed vem com "_next_try" (epoch) do backoff."""
+        out: List[Dict] = []
+        for row, status, next_try in self.con.execute(
+            "SELECT row, status, next_try FROM items WHERE status IN (?, ?) ORDER BY priority DESC, position",
+            (QUEUED, FAILED),
+        ):
+            r = json.loads(row)
+            if status == FAILED:
+                r["_next_try"] = next_try
+            out.append(r)
+        return out
+
+    def itemids(self, *statuses: str) -> Set[str]:
+        """itemid de todos os itens nesses estados."""
+        marks = ", ".join("?" * len(statuses))
+        return {r[0] for r in self.con.execute(f"SELECT itemid FROM items WHERE status IN ({marks})", statuses)}
+
+    def counts(self) -> Dict[str, int]:
+        c = {s: 0 for s in STATES}
+        for status, n in self.con.execute("SELECT status, COUNT(*) FROM items GROUP BY status"):
+            c[status] = int(n)
+        return c
+
+    def failed_attempts(self) -> int:
+        """Tentativas que não viraram envio (cada uma gastou tempo de envio)."""
+        return int(
+            self.con.execute(
+                "SELECT COALESCE(SUM(CASE WHEN status = ? THEN attempts - 1 ELSE attempts END), 0) "
+                "FROM items WHERE attempts > 0",
+                (SENT,),
+            ).fetchone()[0]
+        )
+
+    # ---------- transições ----------
+    def _set(self, itemid: str, sql: str, *params) -> None:
+        self.con.execute(f"UPDATE items SET {sql}, updated_at = ? WHERE itemid = ?", (*params, self._now(), itemid))
+
+    def mark_inflight(self, itemid: str) -> bool:
+        """
+        Só item queued/failed vai para inflight. False = já saiu (sent/unconfirmed), está
+        dead ou em envio: quem chamou não envia.
+        """
+        cur = self.con.execute(
+            "UPDATE items SET status = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE itemid = ? AND status IN (?, ?)",
+            (INFLIGHT, self._now(), itemid, QUEUED, FAILED),
+        )
+        return cur.rowcount > 0
+
+    def mark_sent(self, itemid: str) -> None:
+        self._set(itemid, "status = ?, error = '', sent_at = ?", SENT, self._now())
+
+    def mark_dead(self, itemid: str, error: str) -> None:
+        self._set(itemid, "status = ?, error = ?", DEAD, error[:500])
+
+    def mark_unconfirmed(self, itemid: str, error: str) -> None:
+        self._set(itemid, "status = ?, error = ?, sent_at = ?", UNCONFIRMED, error[:500], self._now())
+
+    def mark_failed(self, itemid: str, error: str) -> Optional[float]:
+        """
+        Falha de envio: agenda nova tentativa com backoff exponencial e retorna o epoch dela,
+        ou marca dead (retorna None) se as tentativas acabaram.
+        """
+        row = self.con.execute("SELECT attempts FROM items WHERE itemid = ?", (itemid,)).fetchone()
+        attempts = int(row[0]) if row else self.max_attempts
+        if attempts >= self.max_attempts:
+            self.mark_dead(itemid, error)
+            return None
+        delay = min(self.backoff_max_s, self.backoff_s * math.pow(2, max(0, attempts - 1)))
+        next_try = self._now() + delay
+        self._set(itemid, "status = ?, error = ?, next_try = ?", FAILED, error[:500], next_try)
+        return next_try
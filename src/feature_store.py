@@ -0,0 +1,232 @@
+# src/feature_store.py
+from __future__ import annotations
+
+import hashlib
+import pickle
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.keyword_matcher import KeywordMatcher, fold_text
+from src.near_dup import minhash_signatures
+from src.selection import normalize_titles, _NOISE_WORDS
+
+
+_STORE_VERSION = 1
+
+# combina hash(itemid) e hash(título) numa chave só (primo de 64 bits do FNV)
+_HASH_MULT = 0x100000001B3
+
+# campos guardados por item (mesma ordem das linhas de `_keys`)
+_FIELDS = ("title_key", "tokens", "counts", "sigs", "has_sig")
+
+
+def item_keys(itemids: pd.Series, titles: pd.Series) -> np.ndarray:
+    """Chave uint64 de (itemid, título): título mudou -> chave nova -> recalcula."""
+    ids = pd.Series(itemids).astype(str).str.strip()
+    h_ids = pd.util.hash_pandas_object(ids, index=False).to_numpy(dtype=np.uint64)
+    h_titles = pd.util.hash_pandas_object(pd.Series(titles).astype(str), index=False).to_numpy(dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        return (h_ids * np.uint64(_HASH_MULT)) ^ h_titles
+
+
+class FeatureStore:
+    """
+    Features de título por item, persistidas entre execuções (~90% dos itens se repetem):
+    chave normalizada (dedupe), tokens sem acento, contagens das listas de palavras-chave
+    (por grupo lista/peso) e assinatura MinHash.
+
+    Só títulos novos ou alterados são recalculados. O arquivo guarda o fingerprint da config
+    (palavras-chave + num_perm); se mudar, o store é descartado e refeito.
+
+    Em processos auxiliares o store é só leitura: o que foi calculado/visto fica num "delta"
+    (take_delta) que o processo principal aplica (apply_delta) antes de salvar.
+    """
+
+    def __init__(self, matcher: KeywordMatcher, num_perm: int, max_entries: Optional[int] = None):
+        self.matcher = matcher
+        self.num_perm = int(num_perm)
+        self.max_entries = max_entries
+        self.fingerprint = hashlib.sha1(
+            f"{matcher.fingerprint()}|{self.num_perm}|{_NOISE_WORDS}".encode("utf-8")
+        ).hexdigest()
+
+        self._keys = np.zeros(0, dtype=np.uint64)  # ordenado
+        self._last_seen = np.zeros(0, dtype=np.int64)
+        self._data: Dict[str, np.ndarray] = self._empty(0)
+
+        self._touched: List[np.ndarray] = []
+        self._pending: List[Tuple[np.ndarray, Dict[str, np.ndarray]]] = []
+        self.hits = 0
+        self.misses = 0
+
+    def _empty(self, n: int) -> Dict[str, np.ndarray]:
+        return {
+            "title_key": np.empty(n, dtype=object),
+            "tokens": np.empty(n, dtype=object),
+            "counts": np.zeros((n, len(self.matcher.groups)), dtype=np.int32),
+            "sigs": np.zeros((n, self.num_perm), dtype=np.uint32),
+            "has_sig": np.zeros(n, dtype=bool),
+        }
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # ---------- persistência ----------
+    @staticmethod
+    def load(path: Path, matcher: KeywordMatcher, num_perm: int, max_entries: Optional[int] = None) -> "FeatureStore":
+        store = FeatureStore(matcher, num_perm, max_entries)
+        if not path.exists():
+            return store
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            print(f"INFO FeatureStore: falha ao ler {path} ({e}). Recriando.")
+            return store
+        if payload.get("version") != _STORE_VERSION or payload.get("fingerprint") != store.fingerprint:
+            print(f"INFO FeatureStore: {path.name} de outra config (palavras-chave/num_perm). Recriando.")
+            return store
+        store._keys = payload["keys"]
+        store._last_seen = payload["last_seen"]
+        store._data = {k: payload[k] for k in _FIELDS}
+        return store
+
+    def _evict(self, keep: np.ndarray, max_entries: Optional[int]) -> None:
+        """Fica só com `keep` (posições) e, acima do limite, com os vistos mais recentemente."""
+        if max_entries is not None and len(keep) > max_entries:
+            keep = np.sort(keep[np.argsort(-self._last_seen[keep], kind="stable")[:max_entries]])
+        if len(keep) == len(self._keys):
+            return
+        self._keys = self._keys[keep]
+        self._last_seen = self._last_seen[keep]
+        self._data = {k: v[keep] for k, v in self._data.items()}
+
+    def save(self, path: Path, ttl_days: int) -> None:
+        self.flush()
+        today = date.today().toordinal()
+        self._evict(np.flatnonzero(today - self._last_seen <= ttl_days), self.max_entries)
+
+        payload = {
+            "version": _STORE_VERSION,
+            "fingerprint": self.fingerprint,
+            "keys": self._keys,
+            "last_seen": self._last_seen,
+        }
+        payload.update(self._data)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+    # ---------- features ----------
+    def _compute(self, titles: pd.Series) -> Dict[str, np.ndarray]:
+        title_key = normalize_titles(titles).reset_index(drop=True)
+        tokens = fold_text(title_key, fold_accents=True).str.findall(r"\w+").str.join(" ")
+        sigs, has_sig = minhash_signatures(title_key, self.num_perm)
+        return {
+            "title_key": title_key.to_numpy(dtype=object),
+            "tokens": tokens.to_numpy(dtype=object),
+            "counts": self.matcher.group_counts(titles),
+            "sigs": sigs,
+            "has_sig": has_sig,
+        }
+
+    def _find(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        pos = np.searchsorted(self._keys, keys)
+        pos_c = np.minimum(pos, max(len(self._keys) - 1, 0))
+        found = (pos < len(self._keys)) & (self._keys[pos_c] == keys) if len(self._keys) else np.zeros(len(keys), bool)
+        return pos_c, found
+
+    def features(self, itemids: pd.Series, titles: pd.Series) -> Dict[str, np.ndarray]:
+        """
+        Features das linhas (mesma ordem): title_key, tokens, counts, sigs, has_sig.
+        Busca em lote no store; calcula só as que faltam (e guarda no delta).
+        """
+        titles = pd.Series(titles).reset_index(drop=True)
+        keys = item_keys(itemids, titles)
+        pos, found = self._find(keys)
+        miss = np.flatnonzero(~found)
+        self.hits += int(found.sum())
+        self.misses += len(miss)
+
+        out = self._empty(len(keys))
+        hit = np.flatnonzero(found)
+        for k in _FIELDS:
+            out[k][hit] = self._data[k][pos[hit]]
+        self._touched.append(keys[hit])
+
+        if miss.size:
+            computed = self._compute(titles.iloc[miss])
+            for k in _FIELDS:
+                out[k][miss] = computed[k]
+            self._pending.append((keys[miss], computed))
+        return out
+
+    # ---------- delta (processos auxiliares -> principal) ----------
+    def take_delta(self):
+        delta = (self._touched, self._pending, self.hits, self.misses)
+        self._touched, self._pending = [], []
+        self.hits = self.misses = 0
+        return delta
+
+    def apply_delta(self, delta) -> None:
+        touched, pending, hits, misses = delta
+        self._touched.extend(touched)
+        self._pending.extend(pending)
+        self.hits += hits
+        self.misses += misses
+
+    @property
+    def pending_rows(self) -> int:
+        return sum(len(k) for k, _ in self._pending)
+
+    def flush(self, min_pending: int = 0) -> None:
+        """
+        Incorpora ao store o que foi calculado/visto desde o último flush (só se houver ao
+        menos `min_pending` linhas novas). Acima de max_entries saem os vistos há mais tempo.
+        """
+        if self.pending_rows < min_pending:
+            return
+        today = date.today().toordinal()
+        if self._touched:
+            seen = np.concatenate(self._touched)
+            pos, found = self._find(seen)
+            self._last_seen[pos[found]] = today
+            self._touched = []
+        if not self._pending:
+            return
+
+        new_keys = np.concatenate([k for k, _ in self._pending])
+        new_data = {f: np.concatenate([d[f] for _, d in self._pending]) for f in _FIELDS}
+        self._pending = []
+
+        # mesma chave calculada em dois blocos (ou já incorporada): fica a 1ª
+        new_keys, first = np.unique(new_keys, return_index=True)
+        _, already = self._find(new_keys)
+        first = first[~already]
+        new_keys = new_keys[~already]
+
+        keys = np.concatenate([self._keys, new_keys])
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._last_seen = np.concatenate([self._last_seen, np.full(len(new_keys), today, dtype=np.int64)])[order]
+        for f in _FIELDS:
+            self._data[f] = np.concatenate([self._data[f], new_data[f][first]])[order]
+        self._evict(np.arange(len(self._keys)), self.max_entries)
+
+    def lookup(self, itemids: pd.Series, titles: pd.Series) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Só leitura, sem calcular: (achou?, features) — linhas não achadas ficam vazias."""
+        keys = item_keys(itemids, pd.Series(titles).reset_index(drop=True))
+        pos, found = self._find(keys)
+        out = self._empty(len(keys))
+        hit = np.flatnonzero(found)
+        for k in _FIELDS:
+            out[k][hit] = self._data[k][pos[hit]]
+        return found, out
+
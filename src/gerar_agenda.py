@@ -1,18 +1,22 @@
 import os
-from datetime import datetime, timedelta, date
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
 import pandas as pd
 
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.catalog import (  # noqa: E402
+    ABA_BASE, ABA_AGENDA, ABA_LOG, load_base, load_sheet, save_sheets, type_agenda, mark_sent,
+)
+
 # ==========================
 # CONFIGURAÇÕES
 # ==========================
-import os
 ARQUIVO_CONTROLE = os.getenv("CONTROLE_PRODUTOS_XLSX", "data/controle_produtos.xlsx")
 
-
-ABA_BASE = "produtos_base"
-ABA_AGENDA = "agenda_dia"
-ABA_LOG = "log_envios"
-
 MIN_AVALIACAO = 4.5
 COOLDOWN_HORAS = 48  # 2 dias
 
@@ -45,70 +49,29 @@ def distribuir_horarios(time_blocks):
             horarios.append((start_dt + step * i, geracao))
     return horarios  # lista de (datetime, geracao)
 
-def to_date_or_none(x):
-    if pd.isna(x) or x is None or str(x).strip() == "":
-        return None
-    # aceita datetime, date ou string
-    if isinstance(x, datetime):
-        return x.date()
-    if isinstance(x, date):
-        return x
-    # tenta parsear string
-    try:
-        return pd.to_datetime(x).date()
-    except Exception:
-        return None
-
-def cooldown_ok(ultimo_envio, now_dt: datetime, cooldown_horas: int) -> bool:
-    if ultimo_envio is None:
-        return True
-    # último envio como date -> considera 00:00 daquele dia
-    last_dt = datetime.combine(ultimo_envio, datetime.min.time())
-    return (now_dt - last_dt) >= timedelta(hours=cooldown_horas)
-
-
 # ==========================
 # CARREGAMENTO DA BASE
 # ==========================
 def carregar_base(path: str) -> pd.DataFrame:
-    df = pd.read_excel(path, sheet_name=ABA_BASE)
-    # normaliza colunas esperadas (não cria, mas garante leitura)
-    colunas_necessarias = [
+    # já tipada: status/geracao categóricos normalizados, ultimo_envio datetime64
+    return load_base(path, required=[
         "produto_id", "nome_curto", "link_afiliado", "preco_atual",
         "avaliacao", "categoria", "geracao", "ultimo_envio", "status"
-    ]
-    faltando = [c for c in colunas_necessarias if c not in df.columns]
-    if faltando:
-        raise ValueError(f"Colunas faltando na aba '{ABA_BASE}': {faltando}")
-
-    df["status"] = df["status"].astype(str).str.strip().str.lower()
-    df["geracao"] = df["geracao"].astype(str).str.strip().str.upper()
-    df["avaliacao"] = pd.to_numeric(df["avaliacao"], errors="coerce")
-    df["ultimo_envio"] = df["ultimo_envio"].apply(to_date_or_none)
-    return df
+    ])
 
 def filtrar_elegiveis(df: pd.DataFrame, now_dt: datetime) -> pd.DataFrame:
     # status ativo + avaliação mínima + geração válida
+    # cooldown: último envio como date -> considera 00:00 daquele dia
+    cooldown = df["ultimo_envio"].isna() | ((now_dt - df["ultimo_envio"]) >= timedelta(hours=COOLDOWN_HORAS))
     elegiveis = df[
         (df["status"] == "ativo") &
         (df["avaliacao"].fillna(0) >= MIN_AVALIACAO) &
-        (df["geracao"].isin(["A", "B", "C"]))
+        (df["geracao"].isin(["A", "B", "C"])) &
+        cooldown
     ].copy()
 
-    # cooldown
-    elegiveis["cooldown_ok"] = elegiveis["ultimo_envio"].apply(
-        lambda d: cooldown_ok(d, now_dt, COOLDOWN_HORAS)
-    )
-    elegiveis = elegiveis[elegiveis["cooldown_ok"] == True].copy()
-
     # ordena por "nunca enviado primeiro", depois mais antigo
-    # (None vira uma data antiga artificial)
-    def sort_key(d):
-        return d if d is not None else date(1900, 1, 1)
-
-    elegiveis["ultimo_envio_sort"] = elegiveis["ultimo_envio"].apply(sort_key)
-    elegiveis = elegiveis.sort_values(["geracao", "ultimo_envio_sort"], ascending=[True, True])
-    return elegiveis.drop(columns=["cooldown_ok"])
+    return elegiveis.sort_values(["geracao", "ultimo_envio"], ascending=[True, True], na_position="first")
 
 def montar_agenda(df_elegiveis: pd.DataFrame, horarios) -> pd.DataFrame:
     """
@@ -135,8 +98,8 @@ def montar_agenda(df_elegiveis: pd.DataFrame, horarios) -> pd.DataFrame:
         while idx[ger] < len(lista):
             row = lista.loc[idx[ger]]
             idx[ger] += 1
-            pid = str(row["produto_id"]).strip()
-            if pid not in usados:
+            pid = row["produto_id"]
+            if pd.notna(pid) and pid not in usados:
                 escolhido = row
                 usados.add(pid)
                 break
@@ -145,7 +108,7 @@ def montar_agenda(df_elegiveis: pd.DataFrame, horarios) -> pd.DataFrame:
             # Sem produto disponível -> deixa vazio com valido=NAO
             linhas.append({
                 "horario": dt_horario.strftime("%H:%M"),
-                "produto_id": "",
+                "produto_id": pd.NA,
                 "geracao": ger,
                 "valido": "NAO",
                 "motivo": "SEM_PRODUTO_ELEGIVEL"
@@ -153,82 +116,37 @@ def montar_agenda(df_elegiveis: pd.DataFrame, horarios) -> pd.DataFrame:
         else:
             linhas.append({
                 "horario": dt_horario.strftime("%H:%M"),
-                "produto_id": str(escolhido["produto_id"]).strip(),
+                "produto_id": escolhido["produto_id"],
                 "geracao": ger,
                 "valido": "SIM",
                 "motivo": ""
             })
 
-    agenda = pd.DataFrame(linhas)
-    return agenda
+    return type_agenda(pd.DataFrame(linhas))
 
 def salvar_excel(path: str, df_base: pd.DataFrame, agenda: pd.DataFrame):
-    # Lê todas as abas existentes e regrava mantendo o conteúdo
-    xls = pd.ExcelFile(path)
-    abas_existentes = xls.sheet_names
-
-    with pd.ExcelWriter(path, engine="openpyxl", mode="w") as writer:
-        # regrava todas as abas que existiam
-        for aba in abas_existentes:
-            if aba == ABA_BASE:
-                df_base.to_excel(writer, sheet_name=ABA_BASE, index=False)
-            elif aba == ABA_AGENDA:
-                agenda.to_excel(writer, sheet_name=ABA_AGENDA, index=False)
-            else:
-                pd.read_excel(path, sheet_name=aba).to_excel(writer, sheet_name=aba, index=False)
-
-        # se não existia, cria
-        if ABA_AGENDA not in abas_existentes:
-            agenda.to_excel(writer, sheet_name=ABA_AGENDA, index=False)
-        if ABA_BASE not in abas_existentes:
-            df_base.to_excel(writer, sheet_name=ABA_BASE, index=False)
+    # regrava base + agenda mantendo as outras abas
+    save_sheets(path, {ABA_BASE: df_base, ABA_AGENDA: agenda})
 
 def registrar_log(path: str, agenda: pd.DataFrame):
     """
     Registra SOMENTE os itens válidos (SIM) no log com data de hoje.
     """
-    hoje = datetime.now().date().isoformat()
     df_log_new = agenda[agenda["valido"] == "SIM"].copy()
-    df_log_new["data"] = hoje
+    df_log_new["data"] = pd.Timestamp(datetime.now().date())
     df_log_new = df_log_new[["data", "horario", "produto_id", "geracao"]]
 
-    try:
-        df_log = pd.read_excel(path, sheet_name=ABA_LOG)
-    except Exception:
-        df_log = pd.DataFrame(columns=["data", "horario", "produto_id", "geracao"])
-
+    df_log = load_sheet(path, ABA_LOG, missing_ok=True)
     df_log = pd.concat([df_log, df_log_new], ignore_index=True)
 
     # regrava o arquivo mantendo as abas (com log atualizado)
-    xls = pd.ExcelFile(path)
-    abas_existentes = xls.sheet_names
-
-    with pd.ExcelWriter(path, engine="openpyxl", mode="w") as writer:
-        for aba in abas_existentes:
-            if aba == ABA_LOG:
-                df_log.to_excel(writer, sheet_name=ABA_LOG, index=False)
-            else:
-                pd.read_excel(path, sheet_name=aba).to_excel(writer, sheet_name=aba, index=False)
-
-        if ABA_LOG not in abas_existentes:
-            df_log.to_excel(writer, sheet_name=ABA_LOG, index=False)
+    save_sheets(path, {ABA_LOG: df_log})
 
 def aplicar_ultimo_envio(df_base: pd.DataFrame, agenda: pd.DataFrame) -> pd.DataFrame:
     """
     Atualiza ultimo_envio para os produtos postados hoje (valido == SIM).
     """
-    hoje = datetime.now().date()
-    enviados = set(agenda.loc[agenda["valido"] == "SIM", "produto_id"].astype(str).str.strip())
-
-    def upd(row):
-        pid = str(row["produto_id"]).strip()
-        if pid in enviados:
-            return hoje
-        return row["ultimo_envio"]
-
-    df_base = df_base.copy()
-    df_base["ultimo_envio"] = df_base.apply(upd, axis=1)
-    return df_base
+    return mark_sent(df_base, agenda.loc[agenda["valido"] == "SIM", "produto_id"], datetime.now().date())
 
 
 # ==========================
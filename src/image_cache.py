@@ -0,0 +1,264 @@
+# src/image_cache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+
+# tipos de payload guardados por imagem
+DIB = "dib"   # CF_DIB pronto para o clipboard (BMP sem o cabeçalho de arquivo de 14 bytes)
+JPG = "jpg"   # JPEG para upload por arquivo
+
+# o WhatsApp recomprime acima disso; não adianta guardar/colar maior
+MAX_SIDE = 1280
+JPEG_QUALITY = 85
+MIN_SIDE = 50
+
+_BMP_FILE_HEADER = 14
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha1(url.strip().encode("utf-8")).hexdigest()
+
+
+def content_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class CachedImage:
+    content_hash: str
+    width: int
+    height: int
+    dib_path: Path
+    jpg_path: Path
+
+    def payload(self, kind: str = DIB) -> bytes:
+        """Uma leitura do arquivo, nada de decodificar/converter."""
+        return (self.dib_path if kind == DIB else self.jpg_path).read_bytes()
+
+
+def decode_image(data: bytes, min_side: int = MIN_SIDE) -> Image.Image:
+    """Bytes baixados -> imagem RGB. Não decodifica ou menor que min_side -> ValueError."""
+    try:
+        img = Image.open(BytesIO(data))
+        img.load()
+    except Exception as e:
+        raise ValueError(f"imagem não decodifica ({e})") from e
+    if min(img.size) < min_side:
+        raise ValueError(f"imagem pequena demais {img.size}")
+    return img.convert("RGB")
+
+
+def encode_payloads(img: Image.Image, max_side: int = MAX_SIDE) -> Tuple[memoryview, memoryview, Tuple[int, int]]:
+    """Imagem -> (DIB, JPEG, (largura, altura)), já reduzida para caber em max_side x max_side."""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    if max(img.size) > max_side:
+        img = img.copy()
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    bmp = BytesIO()
+    img.save(bmp, "BMP")
+    # memoryview: corta o cabeçalho sem copiar; a cópia única é a escrita no disco
+    dib = bmp.getbuffer()[_BMP_FILE_HEADER:]
+
+    jpg = BytesIO()
+    img.save(jpg, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return dib, jpg.getbuffer(), img.size
+
+
+def _encode(data: bytes, max_side: int):
+    """(DIB, JPEG, tamanho, {"decode": ms, "encode": ms})."""
+    t0 = time.perf_counter()
+    img = decode_image(data)
+    t1 = time.perf_counter()
+    dib, jpg, size = encode_payloads(img, max_side)
+    t2 = time.perf_counter()
+    return dib, jpg, size, {"decode": (t1 - t0) * 1000, "encode": (t2 - t1) * 1000}
+
+
+def _encode_in_worker(data: bytes, max_side: int):
+    """Mesmo que _encode, rodando em outro processo (memoryview não atravessa o pickle)."""
+    dib, jpg, size, ms = _encode(data, max_side)
+    return bytes(dib), bytes(jpg), size, ms
+
+
+class ImageCache:
+    """
+    Cache em disco de imagens prontas para colar/enviar, por hash da URL e hash do conteúdo.
+
+    urls:  url_hash -> content_hash (duas URLs com a mesma imagem dividem os arquivos)
+    blobs: content_hash -> <hash>.dib / <hash>.jpg, tamanho e último uso
+
+    Passa de max_bytes -> apaga as menos usadas recentemente (LRU). Seguro entre threads
+    (prefetch) e entre processos (o SQLite trava o índice).
+
+    Com `pool` (ProcessPoolExecutor), imagem maior que max_side é reduzida/codificada em
+    outro processo, sem segurar as threads de download.
+    """
+
+    def __init__(
+        self,
+        root,
+        max_bytes: int = 500 * 1024 * 1024,
+        max_side: int = MAX_SIDE,
+        pool: Optional[Executor] = None,
+    ):
+        self.root = Path(root)
+        self.pool = pool
+        self.downscaled = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.max_side = int(max_side)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.con = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False, timeout=30)
+        self.con.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                url_hash     TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                content_hash TEXT PRIMARY KEY,
+                width        INTEGER,
+                height       INTEGER,
+                bytes        INTEGER NOT NULL,
+                last_used    REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+            """
+        )
+
+    def close(self) -> None:
+        self.con.close()
+
+    def _paths(self, content_hash: str):
+        sub = self.root / content_hash[:2]
+        return sub / f"{content_hash}.{DIB}", sub / f"{content_hash}.{JPG}"
+
+    def _entry(self, content_hash: str, width: int, height: int) -> CachedImage:
+        dib, jpg = self._paths(content_hash)
+        return CachedImage(content_hash, int(width), int(height), dib, jpg)
+
+    def get(self, url: str) -> Optional[CachedImage]:
+        """Imagem já processada para essa URL (e marca o uso), ou None."""
+        with self._lock:
+            row = self.con.execute(
+                "SELECT b.content_hash, b.width, b.height FROM urls u JOIN blobs b USING (content_hash) "
+                "WHERE u.url_hash = ?",
+                (url_key(url),),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            entry = self._entry(*row)
+            if not entry.dib_path.exists():
+                # arquivo apagado por fora: trata como ausente
+                self.con.execute("DELETE FROM blobs WHERE content_hash = ?", (row[0],))
+                self.con.commit()
+                self.misses += 1
+                return None
+            self.con.execute("UPDATE blobs SET last_used = ? WHERE content_hash = ?", (time.time(), row[0]))
+            self.con.commit()
+            self.hits += 1
+            return entry
+
+    def put(self, url: str, data: bytes, phases: Optional[Dict[str, float]] = None) -> CachedImage:
+        """
+        Bytes baixados -> decodifica, reduz e grava os payloads (se esse conteúdo ainda não
+        existe) e associa a URL. Imagem inválida -> ValueError.
+        `phases` recebe os ms de "decode" e "encode" (nada se o conteúdo já estava no cache).
+        """
+        chash = content_key(data)
+        with self._lock:
+            row = self.con.execute(
+                "SELECT content_hash, width, height FROM blobs WHERE content_hash = ?", (chash,)
+            ).fetchone()
+        if row is not None and self._paths(chash)[0].exists():
+            entry = self._entry(*row)
+        else:
+            if self._needs_downscale(data):
+                with self._lock:
+                    self.downscaled += 1
+                if self.pool is not None:
+                    dib, jpg, (w, h), ms = self.pool.submit(_encode_in_worker, data, self.max_side).result()
+                else:
+                    dib, jpg, (w, h), ms = _encode(data, self.max_side)
+            else:
+                dib, jpg, (w, h), ms = _encode(data, self.max_side)
+            if phases is not None:
+                phases.update(ms)
+            dib_path, jpg_path = self._paths(chash)
+            dib_path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(dib_path, dib)
+            _write_atomic(jpg_path, jpg)
+            entry = self._entry(chash, w, h)
+            with self._lock:
+                self.con.execute(
+                    "INSERT OR REPLACE INTO blobs (content_hash, width, height, bytes, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (chash, w, h, len(dib) + len(jpg), time.time()),
+                )
+                self.con.commit()
+
+        with self._lock:
+            self.con.execute(
+                "INSERT OR REPLACE INTO urls (url_hash, content_hash) VALUES (?, ?)", (url_key(url), chash)
+            )
+            self.con.commit()
+        self.evict()
+        return entry
+
+    def _needs_downscale(self, data: bytes) -> bool:
+        """Só lê o cabeçalho (Image.open é preguiçoso): maior que max_side?"""
+        try:
+            return max(Image.open(BytesIO(data)).size) > self.max_side
+        except Exception:
+            # não decodifica: _encode levanta o ValueError certo
+            return False
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return int(self.con.execute("SELECT COALESCE(SUM(bytes), 0) FROM blobs").fetchone()[0])
+
+    def evict(self) -> int:
+        """Apaga as imagens menos usadas até o total caber em max_bytes. Retorna quantas saíram."""
+        with self._lock:
+            total = int(self.con.execute("SELECT COALESCE(SUM(bytes), 0) FROM blobs").fetchone()[0])
+            if total <= self.max_bytes:
+                return 0
+            removed = []
+            for chash, size in self.con.execute("SELECT content_hash, bytes FROM blobs ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                removed.append(chash)
+                total -= int(size)
+            for chash in removed:
+                for p in self._paths(chash):
+                    try:
+                        p.unlink()
+                    except FileNotFoundError:
+                        pass
+            self.con.executemany("DELETE FROM blobs WHERE content_hash = ?", ((c,) for c in removed))
+            self.con.execute("DELETE FROM urls WHERE content_hash NOT IN (SELECT content_hash FROM blobs)")
+            self.con.commit()
+        return len(removed)
+
+
+def _write_atomic(path: Path, data) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
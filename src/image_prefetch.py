@@ -0,0 +1,291 @@
+# src/image_prefetch.py
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+
+from src.image_cache import DIB, ImageCache
+
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class ImageFetchError(Exception):
+    """Imagem morta: 404/410, conteúdo que não é imagem, não decodifica ou pequena demais."""
+
+
+def fetch_bytes(session: requests.Session, url: str, timeout: float = 15.0, retries: int = 1) -> bytes:
+    """
+    Baixa a imagem (bytes crus). Timeout/5xx tenta de novo `retries` vezes; 4xx e
+    conteúdo que não é imagem falham na hora (ImageFetchError).
+    """
+    last = ""
+    for attempt in range(retries + 1):
+        try:
+            r = session.get(url, headers=HEADERS, timeout=timeout)
+        except requests.RequestException as e:
+            last = f"{type(e).__name__}: {e}"
+            time.sleep(0.5 * (attempt + 1))
+            continue
+        if r.status_code >= 500:
+            last = f"HTTP {r.status_code}"
+            time.sleep(0.5 * (attempt + 1))
+            continue
+        if r.status_code >= 400:
+            raise ImageFetchError(f"HTTP {r.status_code}: {url}")
+
+        ctype = (r.headers.get("Content-Type") or "").lower()
+        if ctype and not ctype.startswith("image/") and "octet-stream" not in ctype:
+            raise ImageFetchError(f"conteúdo não é imagem ({ctype}): {url}")
+        return r.content
+    raise ImageFetchError(f"falha ao baixar ({last}): {url}")
+
+
+# CDN da Shopee: .../file/<hash> aceita um sufixo de variante de tamanho no próprio nome
+# (ex.: <hash>_tn = miniatura, <hash>@resize_w720_nl = largura 720)
+_SHOPEE_FILE = re.compile(r"^(https?://[^/?#]*susercontent\.com/file/)([0-9A-Za-z-]+)$")
+
+
+def variant_url(url: str, suffix: str) -> Optional[str]:
+    """URL da variante reduzida (ou None se o padrão da URL não permite / já é variante)."""
+    if not suffix:
+        return None
+    m = _SHOPEE_FILE.match(url.strip())
+    if not m:
+        return None
+    return f"{m.group(1)}{m.group(2)}{suffix}"
+
+
+class ImageStats:
+    """Bytes baixados x bytes que os originais teriam custado (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {
+            "images": 0, "cache_hits": 0, "variants": 0, "variant_fallbacks": 0,
+            "bytes_downloaded": 0, "bytes_original": 0,
+        }
+
+    def add(self, **kw: int) -> None:
+        with self._lock:
+            for k, v in kw.items():
+                self.counts[k] = self.counts.get(k, 0) + int(v)
+
+    @property
+    def bytes_saved(self) -> int:
+        return max(0, self.counts["bytes_original"] - self.counts["bytes_downloaded"])
+
+    def save_daily(self, path: Path, day: str) -> Dict[str, int]:
+        """Soma as contagens desta execução no total do dia (JSON {dia: contagens})."""
+        payload: Dict[str, Dict[str, int]] = {}
+        if path.exists():
+            try:
+                payload = json.loads(path.read_text(encoding="utf-8"))
+            except Exception:
+                payload = {}
+        today = payload.get(day, {})
+        with self._lock:
+            for k, v in self.counts.items():
+                today[k] = int(today.get(k, 0)) + v
+        today["bytes_saved"] = max(0, today.get("bytes_original", 0) - today.get("bytes_downloaded", 0))
+        payload[day] = today
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, indent=1, sort_keys=True), encoding="utf-8")
+        return today
+
+
+def _original_size(session: requests.Session, url: str, timeout: float) -> Optional[int]:
+    """Content-Length do original via HEAD (sem baixar o corpo); None se o CDN não informar."""
+    try:
+        r = session.head(url, headers=HEADERS, timeout=timeout, allow_redirects=True)
+        n = int(r.headers.get("Content-Length") or 0)
+        return n or None
+    except Exception:
+        return None
+
+
+def fetch_payload(
+    session: requests.Session,
+    url: str,
+    cache: ImageCache,
+    timeout: float = 15.0,
+    retries: int = 1,
+    kind: str = DIB,
+    variant: str = "",
+    stats: Optional[ImageStats] = None,
+    phases: Optional[Dict[str, float]] = None,
+) -> bytes:
+    """
+    Payload pronto (DIB para o clipboard ou JPEG para upload): do cache em disco se essa URL
+    já foi processada; senão baixa, valida, reduz, codifica e guarda.
+
+    Com `variant`, pede ao CDN a variante reduzida (variant_url) e só cai no original se ela
+    falhar; o cache continua indexado pela URL original.
+
+    `phases` recebe os ms de "download" (inclui a variante que falhou), "decode" e "encode";
+    num acerto do cache, só "cache" (leitura do payload do disco).
+    """
+    stats = stats or ImageStats()
+    phases = {} if phases is None else phases
+    t0 = time.perf_counter()
+    entry = cache.get(url)
+    if entry is not None:
+        try:
+            payload = entry.payload(kind)
+        except OSError:
+            # o LRU apagou o arquivo entre o get e a leitura: baixa de novo
+            payload = None
+        if payload is not None:
+            stats.add(images=1, cache_hits=1)
+            phases["cache"] = (time.perf_counter() - t0) * 1000
+            return payload
+
+    var = variant_url(url, variant)
+    if var:
+        try:
+            data = fetch_bytes(session, var, timeout, retries)
+            phases["download"] = (time.perf_counter() - t0) * 1000
+            entry = cache.put(url, data, phases)
+            orig = _original_size(session, url, timeout)
+            stats.add(images=1, variants=1, bytes_downloaded=len(data), bytes_original=orig or len(data))
+            return entry.payload(kind)
+        except (ImageFetchError, ValueError):
+            stats.add(variant_fallbacks=1)
+
+    data = fetch_bytes(session, url, timeout, retries)
+    phases["download"] = (time.perf_counter() - t0) * 1000
+    try:
+        entry = cache.put(url, data, phases)
+    except ValueError as e:
+        raise ImageFetchError(f"{e}: {url}") from e
+    stats.add(images=1, bytes_downloaded=len(data), bytes_original=len(data))
+    return entry.payload(kind)
+
+
+class ImagePrefetcher:
+    """
+    Prepara em segundo plano as imagens dos próximos itens da fila (baixa ou pega do cache
+    em disco), para o envio só pegar o payload pronto da memória (DIB para o clipboard ou
+    JPEG para o paste por evento, conforme `kind`).
+
+    Pool de threads com uma requests.Session por thread (conexões reaproveitadas com o CDN).
+    Cada URL é pedida uma vez; discard() libera o payload depois do envio. phases(url) dá
+    os ms de download/decode/encode daquela imagem (feitos em segundo plano).
+    """
+
+    def __init__(
+        self,
+        cache: ImageCache,
+        workers: int = 4,
+        timeout: float = 15.0,
+        retries: int = 1,
+        variant: str = "",
+        kind: str = DIB,
+    ):
+        self.cache = cache
+        self.variant = variant
+        self.kind = kind
+        self.stats = ImageStats()
+        self.timeout = timeout
+        self.retries = retries
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="img")
+        self._local = threading.local()
+        self._futures: Dict[str, Future] = {}
+        self._phases: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        sess = getattr(self._local, "session", None)
+        if sess is None:
+            sess = requests.Session()
+            self._local.session = sess
+        return sess
+
+    def _load(self, url: str) -> bytes:
+        phases: Dict[str, float] = {}
+        with self._lock:
+            self._phases[url] = phases
+        try:
+            return fetch_payload(
+                self.session, url, self.cache, self.timeout, self.retries,
+                kind=self.kind, variant=self.variant, stats=self.stats, phases=phases,
+            )
+        except ImageFetchError:
+            raise
+        except Exception as e:
+            # sqlite, disco, pool de processos quebrado...: para o envio é só uma imagem que não veio
+            raise ImageFetchError(f"{type(e).__name__}: {e}: {url}") from e
+
+    @property
+    def max_wait(self) -> float:
+        """
+        Pior caso de um download (s): cada fetch_bytes gasta até timeout por tentativa mais
+        as pausas entre elas; com variante são dois (variante que falha + original, ou
+        variante + HEAD do original), e sobra folga para decode/encode.
+        """
+        attempts = self.retries + 1
+        one = self.timeout * attempts + 0.5 * attempts * (attempts + 1) / 2
+        return one * (2 if self.variant else 1) + 5
+
+    def prefetch(self, url: str) -> None:
+        if not url:
+            return
+        with self._lock:
+            if url not in self._futures:
+                self._futures[url] = self._pool.submit(self._load, url)
+
+    def status(self, url: str) -> Optional[str]:
+        """None (não pedida) | "pending" | "ok" | "dead"."""
+        with self._lock:
+            fut = self._futures.get(url)
+        if fut is None:
+            return None
+        if not fut.done():
+            return "pending"
+        return "dead" if fut.exception() is not None else "ok"
+
+    def error(self, url: str) -> str:
+        with self._lock:
+            fut = self._futures.get(url)
+        if fut is None or not fut.done() or fut.exception() is None:
+            return ""
+        return str(fut.exception())
+
+    def get(self, url: str, wait: Optional[float] = None) -> bytes:
+        """
+        Payload pronto (ou espera o download em andamento, até `wait` s; None = max_wait).
+        Qualquer falha (imagem morta, download cancelado...) -> ImageFetchError.
+        """
+        self.prefetch(url)
+        with self._lock:
+            fut = self._futures[url]
+        if wait is None:
+            wait = self.max_wait
+        try:
+            return fut.result(timeout=wait)
+        except FutureTimeout as e:
+            raise ImageFetchError(f"download não terminou em {wait:.0f}s: {url}") from e
+        except CancelledError as e:
+            raise ImageFetchError(f"download cancelado: {url}") from e
+
+    def phases(self, url: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._phases.get(url, {}))
+
+    def discard(self, url: str) -> None:
+        with self._lock:
+            self._futures.pop(url, None)
+            self._phases.pop(url, None)
+
+    def close(self) -> None:
+        """Cancela o que não começou e espera os downloads em andamento (eles ainda gravam no cache)."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
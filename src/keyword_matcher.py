@@ -0,0 +1,304 @@
+# src/keyword_matcher.py
+from __future__ import annotations
+
+import hashlib
+import json
+import unicodedata
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class KeywordMatcherError(Exception):
+    pass
+
+
+# marcas combinantes (acentos) que sobram depois do NFKD
+_COMBINING_MARKS = {cp: None for cp in range(0x0300, 0x0370)}
+
+# títulos processados por bloco (limita a matriz de caracteres em memória)
+_CHUNK_ROWS = 50_000
+
+
+def fold_text(s: pd.Series, fold_accents: bool) -> pd.Series:
+    """lower() e, se pedido, remove acentos ("Reposição" -> "reposicao")."""
+    s = pd.Series(s).astype(str).str.lower()
+    if fold_accents:
+        s = s.str.normalize("NFKD").str.translate(_COMBINING_MARKS)
+    return s
+
+
+def _fold_term(term: str, fold_accents: bool) -> str:
+    t = term.lower()
+    if fold_accents:
+        t = unicodedata.normalize("NFKD", t).translate(_COMBINING_MARKS)
+    return t
+
+
+class KeywordMatcher:
+    """
+    Aho–Corasick compilado para várias listas de palavras (com peso) de uma vez.
+
+    O autômato vira uma tabela de transição densa (estados x alfabeto) e os títulos são
+    processados em paralelo com NumPy: a cada posição de caractere, todos os títulos
+    avançam um passo. Custo ~ total de caracteres, independente do número de termos.
+
+    Semântica igual a `termo in titulo.lower()`: cada termo conta no máximo 1x por título.
+    """
+
+    def __init__(
+        self,
+        lists: Dict[str, Sequence[Tuple[str, float]]],
+        fold_accents: bool = False,
+        base_score: float = 0.0,
+    ):
+        self.fold_accents = fold_accents
+        self.base_score = float(base_score)
+        self.list_names: List[str] = list(lists.keys())
+
+        self.terms: List[str] = []
+        self.term_list: List[int] = []
+        self.term_weight: List[float] = []
+        for li, name in enumerate(self.list_names):
+            seen = set()
+            for term, weight in lists[name]:
+                t = _fold_term(str(term), fold_accents)
+                # termo vazio casaria com tudo; repetido (ex.: após remover acento) contaria 2x
+                if not t or t in seen:
+                    continue
+                seen.add(t)
+                self.terms.append(t)
+                self.term_list.append(li)
+                self.term_weight.append(float(weight))
+
+        self._term_list = np.asarray(self.term_list, dtype=np.int64)
+        self._term_weight = np.asarray(self.term_weight, dtype="float64")
+
+        # grupos (lista, peso) na ordem das listas: score = base + soma(contagem do grupo * peso)
+        self.groups: List[Tuple[int, float]] = []
+        group_of: Dict[Tuple[int, float], int] = {}
+        for li, w in zip(self.term_list, self.term_weight):
+            if (li, w) not in group_of:
+                group_of[(li, w)] = len(self.groups)
+                self.groups.append((li, w))
+        self.groups.sort(key=lambda g: g[0])
+        group_of = {g: i for i, g in enumerate(self.groups)}
+        self._term_group = np.asarray(
+            [group_of[(li, w)] for li, w in zip(self.term_list, self.term_weight)], dtype=np.int64
+        )
+        self._build()
+
+    # ---------- config ----------
+    @staticmethod
+    def from_config(path: str | Path) -> "KeywordMatcher":
+        """
+        Formato:
+          {
+            "base_score": 0.55,
+            "fold_accents": false,
+            "lists": {
+              "easy": {"weight": 0.10, "terms": ["kit", {"term": "combo", "weight": 0.2}]},
+              "hard": {"weight": -0.15, "terms": ["réplica"]}
+            }
+          }
+        """
+        path = Path(path)
+        if not path.exists():
+            raise KeywordMatcherError(f"Config de palavras-chave não encontrada: {path}")
+        try:
+            cfg = json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError as e:
+            raise KeywordMatcherError(f"Config de palavras-chave inválida ({path}): {e}") from e
+
+        lists: Dict[str, List[Tuple[str, float]]] = {}
+        for name, spec in (cfg.get("lists") or {}).items():
+            default_w = float(spec.get("weight", 0.0))
+            items: List[Tuple[str, float]] = []
+            for t in spec.get("terms") or []:
+                if isinstance(t, dict):
+                    items.append((str(t.get("term", "")), float(t.get("weight", default_w))))
+                else:
+                    items.append((str(t), default_w))
+            lists[name] = items
+
+        return KeywordMatcher(
+            lists,
+            fold_accents=bool(cfg.get("fold_accents", False)),
+            base_score=float(cfg.get("base_score", 0.0)),
+        )
+
+    def fingerprint(self) -> str:
+        """Hash da config (termos, listas, pesos, fold): muda -> contagens salvas não valem mais."""
+        payload = json.dumps(
+            {
+                "lists": self.list_names,
+                "terms": self.terms,
+                "term_list": self.term_list,
+                "term_weight": self.term_weight,
+                "fold_accents": self.fold_accents,
+            },
+            ensure_ascii=False,
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    # ---------- autômato ----------
+    def _build(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for pid, term in enumerate(self.terms):
+            s = 0
+            for ch in term:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    out.append([])
+                    goto[s][ch] = nxt
+                s = nxt
+            out[s].append(pid)
+
+        alphabet = sorted({ch for t in self.terms for ch in t})
+        code = {ch: i + 1 for i, ch in enumerate(alphabet)}  # 0 = caractere fora dos termos
+        self._alphabet = np.asarray([ord(c) for c in alphabet], dtype=np.uint32)
+        # tabela direta para o plano básico (BMP); acima disso cai no searchsorted
+        self._lut = np.zeros(0x10000, dtype=np.int32)
+        for ch, c in code.items():
+            if ord(ch) < 0x10000:
+                self._lut[ord(ch)] = c
+        self._astral = self._alphabet[self._alphabet >= 0x10000]
+
+        n_states = len(goto)
+        delta = np.zeros((n_states, len(alphabet) + 1), dtype=np.int32)
+        fail = [0] * n_states
+
+        queue: deque[int] = deque()
+        for ch, s in goto[0].items():
+            delta[0, code[ch]] = s
+            queue.append(s)
+
+        # BFS: fail[r] é mais raso que r, então sua linha da tabela já está completa
+        while queue:
+            r = queue.popleft()
+            out[r] = out[r] + out[fail[r]]
+            delta[r, :] = delta[fail[r], :]
+            for ch, s in goto[r].items():
+                fail[s] = int(delta[fail[r], code[ch]])
+                delta[r, code[ch]] = s
+                queue.append(s)
+
+        self._delta = delta
+        self._n_codes = delta.shape[1]
+        self._delta_flat = delta.ravel()
+        lens = np.asarray([len(o) for o in out], dtype=np.int64)
+        self._out_len = lens
+        self._out_ptr = np.concatenate(([0], np.cumsum(lens)[:-1])).astype(np.int64)
+        self._out_ids = np.asarray([pid for o in out for pid in o], dtype=np.int64)
+        self._has_out = lens > 0
+
+    def _encode(self, titles: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        lens = np.fromiter((len(t) for t in titles), dtype=np.int64, count=len(titles))
+        maxlen = max(1, int(lens.max(initial=0)))
+        cp = np.asarray(titles, dtype=f"<U{maxlen}").view(np.uint32).reshape(len(titles), maxlen)
+        astral = cp >= 0x10000
+        codes = self._lut[cp & 0xFFFF]
+        if astral.any():
+            codes[astral] = 0
+            if self._astral.size:
+                v = cp[astral]
+                idx = np.searchsorted(self._alphabet, v)
+                idx_c = np.minimum(idx, self._alphabet.size - 1)
+                codes[astral] = np.where(self._alphabet[idx_c] == v, idx + 1, 0)
+        return codes, lens
+
+    # ---------- matching ----------
+    def match_pairs(self, titles: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna (linhas, termos): pares distintos (índice do título, id do termo) encontrados.
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        n_terms = len(self.terms)
+        if n_terms == 0:
+            return empty, empty
+
+        folded = fold_text(titles, self.fold_accents).tolist()
+        all_keys: List[np.ndarray] = []
+
+        for start in range(0, len(folded), _CHUNK_ROWS):
+            block = folded[start:start + _CHUNK_ROWS]
+            codes, lens = self._encode(block)
+
+            # mais longos primeiro: na posição k só os primeiros `m` títulos ainda têm caractere
+            order = np.argsort(-lens, kind="stable")
+            codes = np.ascontiguousarray(codes[order].T)
+            lens_sorted = lens[order]
+            state = np.zeros(len(block), dtype=np.int32)
+
+            ev_rows: List[np.ndarray] = []
+            ev_states: List[np.ndarray] = []
+            for k in range(codes.shape[0]):
+                m = int(np.searchsorted(-lens_sorted, -k, side="left"))
+                if m == 0:
+                    break
+                st = self._delta_flat[state[:m] * self._n_codes + codes[k, :m]]
+                state[:m] = st
+                hit = np.flatnonzero(self._has_out[st])
+                if hit.size:
+                    ev_rows.append(order[hit] + start)
+                    ev_states.append(st[hit])
+
+            if not ev_rows:
+                continue
+            rows = np.concatenate(ev_rows)
+            states = np.concatenate(ev_states)
+
+            # expande (linha, estado) -> (linha, termo) pelos termos de saída de cada estado
+            cnt = self._out_len[states]
+            rows_rep = np.repeat(rows, cnt)
+            first = np.repeat(self._out_ptr[states], cnt)
+            offs = np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+            pids = self._out_ids[first + offs]
+            all_keys.append(np.unique(rows_rep * n_terms + pids))
+
+        if not all_keys:
+            return empty, empty
+        keys = np.concatenate(all_keys)
+        return keys // n_terms, keys % n_terms
+
+    def group_counts(self, titles: pd.Series) -> np.ndarray:
+        """n x grupos (lista, peso): quantos termos distintos de cada grupo aparecem no título."""
+        n = len(titles)
+        counts = np.zeros((n, len(self.groups)), dtype=np.int32)
+        rows, pids = self.match_pairs(titles)
+        np.add.at(counts, (rows, self._term_group[pids]), 1)
+        return counts
+
+    def list_counts(self, group_counts: np.ndarray) -> pd.DataFrame:
+        """Soma os grupos de cada lista -> uma coluna por lista."""
+        data = {}
+        for li, name in enumerate(self.list_names):
+            cols = [g for g, (gl, _) in enumerate(self.groups) if gl == li]
+            data[name] = group_counts[:, cols].sum(axis=1).astype(np.int64)
+        return pd.DataFrame(data)
+
+    def scores_from_counts(self, group_counts: np.ndarray) -> np.ndarray:
+        """
+        base_score + soma dos pesos a partir das contagens por grupo.
+
+        Soma `contagem * peso` grupo a grupo, na ordem das listas, para dar exatamente o
+        mesmo float que `0.55 + 0.10 * bonus - 0.15 * malus`.
+        """
+        total = np.full(group_counts.shape[0], self.base_score, dtype="float64")
+        for g, (_, w) in enumerate(self.groups):
+            total = total + w * group_counts[:, g].astype(np.int64)
+        return total
+
+    def hit_counts(self, titles: pd.Series) -> pd.DataFrame:
+        """Uma coluna por lista com a quantidade de termos distintos encontrados em cada título."""
+        return self.list_counts(self.group_counts(titles))
+
+    def weighted_scores(self, titles: pd.Series) -> np.ndarray:
+        """base_score + soma dos pesos dos termos encontrados."""
+        return self.scores_from_counts(self.group_counts(titles))
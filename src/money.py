@@ -0,0 +1,263 @@
+# src/money.py
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# unidades aceitas na entrada: reais, centavos ou micro-unidades
+UNITS = ("brl", "cents", "micro")
+
+# Shopee (API/datafeed) às vezes manda preço em micro-unidades: 1 real = 100000
+MICRO_PER_BRL = 100_000
+
+CENTS_DTYPE = "Int64"
+
+# string de preço maior que isso é lixo (e incharia a matriz de caracteres do bloco)
+_MAX_TEXT_LEN = 40
+
+# blocos de strings por vez (limita a matriz de caracteres em memória)
+_CHUNK_ROWS = 200_000
+
+# dígitos no total (inteiro + fração) que cabem num int64 sem estourar
+_MAX_DIGITS = 18
+
+# parte inteira maior que isso não é preço
+_MAX_INT_DIGITS = 15
+
+_POW10 = 10 ** np.arange(_MAX_DIGITS + 1, dtype=np.int64)
+
+_DIGIT0, _DOT, _COMMA, _MINUS = 48, 46, 44, 45
+
+
+def _last_pos(mask: np.ndarray) -> np.ndarray:
+    """Posição da última ocorrência por linha (-1 se não tem)."""
+    width = mask.shape[1]
+    last = width - 1 - np.argmax(mask[:, ::-1], axis=1)
+    return np.where(mask.any(axis=1), last, -1)
+
+
+def _text_block_to_cents(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Strings -> (centavos int64, válido?) sem regex: cada string vira uma linha de uma matriz
+    de bytes e a decisão separador decimal x milhar sai de contagens/posições por linha.
+    Todos os dígitos viram um inteiro só; a posição do decimal diz quanto dividir.
+    """
+    n = len(texts)
+    arr = np.asarray(texts, dtype=str)
+    width = max(1, arr.dtype.itemsize // 4)
+    # fora do ASCII (R$ com NBSP, emoji...) vira 127: não é dígito nem separador
+    cp = np.minimum(arr.astype(f"<U{width}").view(np.uint32).reshape(n, width), 127).astype(np.uint8)
+    pos = np.arange(width)
+
+    d = cp - np.uint8(_DIGIT0)  # uint8: não-dígito dá a volta e fica >= 10
+    digit = d < 10
+    dot = cp == _DOT
+    comma = cp == _COMMA
+    minus = cp == _MINUS
+
+    n_dots = np.count_nonzero(dot, axis=1)
+    n_commas = np.count_nonzero(comma, axis=1)
+    n_digits = np.count_nonzero(digit, axis=1)
+    last_dot = _last_pos(dot)
+    last_comma = _last_pos(comma)
+
+    # separador decimal: -1 = não tem (só milhar ou inteiro)
+    # "1,234.56": último separador é o ponto e tem vírgula antes -> ponto decimal (americano)
+    us = (n_commas > 0) & (n_dots > 0) & (last_dot > last_comma)
+    # "1.234,56" / "77,89": vírgula decimal, pontos de milhar
+    br = (n_commas > 0) & ~us
+    dec = np.where(us, last_dot, np.where(br, last_comma, -1))
+
+    # sem vírgula e um ponto só: "77.89" decimal; "1.234" (1-3 dígitos + 3 dígitos) é milhar
+    one_dot = (n_commas == 0) & (n_dots == 1)
+    after_dot = np.count_nonzero(digit & (pos > last_dot[:, None]), axis=1)
+    dot_thousands = one_dot & (after_dot == 3) & (n_digits - after_dot <= 3)
+    dec = np.where(one_dot & ~dot_thousands, last_dot, dec)
+
+    has_dec = dec >= 0
+    n_frac = np.where(has_dec, np.count_nonzero(digit & (pos > dec[:, None]), axis=1), 0)
+
+    valid = (n_digits > 0) & (n_digits <= _MAX_DIGITS) & (n_digits - n_frac <= _MAX_INT_DIGITS)
+    # "1,2,3" (várias vírgulas sem ponto) é ambíguo; nada de separador depois do decimal
+    valid &= ~(br & (n_commas > 1))
+    valid &= ~(has_dec & (np.maximum(last_dot, last_comma) > dec))
+    # sinal: no máximo um "-" e antes do primeiro dígito
+    neg = minus.any(axis=1)
+    valid &= ~neg | ((np.count_nonzero(minus, axis=1) == 1) & (np.argmax(minus, axis=1) < np.argmax(digit, axis=1)))
+
+    # todos os dígitos como um inteiro: peso 10^(dígitos à direita)
+    right = np.cumsum(digit[:, ::-1], axis=1, dtype=np.int16)[:, ::-1] - digit
+    value = np.where(digit, d.astype(np.int64) * _POW10[np.minimum(right, _MAX_DIGITS)], 0).sum(axis=1)
+
+    # ajusta para centavos pela quantidade de casas decimais (3ª casa >= 5 arredonda para cima)
+    cents = np.where(n_frac == 0, value * 100, np.where(n_frac == 1, value * 10, value))
+    extra = np.clip(n_frac - 2, 0, _MAX_DIGITS)
+    many = n_frac > 2
+    if many.any():
+        q = value[many] // _POW10[extra[many]]
+        next_digit = (value[many] // _POW10[extra[many] - 1]) % 10
+        cents[many] = q + (next_digit >= 5)
+    return np.where(neg, -cents, cents), valid
+
+
+def _round_half_up(v: np.ndarray) -> np.ndarray:
+    # arredonda para 6 casas antes: 1.005 * 100 = 100.49999999999999 -> 100.5 -> 101
+    return np.floor(np.round(v, 6) + 0.5)
+
+
+def _numbers_to_cents(v: pd.Series, unit: str) -> pd.Series:
+    v = pd.to_numeric(v, errors="coerce").astype("float64")
+    if unit == "brl":
+        c = _round_half_up(v.to_numpy() * 100.0)
+    elif unit == "cents":
+        c = _round_half_up(v.to_numpy())
+    else:
+        c = _round_half_up(v.to_numpy() / (MICRO_PER_BRL / 100))
+    return pd.Series(c, index=v.index).astype(CENTS_DTYPE)
+
+
+def _text_to_cents(s: pd.Series) -> pd.Series:
+    """Série de texto -> centavos (Int64). Não-string / vazio / inválido -> <NA>."""
+    texts = [t if isinstance(t, str) and len(t) <= _MAX_TEXT_LEN else "" for t in s.tolist()]
+    cents = np.zeros(len(texts), dtype=np.int64)
+    valid = np.zeros(len(texts), dtype=bool)
+    for start in range(0, len(texts), _CHUNK_ROWS):
+        c, v = _text_block_to_cents(texts[start:start + _CHUNK_ROWS])
+        cents[start:start + len(c)] = c
+        valid[start:start + len(v)] = v
+    return pd.Series(pd.arrays.IntegerArray(cents, ~valid), index=s.index)
+
+
+def _cents_from_text(s: pd.Series, unit: str) -> pd.Series:
+    cents = _text_to_cents(s)
+    if unit == "brl":
+        return cents
+    # centavos/micro vêm como inteiro em texto: "reais" lidos acima = valor / 100
+    return _numbers_to_cents(cents.astype("float64") / 100.0, unit)
+
+
+def parse_brl_series(values, unit: str = "brl") -> pd.Series:
+    """
+    Preços -> centavos (Int64, <NA> se vazio/inválido), vetorizado.
+
+    Aceita números (float/int), "R$ 1.234,56", "1234,56", "77.89", "1.234" (milhar),
+    "1.234.567" e inteiros em micro-unidades da API (unit="micro") ou já em centavos
+    (unit="cents"). Arredondamento meio-para-cima no centavo.
+    """
+    if unit not in UNITS:
+        raise ValueError(f"unidade de preço inválida: {unit} (use {', '.join(UNITS)})")
+    s = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        return _numbers_to_cents(s, unit)
+    if s.dtype != object:
+        # dtype de texto do pandas: tudo é string (ou <NA>)
+        return _cents_from_text(s, unit)
+
+    # object só com strings (e vazios): caminho de texto direto
+    if pd.api.types.infer_dtype(s, skipna=True) in ("string", "empty"):
+        return _cents_from_text(s, unit)
+
+    # coluna mista: números de verdade não passam pela heurística de texto
+    is_text = s.map(type) == str
+    if not is_text.all():
+        num = _numbers_to_cents(s.where(~is_text), unit)
+        if not is_text.any():
+            return num
+        txt = _cents_from_text(s[is_text], unit)
+        return num.where(~is_text, txt.reindex(s.index))
+    return _cents_from_text(s, unit)
+
+
+def cents_to_reais(cents) -> pd.Series:
+    """Centavos (Int64) -> float64 em reais (NaN se vazio)."""
+    c = pd.Series(cents).astype(CENTS_DTYPE)
+    return c.astype("float64") / 100.0
+
+
+def fix_cents_heuristic(cents) -> pd.Series:
+    """
+    Anti-"centavos": preço >= R$ 5000 em produto Shopee quase sempre é centavo lido como real
+    (7789 -> 77,89). Divide por 100 nesses casos.
+    """
+    c = pd.Series(cents).astype(CENTS_DTYPE)
+    fixed = (c + 50) // 100
+    # só aceita se o valor corrigido ficar plausível (> 0 e < R$ 5000)
+    big = ((c >= 5000 * 100) & (fixed > 0) & (fixed < 5000 * 100)).fillna(False).astype(bool)
+    return c.where(~big, fixed)
+
+
+def format_brl_series(cents, thousands: bool = True) -> pd.Series:
+    """
+    Centavos -> "1.234,56" (sem "R$"), vetorizado. Vazio -> "".
+
+    Monta os dígitos direto numa matriz de code points alinhada à direita (sem formatar
+    string por string) e remove os espaços da esquerda no fim.
+    """
+    c = pd.Series(cents).astype(CENTS_DTYPE)
+    missing = c.isna().to_numpy()
+    v = c.fillna(0).to_numpy(dtype=np.int64)
+    n = len(v)
+    if n == 0:
+        return pd.Series([], index=c.index, dtype=object)
+
+    neg = v < 0
+    a = np.abs(v)
+    reais = a // 100
+    cc = a % 100
+    ndig = np.floor(np.log10(np.maximum(reais, 1))).astype(np.int64) + 1
+    width_d = int(ndig.max())
+    sep = thousands and width_d > 3
+    width = 1 + width_d + ((width_d - 1) // 3 if sep else 0) + 3
+
+    m = np.full((n, width), ord(" "), dtype=np.uint32)
+    m[:, -1] = _DIGIT0 + cc % 10
+    m[:, -2] = _DIGIT0 + cc // 10
+    m[:, -3] = _COMMA
+    col = width - 4
+    rest = reais.copy()
+    for k in range(width_d):
+        if thousands and k and k % 3 == 0:
+            m[:, col] = np.where(ndig > k, _DOT, ord(" "))
+            col -= 1
+        m[:, col] = np.where(ndig > k, _DIGIT0 + rest % 10, ord(" "))
+        rest //= 10
+        col -= 1
+    if neg.any():
+        n_seps = (ndig - 1) // 3 if thousands else 0
+        first = width - 3 - ndig - n_seps - 1
+        rows = np.flatnonzero(neg)
+        m[rows, first[rows]] = _MINUS
+
+    txt = np.char.lstrip(m.view(f"<U{width}").ravel()).astype(object)
+    txt[missing] = ""
+    return pd.Series(txt, index=c.index)
+
+
+def column_cents(df: pd.DataFrame, col: str, unit: str = "brl") -> pd.Series:
+    """Centavos da coluna de preço `col`, usando `<col>_cents` quando o arquivo já traz."""
+    cents_col = f"{col}_cents"
+    if cents_col in df.columns:
+        c = pd.to_numeric(df[cents_col], errors="coerce").astype(CENTS_DTYPE)
+        if col in df.columns:
+            c = c.fillna(parse_brl_series(df[col], unit))
+        return c
+    if col not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype=CENTS_DTYPE)
+    return parse_brl_series(df[col], unit)
+
+
+# ---------- escalar (uma linha por vez: legendas, confirmação manual) ----------
+def parse_brl(x, unit: str = "brl") -> Optional[int]:
+    """Um preço -> centavos (int) ou None. Mesmas regras de parse_brl_series."""
+    v = parse_brl_series(pd.Series([x], dtype=object), unit).iloc[0]
+    return None if pd.isna(v) else int(v)
+
+
+def format_brl(cents: Optional[int], thousands: bool = True) -> str:
+    """Centavos -> "1.234,56"; None -> ""."""
+    if cents is None or pd.isna(cents):
+        return ""
+    return format_brl_series(pd.Series([int(cents)]), thousands).iloc[0]
@@ -0,0 +1,331 @@
+# src/near_dup.py
+from __future__ import annotations
+
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# MinHash: h_i(x) = (a_i * x + b_i) mod p, com p primo de Mersenne (cabe em uint64 sem overflow)
+_MERSENNE_P = np.uint64((1 << 31) - 1)
+_SEED = 20240601
+# muda se a tokenização/hash mudar: índice salvo com outra versão é descartado
+_INDEX_VERSION = 1
+
+_TOKEN_RE = r"\w+"
+
+# arestas conferidas (Jaccard) por vez: limita a memória da comparação de assinaturas
+_EDGE_CHUNK = 100_000
+
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bandas, linhas por banda) cujo limiar aproximado (1/b)^(1/r) fica mais perto do pedido."""
+    best = (num_perm, 1)
+    best_err = float("inf")
+    for r in range(1, num_perm + 1):
+        if num_perm % r:
+            continue
+        b = num_perm // r
+        err = abs((1.0 / b) ** (1.0 / r) - threshold)
+        if err < best_err:
+            best, best_err = (b, r), err
+    return best
+
+
+def _perm_params(num_perm: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(_SEED)
+    a = rng.integers(1, int(_MERSENNE_P), num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_MERSENNE_P), num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(title_keys: pd.Series, num_perm: int, chunk_rows: int = 20_000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Assinatura MinHash do conjunto de palavras de cada título (ordem das palavras não importa).
+    Retorna (assinaturas n x num_perm uint32, tem_assinatura bool[n]).
+    """
+    keys = pd.Series(title_keys).astype(str).reset_index(drop=True)
+    n = len(keys)
+    sig = np.full((n, num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+
+    tokens = keys.str.findall(_TOKEN_RE).explode()
+    tokens = tokens[tokens.notna()]
+    if tokens.empty:
+        return sig, np.zeros(n, dtype=bool)
+
+    # hash/permutações só uma vez por token distinto; depois é gather por código
+    tok_codes, uniques = pd.factorize(tokens.to_numpy(dtype=object))
+    x = pd.util.hash_array(np.asarray(uniques, dtype=object)) % _MERSENNE_P
+    a, b = _perm_params(num_perm)
+    table = ((x[:, None] * a[None, :] + b[None, :]) % _MERSENNE_P).astype(np.uint32)
+    # linha extra = "sem token" (preenchimento), não altera o mínimo
+    table = np.vstack([table, np.full((1, num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)])
+    pad = len(uniques)
+
+    # conjunto de tokens por título (duplicata dentro do título não muda o MinHash)
+    n_uni = np.int64(len(uniques))
+    pair = np.sort(tokens.index.to_numpy(dtype=np.int64) * n_uni + tok_codes.astype(np.int64))
+    pair = pair[np.r_[True, pair[1:] != pair[:-1]]]
+    rows = pair // n_uni
+    codes = pair % n_uni
+
+    # matriz títulos x tokens (preenchida) por bloco; assinatura = mínimo por coluna de permutação
+    bounds = np.searchsorted(rows, np.arange(0, n + chunk_rows, chunk_rows))
+    for c0 in range(0, n, chunk_rows):
+        lo, hi = bounds[c0 // chunk_rows], bounds[c0 // chunk_rows + 1]
+        if lo == hi:
+            continue
+        rs = rows[lo:hi] - c0
+        counts = np.bincount(rs, minlength=min(chunk_rows, n - c0))
+        pos = np.arange(hi - lo) - np.repeat(np.cumsum(counts) - counts, counts)
+        mat = np.full((len(counts), int(counts.max())), pad, dtype=np.int64)
+        mat[rs, pos] = codes[lo:hi]
+        sig[c0:c0 + len(counts)] = table[mat].min(axis=1)
+
+    has_sig = np.zeros(n, dtype=bool)
+    has_sig[rows] = True
+    return sig, has_sig
+
+
+class NearDupIndex:
+    """
+    Índice LSH (MinHash em bandas) de títulos quase-duplicados, persistente entre dias.
+
+    Cada entrada é um representante (assinatura + id de cluster). Um título novo entra no
+    cluster do primeiro representante cuja similaridade Jaccard estimada >= threshold;
+    senão no cluster dos títulos do dia ligados a ele (união dentro de cada bucket, só
+    vizinhos e primeiro membro conferidos) ou num cluster novo. Bucket grande (títulos
+    genéricos) custa o mesmo que pequeno por membro: o total é ~linear no número de títulos.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64):
+        self.threshold = float(threshold)
+        self.num_perm = int(num_perm)
+        self.bands, self.rows_per_band = _choose_bands(self.num_perm, self.threshold)
+
+        self._sigs = np.zeros((0, self.num_perm), dtype=np.uint32)
+        self._cluster = np.zeros(0, dtype=np.int64)
+        self._last_seen = np.zeros(0, dtype=np.int64)
+        self._itemid = np.zeros(0, dtype=str)
+        self._next_cluster = 0
+
+        # buckets por banda: chaves ordenadas + entrada correspondente (busca por searchsorted)
+        self._bucket_keys: List[np.ndarray] = []
+        self._bucket_eids: List[np.ndarray] = []
+
+        rng = np.random.default_rng(_SEED + 1)
+        self._band_mult = rng.integers(1, np.iinfo(np.int64).max, self.rows_per_band, dtype=np.uint64) | np.uint64(1)
+        self._rebuild_buckets()
+
+    # ---------- persistência ----------
+    @staticmethod
+    def load(path: Path, threshold: float, num_perm: int) -> "NearDupIndex":
+        idx = NearDupIndex(threshold=threshold, num_perm=num_perm)
+        if not path.exists():
+            return idx
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                if int(z["version"]) != _INDEX_VERSION or int(z["num_perm"]) != num_perm:
+                    print(f"INFO NearDup: índice {path.name} incompatível (versão/num_perm). Recriando.")
+                    return idx
+                idx._sigs = z["sigs"].astype(np.uint32)
+                idx._cluster = z["cluster"].astype(np.int64)
+                idx._last_seen = z["last_seen"].astype(np.int64)
+                idx._itemid = z["itemid"].astype(str)
+                idx._next_cluster = int(z["next_cluster"])
+        except Exception as e:
+            print(f"INFO NearDup: falha ao ler {path} ({e}). Recriando.")
+            return NearDupIndex(threshold=threshold, num_perm=num_perm)
+        idx._rebuild_buckets()
+        return idx
+
+    def save(self, path: Path, ttl_days: int, max_entries: int) -> None:
+        today = date.today().toordinal()
+        keep = np.flatnonzero(today - self._last_seen <= ttl_days)
+        if len(keep) > max_entries:
+            # mantém os vistos mais recentemente
+            keep = np.sort(keep[np.argsort(-self._last_seen[keep], kind="stable")[:max_entries]])
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.int64(_INDEX_VERSION),
+                num_perm=np.int64(self.num_perm),
+                next_cluster=np.int64(self._next_cluster),
+                sigs=self._sigs[keep],
+                cluster=self._cluster[keep],
+                last_seen=self._last_seen[keep],
+                itemid=self._itemid[keep],
+            )
+
+    def __len__(self) -> int:
+        return len(self._cluster)
+
+    # ---------- LSH ----------
+    def _band_keys(self, sigs: np.ndarray) -> np.ndarray:
+        """n x bandas: hash (uint64) de cada faixa de linhas da assinatura."""
+        n = sigs.shape[0]
+        s = sigs.astype(np.uint64).reshape(n, self.bands, self.rows_per_band)
+        return (s * self._band_mult[None, None, :]).sum(axis=2, dtype=np.uint64)
+
+    def _rebuild_buckets(self) -> None:
+        keys = self._band_keys(self._sigs)
+        self._bucket_keys, self._bucket_eids = [], []
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind="stable")
+            self._bucket_keys.append(keys[order, band])
+            self._bucket_eids.append(order.astype(np.int64))
+
+    def assign(
+        self,
+        title_keys: pd.Series,
+        itemids: Optional[pd.Series] = None,
+        signatures: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> np.ndarray:
+        """
+        Atribui um id de cluster a cada título, na ordem recebida (ordem de score).
+        O primeiro título de cada cluster na chamada vira representante no índice.
+        Título sem palavras -> -1. `signatures` = (assinaturas, tem_assinatura) já calculadas
+        (ex.: vindas do feature store) para não refazer o MinHash.
+        """
+        n = len(title_keys)
+        out = np.full(n, -1, dtype=np.int64)
+        if n == 0:
+            return out
+
+        if signatures is not None:
+            sigs, has_sig = signatures
+        else:
+            sigs, has_sig = minhash_signatures(title_keys, self.num_perm)
+        keys = self._band_keys(sigs)
+        rows = np.flatnonzero(has_sig)
+        n_stored = len(self._cluster)
+        first_new_cluster = self._next_cluster
+        today = date.today().toordinal()
+
+        # quem não colide em nenhuma banda (nem com hoje nem com o índice) abre cluster direto
+        collides = np.zeros(len(rows), dtype=bool)
+        for band in range(self.bands):
+            col = keys[rows, band]
+            _, inv, cnt = np.unique(col, return_inverse=True, return_counts=True)
+            collides |= cnt[inv] > 1
+            collides |= np.isin(col, self._bucket_keys[band])
+
+        cand_rows = rows[collides]
+        m = len(cand_rows)
+
+        # 1) contra o índice salvo (vetorizado): menor entrada com Jaccard >= threshold
+        static_cluster = np.full(m, -1, dtype=np.int64)
+        if n_stored and m:
+            no_match = np.iinfo(np.int64).max
+            best = np.full(m, no_match, dtype=np.int64)
+            for band in range(self.bands):
+                k = keys[cand_rows, band]
+                bk = self._bucket_keys[band]
+                lo = np.searchsorted(bk, k, side="left")
+                cnt = np.searchsorted(bk, k, side="right") - lo
+                item = np.repeat(np.arange(m), cnt)
+                pos = np.repeat(lo, cnt) + (np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt))
+                eids = self._bucket_eids[band][pos]
+                ok = (self._sigs[eids] == sigs[cand_rows[item]]).mean(axis=1) >= self.threshold
+                np.minimum.at(best, item[ok], eids[ok])
+            found = best < no_match
+            static_cluster[found] = self._cluster[best[found]]
+            self._last_seen[best[found]] = today
+
+        # 2) ligações de hoje: em cada banda, membros do mesmo bucket ligados ao anterior e ao
+        # primeiro do bucket (O(m) por banda, nada de todos os pares), se passam no threshold
+        labels = np.arange(m, dtype=np.int64)
+        edges = []
+        for band in range(self.bands):
+            k = keys[cand_rows, band]
+            order = np.argsort(k, kind="stable")
+            ks = k[order]
+            same = np.zeros(m, dtype=bool)
+            same[1:] = ks[1:] == ks[:-1]
+            if not same.any():
+                continue
+            head = np.maximum.accumulate(np.where(same, 0, np.arange(m)))
+            member = np.flatnonzero(same)
+            edges.append(np.stack([order[member - 1], order[member]], axis=1))
+            edges.append(np.stack([order[head[member]], order[member]], axis=1))
+        if edges:
+            pr = np.unique(np.concatenate(edges), axis=0)
+            ok = np.zeros(len(pr), dtype=bool)
+            for lo in range(0, len(pr), _EDGE_CHUNK):
+                c = pr[lo:lo + _EDGE_CHUNK]
+                ok[lo:lo + _EDGE_CHUNK] = (
+                    (sigs[cand_rows[c[:, 0]]] == sigs[cand_rows[c[:, 1]]]).mean(axis=1) >= self.threshold
+                )
+            labels = _components(m, pr[ok])
+
+        # 3) em ordem de score: índice salvo primeiro; senão o cluster do componente (o do
+        # primeiro membro que casou com o índice, ou um novo aberto pelo primeiro membro)
+        comp_cluster: Dict[int, int] = {}
+        for j in range(m):
+            root = int(labels[j])
+            cluster = int(static_cluster[j])
+            if cluster < 0:
+                cluster = comp_cluster.get(root, -1)
+            if cluster < 0:
+                cluster = self._next_cluster
+                self._next_cluster += 1
+            comp_cluster.setdefault(root, cluster)
+            out[cand_rows[j]] = cluster
+
+        single = rows[~collides]
+        out[single] = np.arange(self._next_cluster, self._next_cluster + len(single))
+        self._next_cluster += len(single)
+
+        # representantes dos clusters novos (1º de cada um) entram no índice; clusters que já
+        # estavam no índice só tiveram last_seen atualizado
+        valid = np.flatnonzero(out >= first_new_cluster)
+        _, first = np.unique(out[valid], return_index=True)
+        reps = np.sort(valid[first])
+        ids = pd.Series(itemids).astype(str).to_numpy(dtype=str) if itemids is not None else np.full(n, "", dtype=str)
+        self._sigs = np.concatenate([self._sigs, sigs[reps]])
+        self._cluster = np.concatenate([self._cluster, out[reps]])
+        self._last_seen = np.concatenate([self._last_seen, np.full(len(reps), today, dtype=np.int64)])
+        self._itemid = np.concatenate([self._itemid.astype(str), ids[reps]])
+        self._rebuild_buckets()
+        return out
+
+
+def _components(n: int, edges: np.ndarray) -> np.ndarray:
+    """
+    Union-find vetorizado: rótulo (menor índice) do componente conexo de cada nó.
+    Engancha raízes pela aresta (a menor vira pai) e comprime por salto de ponteiro até
+    as duas pontas de toda aresta terem o mesmo rótulo.
+    """
+    labels = np.arange(n, dtype=np.int64)
+    if len(edges) == 0:
+        return labels
+    a, b = edges[:, 0], edges[:, 1]
+    while True:
+        la, lb = labels[a], labels[b]
+        diff = la != lb
+        if not diff.any():
+            return labels
+        lo = np.minimum(la[diff], lb[diff])
+        np.minimum.at(labels, la[diff], lo)
+        np.minimum.at(labels, lb[diff], lo)
+        while True:
+            nxt = labels[labels]
+            if np.array_equal(nxt, labels):
+                break
+            labels = nxt
+
+
+def keep_best_per_cluster(clusters: np.ndarray) -> np.ndarray:
+    """Máscara: mantém a 1ª linha (melhor score) de cada cluster; sem cluster (-1) sempre fica."""
+    clusters = np.asarray(clusters)
+    keep = np.ones(len(clusters), dtype=bool)
+    valid = np.flatnonzero(clusters >= 0)
+    _, first = np.unique(clusters[valid], return_index=True)
+    keep[valid] = False
+    keep[valid[first]] = True
+    return keep
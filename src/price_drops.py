@@ -0,0 +1,123 @@
+# src/price_drops.py
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+# queda mínima (%) entre duas buscas para virar evento
+MIN_DROP_PCT = 20.0
+
+
+def detect_drops(changes: pd.DataFrame, offers: pd.DataFrame, min_drop_pct: float = MIN_DROP_PCT) -> pd.DataFrame:
+    """
+    Mudanças de preço (PriceHistory.record_changes) -> quedas >= min_drop_pct, com os dados
+    da oferta (produto_id, nome_curto, link_afiliado, imageUrl) para montar a legenda.
+    Ordenadas da maior queda para a menor (empate: maior queda em reais).
+    """
+    ch = changes[changes["prev_cents"].notna() & (changes["price_cents"] < changes["prev_cents"])].copy()
+    if ch.empty:
+        return ch.assign(drop_pct=pd.Series(dtype="float64"))
+    prev = ch["prev_cents"].astype("float64")
+    ch["drop_pct"] = ((prev - ch["price_cents"].astype("float64")) / prev * 100).round(1)
+    ch = ch[ch["drop_pct"] >= min_drop_pct]
+    ch["_abs"] = ch["prev_cents"] - ch["price_cents"]
+    ch = ch.sort_values(["drop_pct", "_abs"], ascending=False, kind="stable").drop(columns="_abs")
+
+    info = offers.drop_duplicates("produto_id", keep="last").set_index("produto_id")
+    for c in ["nome_curto", "link_afiliado", "imageUrl"]:
+        ch[c] = info[c].reindex(ch["produto_id"]).to_numpy() if c in info.columns else ""
+    return ch.reset_index(drop=True)
+
+
+def append_drops(path: Path, drops: pd.DataFrame, when: Optional[datetime] = None) -> int:
+    """
+    Acrescenta as quedas ao stream JSONL, já no formato de linha do scheduler (itemid, title,
+    sale_price_cents, original_price_cents = preço anterior, discount_pct, image_link,
+    product_link). Arquivo só cresce; quem lê guarda até onde já leu.
+    """
+    if drops.empty:
+        return 0
+    ts = (when or datetime.now()).isoformat(timespec="seconds")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for rank, r in enumerate(drops.itertuples(index=False), start=1):
+            ev = {
+                "ts": ts,
+                "rank": rank,
+                "itemid": str(int(r.produto_id)),
+                "title": _plain(r.nome_curto),
+                "sale_price_cents": int(r.price_cents),
+                "original_price_cents": int(r.prev_cents),
+                "sale_price": round(int(r.price_cents) / 100.0, 2),
+                "discount_pct": float(r.drop_pct),
+                "image_link": _plain(r.imageUrl),
+                "product_link": _plain(r.link_afiliado),
+                "prev_seen": r.prev_seen.isoformat(timespec="seconds") if pd.notna(r.prev_seen) else "",
+            }
+            f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+    return len(drops)
+
+
+def _plain(x) -> str:
+    if x is None or (not isinstance(x, str) and pd.isna(x)):
+        return ""
+    return str(x).strip()
+
+
+class DropStream:
+    """
+    Leitor incremental do stream de quedas: guarda o offset (bytes) já consumido num arquivo
+    ao lado (<stream>.offset), então cada poll() lê só as linhas novas.
+    Eventos mais velhos que max_age_h são descartados (queda de ontem não é "agora").
+    """
+
+    def __init__(self, path: Path, max_age_h: float = 12.0):
+        self.path = Path(path)
+        self.offset_path = self.path.with_name(self.path.name + ".offset")
+        self.max_age = timedelta(hours=max_age_h)
+        self.offset = 0
+        if self.offset_path.exists():
+            try:
+                self.offset = int(self.offset_path.read_text(encoding="utf-8").strip() or 0)
+            except ValueError:
+                self.offset = 0
+
+    def poll(self, now: Optional[datetime] = None) -> List[Dict]:
+        """Eventos novos desde o último poll, maior queda primeiro."""
+        if not self.path.exists():
+            return []
+        size = self.path.stat().st_size
+        if size < self.offset:
+            # arquivo recriado/truncado: recomeça do início
+            self.offset = 0
+        if size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        # só linhas completas (o Step0 pode estar escrevendo agora)
+        end = chunk.rfind(b"\n") + 1
+        self.offset += end
+
+        now = now or datetime.now()
+        events: List[Dict] = []
+        for line in chunk[:end].decode("utf-8").splitlines():
+            try:
+                ev = json.loads(line)
+                when = datetime.fromisoformat(ev.get("ts", ""))
+            except ValueError:
+                continue
+            if now - when <= self.max_age:
+                events.append(ev)
+        events.sort(key=lambda e: -float(e.get("discount_pct") or 0))
+        return events
+
+    def commit(self) -> None:
+        self.offset_path.parent.mkdir(parents=True, exist_ok=True)
+        self.offset_path.write_text(str(self.offset), encoding="utf-8")
@@ -0,0 +1,281 @@
+# src/price_history.py
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.catalog import parse_ids
+
+
+# janela padrão das estatísticas e histórico mínimo para confiar nelas
+WINDOW_DAYS = 30
+MIN_DAYS = 7
+
+_DAY = 86_400
+
+_STATS_COLS = [
+    "produto_id", "current_cents", "min_cents", "median_cents",
+    "last_change", "prev_cents", "days_covered", "n_obs",
+]
+
+
+def _ts(when) -> int:
+    """datetime/Timestamp/None -> segundos unix (None = agora)."""
+    if when is None:
+        return int(time.time())
+    return int(pd.Timestamp(when).timestamp())
+
+
+class PriceHistory:
+    """
+    Histórico de preços por item, só de acréscimo, em SQLite.
+
+    Cada linha é um trecho de preço constante (run-length): (produto_id, first_seen,
+    last_seen, price_cents, n_obs). Observação com o mesmo preço do trecho atual só estende
+    last_seen/n_obs; preço diferente abre um trecho novo. A chave primária
+    (produto_id, first_seen) é o índice por item e tempo.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(str(self.path))
+        self.con.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS price_runs (
+                produto_id  INTEGER NOT NULL,
+                first_seen  INTEGER NOT NULL,
+                last_seen   INTEGER NOT NULL,
+                price_cents INTEGER NOT NULL,
+                n_obs       INTEGER NOT NULL,
+                PRIMARY KEY (produto_id, first_seen)
+            ) WITHOUT ROWID;
+            CREATE TEMP TABLE IF NOT EXISTS _ids (id INTEGER PRIMARY KEY);
+            """
+        )
+
+    def close(self) -> None:
+        self.con.close()
+
+    def __enter__(self) -> "PriceHistory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self.con.execute("SELECT COUNT(*) FROM price_runs").fetchone()[0])
+
+    def _load_ids(self, ids: List[int]) -> None:
+        self.con.execute("DELETE FROM _ids")
+        self.con.executemany("INSERT OR IGNORE INTO _ids (id) VALUES (?)", ((i,) for i in ids))
+
+    # ---------- escrita ----------
+    def record(self, ids, cents, when=None) -> Dict[str, int]:
+        """
+        Uma observação por item (id/preço em centavos, alinhados). Sem id ou sem preço: ignorado;
+        id repetido no lote: vale o último. Observação mais antiga que o trecho atual também
+        é ignorada (histórico só anda para frente).
+        """
+        changes, extended = self._apply(ids, cents, when)
+        return {"new": len(changes), "extended": extended}
+
+    def record_changes(self, ids, cents, when=None) -> pd.DataFrame:
+        """
+        Como record(), mas devolve só o que mudou desde a observação anterior de cada item:
+        produto_id, prev_cents (<NA> = item novo), price_cents, prev_seen (última vez que o
+        preço anterior foi visto). Cada id é uma busca pela chave: custo proporcional ao lote,
+        não ao tamanho do histórico.
+        """
+        changes, _ = self._apply(ids, cents, when)
+        return changes
+
+    def _apply(self, ids, cents, when) -> Tuple[pd.DataFrame, int]:
+        obs = pd.DataFrame({"produto_id": parse_ids(pd.Series(list(ids))), "price": pd.Series(list(cents))})
+        obs["price"] = pd.to_numeric(obs["price"], errors="coerce")
+        obs = obs.dropna().drop_duplicates("produto_id", keep="last")
+        if obs.empty:
+            return _empty_changes(), 0
+        ts = _ts(when)
+        obs = obs.astype({"produto_id": "int64", "price": "int64"})
+
+        with self.con:
+            self._load_ids(obs["produto_id"].tolist())
+            last = pd.read_sql_query(
+                """
+                SELECT r.produto_id, r.first_seen, r.last_seen, r.price_cents
+                FROM price_runs r JOIN _ids i ON r.produto_id = i.id
+                WHERE r.first_seen = (
+                    SELECT MAX(first_seen) FROM price_runs WHERE produto_id = r.produto_id
+                )
+                """,
+                self.con,
+            )
+            m = obs.merge(last, on="produto_id", how="left")
+            stale = m["last_seen"].notna() & (m["last_seen"] > ts)
+            m = m[~stale]
+            same = (m["price_cents"] == m["price"]).fillna(False).to_numpy(dtype=bool)
+
+            ext = m[same]
+            self.con.executemany(
+                "UPDATE price_runs SET last_seen = ?, n_obs = n_obs + 1 WHERE produto_id = ? AND first_seen = ?",
+                zip([ts] * len(ext), ext["produto_id"].tolist(), ext["first_seen"].astype("int64").tolist()),
+            )
+            new = m[~same]
+            self.con.executemany(
+                "INSERT OR REPLACE INTO price_runs (produto_id, first_seen, last_seen, price_cents, n_obs) "
+                "VALUES (?, ?, ?, ?, 1)",
+                zip(new["produto_id"].tolist(), [ts] * len(new), [ts] * len(new), new["price"].tolist()),
+            )
+
+        changes = pd.DataFrame({
+            "produto_id": new["produto_id"].astype("Int64"),
+            "prev_cents": pd.to_numeric(new["price_cents"], errors="coerce").astype("Int64"),
+            "price_cents": new["price"].astype("Int64"),
+            "prev_seen": pd.to_datetime(pd.to_numeric(new["last_seen"], errors="coerce"), unit="s"),
+        }).reset_index(drop=True)
+        return changes, len(ext)
+
+    # ---------- consulta ----------
+    def stats(self, ids: Iterable, days: int = WINDOW_DAYS, now=None) -> pd.DataFrame:
+        """
+        Por item (só os que têm histórico), na janela dos últimos `days` dias:
+          current_cents  preço mais recente
+          min_cents      menor preço da janela
+          median_cents   mediana ponderada pelo tempo em que cada preço valeu
+          last_change    quando o preço atual começou (NaT se nunca mudou)
+          prev_cents     preço anterior a essa mudança
+          days_covered   dias da janela cobertos pelo histórico
+          n_obs          observações dos trechos da janela
+        Uma consulta para todos os ids; o resto é vetorizado.
+        """
+        wanted = [int(i) for i in pd.unique(parse_ids(pd.Series(list(ids))).dropna())]
+        if not wanted:
+            return _empty_stats()
+        now_ts = _ts(now)
+        start = now_ts - int(days) * _DAY
+
+        with self.con:
+            self._load_ids(wanted)
+            runs = pd.read_sql_query(
+                """
+                SELECT * FROM (
+                    SELECT r.produto_id, r.first_seen, r.price_cents, r.n_obs,
+                           LEAD(r.first_seen) OVER w AS next_seen,
+                           LAG(r.price_cents) OVER w AS prev_cents
+                    FROM price_runs r JOIN _ids i ON r.produto_id = i.id
+                    WINDOW w AS (PARTITION BY r.produto_id ORDER BY r.first_seen)
+                ) WHERE COALESCE(next_seen, :now) > :start AND first_seen <= :now
+                """,
+                self.con,
+                params={"now": now_ts, "start": start},
+            )
+        if runs.empty:
+            return _empty_stats()
+
+        # colunas 100% NULL voltam como object
+        runs["next_seen"] = pd.to_numeric(runs["next_seen"], errors="coerce")
+        runs["prev_cents"] = pd.to_numeric(runs["prev_cents"], errors="coerce")
+
+        # cada preço vale de first_seen até o próximo trecho (ou agora), recortado à janela
+        end = runs["next_seen"].fillna(now_ts).clip(upper=now_ts)
+        begin = runs["first_seen"].clip(lower=start)
+        runs["w"] = (end - begin).clip(lower=1)
+        runs["begin"] = begin
+
+        g = runs.groupby("produto_id", sort=False)
+        latest = runs[runs["next_seen"].isna() | (runs["next_seen"] > now_ts)]
+        latest = latest.drop_duplicates("produto_id", keep="last").set_index("produto_id")
+
+        out = pd.DataFrame({
+            "min_cents": g["price_cents"].min(),
+            "median_cents": _weighted_median(runs),
+            "days_covered": (now_ts - g["begin"].min()) / _DAY,
+            "n_obs": g["n_obs"].sum(),
+        })
+        out["current_cents"] = latest["price_cents"]
+        out["prev_cents"] = latest["prev_cents"]
+        changed = latest["prev_cents"].notna()
+        out["last_change"] = pd.to_datetime(latest["first_seen"].where(changed), unit="s")
+        out = out.reset_index()
+        return out[_STATS_COLS].astype({
+            "produto_id": "Int64", "current_cents": "Int64", "min_cents": "Int64",
+            "median_cents": "Int64", "prev_cents": "Int64", "n_obs": "Int64",
+        })
+
+
+def _empty_changes() -> pd.DataFrame:
+    return pd.DataFrame({
+        "produto_id": pd.Series(dtype="Int64"),
+        "prev_cents": pd.Series(dtype="Int64"),
+        "price_cents": pd.Series(dtype="Int64"),
+        "prev_seen": pd.Series(dtype="datetime64[ns]"),
+    })
+
+
+def _empty_stats() -> pd.DataFrame:
+    out = pd.DataFrame({c: pd.Series(dtype="Int64") for c in _STATS_COLS})
+    out["last_change"] = pd.Series(dtype="datetime64[ns]")
+    out["days_covered"] = pd.Series(dtype="float64")
+    return out
+
+
+def _weighted_median(runs: pd.DataFrame) -> pd.Series:
+    """Mediana de price_cents ponderada por w, por produto_id (ordenação + soma acumulada)."""
+    r = runs[["produto_id", "price_cents", "w"]].sort_values(["produto_id", "price_cents"], kind="stable")
+    cw = r.groupby("produto_id", sort=False)["w"].cumsum()
+    half = r.groupby("produto_id", sort=False)["w"].transform("sum") / 2.0
+    return r[cw >= half].groupby("produto_id", sort=False)["price_cents"].first()
+
+
+def trusted_discount(
+    sale_cents: pd.Series,
+    declared_orig_cents: pd.Series,
+    stats: pd.DataFrame,
+    ids: pd.Series,
+    min_days: float = MIN_DAYS,
+) -> pd.DataFrame:
+    """
+    "De/por" conferido contra o histórico. Com pelo menos `min_days` de histórico, o preço
+    "de" vira a mediana da janela (ou o declarado, se for menor) e só existe se o preço atual
+    estiver abaixo dele: "de" inflado no dia não vira desconto. Sem histórico suficiente,
+    fica o declarado (comportamento antigo).
+
+    Retorna (alinhado a `ids`): original_cents, discount_pct, discount_source
+    ("historico" / "declarado" / ""), min_30d_cents, median_30d_cents.
+    """
+    idx = sale_cents.index
+    st = stats.set_index("produto_id")
+    key = parse_ids(ids)
+    median = pd.Series(st["median_cents"].reindex(key).to_numpy(), index=idx).astype("Int64")
+    low = pd.Series(st["min_cents"].reindex(key).to_numpy(), index=idx).astype("Int64")
+    covered = pd.Series(st["days_covered"].reindex(key).to_numpy(), index=idx).astype("float64")
+
+    sale = sale_cents.astype("Int64")
+    declared = declared_orig_cents.astype("Int64")
+    has_hist = (median.notna() & (covered >= min_days)).fillna(False).astype(bool)
+
+    ref = median.where(~(declared.notna() & (declared < median)).fillna(False), declared)
+    ref = ref.where((ref > sale).fillna(False))
+    orig = declared.where(~has_hist, ref)
+
+    disc = pd.Series(np.nan, index=idx, dtype="float64")
+    ok = (orig.notna() & sale.notna() & (orig > 0)).fillna(False).astype(bool)
+    disc[ok] = ((orig[ok] - sale[ok]) / orig[ok] * 100).astype("float64").round(0)
+
+    source = pd.Series("", index=idx, dtype=object)
+    source[has_hist] = "historico"
+    source[~has_hist & ok] = "declarado"
+
+    return pd.DataFrame({
+        "original_cents": orig,
+        "discount_pct": disc,
+        "discount_source": source,
+        "min_30d_cents": low,
+        "median_30d_cents": median,
+    }, index=idx)
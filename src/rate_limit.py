@@ -0,0 +1,44 @@
+# src/rate_limit.py
+from __future__ import annotations
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Limite de chamadas por segundo compartilhado entre threads (balde de fichas).
+
+    `burst` chamadas podem sair juntas; depois, uma a cada 1/rate segundos. Quem chama
+    acquire() dorme fora do lock, então as threads não se bloqueiam enquanto esperam.
+    rate <= 0 -> sem limite.
+    """
+
+    def __init__(self, rate_per_s: float, burst: int = 1):
+        self.rate = float(rate_per_s)
+        self.burst = max(1, int(burst))
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+
+    def acquire(self) -> float:
+        """Espera a vez; retorna quantos segundos esperou."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # ficha negativa = reserva: a próxima thread já calcula a espera depois desta
+            self._tokens -= 1.0
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, seconds: float) -> None:
+        """Servidor pediu calma (429/limite): segura todas as threads por `seconds`."""
+        if self.rate <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
@@ -0,0 +1,200 @@
+# src/schema_resolver.py
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+_CACHE_VERSION = 1
+
+# linhas usadas para medir cobertura (preenchidas / total) de cada coluna candidata
+SAMPLE_ROWS = 20_000
+
+# (coluna padrão, candidatas em ordem de preferência, modo)
+# modo "first": primeira candidata que existir | "best": a de maior cobertura na amostra
+SchemaSpec = Sequence[Tuple[str, Sequence[str], str]]
+
+
+def normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def make_unique_columns(df: pd.DataFrame, who: str = "Schema") -> pd.DataFrame:
+    cols = list(map(str, df.columns))
+    seen: Dict[str, int] = {}
+    new_cols = []
+    dup_found = False
+    for c in cols:
+        if c in seen:
+            seen[c] += 1
+            new_cols.append(f"{c}__dup{seen[c]}")
+            dup_found = True
+        else:
+            seen[c] = 0
+            new_cols.append(c)
+    if dup_found:
+        df = df.copy()
+        df.columns = new_cols
+        print(f"INFO {who}: colunas duplicadas detectadas e renomeadas automaticamente.")
+    return df
+
+
+def first_existing(columns: Sequence[str], candidates: Sequence[str]) -> Optional[str]:
+    cols_lower = {c.lower(): c for c in columns}
+    for cand in candidates:
+        c = cols_lower.get(cand.lower())
+        if c:
+            return c
+    return None
+
+
+def sample_rows(df: pd.DataFrame, n: int = SAMPLE_ROWS) -> pd.DataFrame:
+    """Até n linhas espaçadas uniformemente (determinístico: mesma amostra a cada execução)."""
+    if len(df) <= n:
+        return df
+    return df.iloc[np.linspace(0, len(df) - 1, n).astype(np.int64)]
+
+
+def coverage(s: pd.Series) -> float:
+    """Fração de valores não vazios (NaN/"" contam como vazio)."""
+    if len(s) == 0:
+        return 0.0
+    return float((s.astype(str).fillna("").str.strip().str.len() > 0).mean())
+
+
+def best_nonempty_col(df: pd.DataFrame, candidates: Sequence[str], n_sample: int = SAMPLE_ROWS) -> Optional[str]:
+    """Candidata com maior cobertura medida numa amostra (empate: a que vem antes na lista)."""
+    cols_lower = {c.lower(): c for c in df.columns}
+    found: List[str] = []
+    for cand in candidates:
+        c = cols_lower.get(cand.lower())
+        if c and c not in found:
+            found.append(c)
+    if len(found) <= 1:
+        # uma candidata só: nem precisa medir (mas coluna 100% vazia não serve)
+        if not found:
+            return None
+        return found[0] if coverage(sample_rows(df[found], n_sample)[found[0]]) > 0 else None
+
+    sample = sample_rows(df[found], n_sample)
+    best = None
+    best_cov = 0.0
+    for c in found:
+        cov = coverage(sample[c])
+        if cov > best_cov:
+            best_cov = cov
+            best = c
+    return best
+
+
+def header_signature(columns: Sequence[str], spec: SchemaSpec) -> str:
+    """Hash do cabeçalho (nomes na ordem) + da regra de mapeamento: muda um, muda a chave."""
+    payload = json.dumps([list(map(str, columns)), [[k, list(c), m] for k, c, m in spec]], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SchemaCache:
+    """
+    Mapeamentos já resolvidos, por assinatura de cabeçalho, num JSON pequeno.
+    Mesmo cabeçalho na próxima execução -> mapeamento direto, sem medir cobertura.
+    """
+
+    def __init__(self, path: Optional[Path], max_entries: int = 200):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: Dict[str, dict] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if path is not None and path.exists():
+            try:
+                payload = json.loads(path.read_text(encoding="utf-8"))
+                if payload.get("version") == _CACHE_VERSION:
+                    self._entries = payload.get("entries", {})
+            except Exception as e:
+                print(f"INFO SchemaCache: falha ao ler {path} ({e}). Recriando.")
+
+    def get(self, signature: str) -> Optional[Dict[str, str]]:
+        entry = self._entries.get(signature)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if entry.get("last_used") != date.today().isoformat():
+            entry["last_used"] = date.today().isoformat()
+            self._dirty = True
+        return dict(entry["mapping"])
+
+    def put(self, signature: str, mapping: Dict[str, str]) -> None:
+        self._entries[signature] = {"mapping": dict(mapping), "last_used": date.today().isoformat()}
+        self._dirty = True
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        if len(self._entries) > self.max_entries:
+            keep = sorted(self._entries.items(), key=lambda kv: kv[1].get("last_used", ""), reverse=True)
+            self._entries = dict(keep[: self.max_entries])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps({"version": _CACHE_VERSION, "entries": self._entries}, ensure_ascii=False, indent=1),
+            encoding="utf-8",
+        )
+        tmp.replace(self.path)
+        self._dirty = False
+
+
+def resolve_mapping(df: pd.DataFrame, spec: SchemaSpec, n_sample: int = SAMPLE_ROWS) -> Dict[str, str]:
+    """coluna padrão -> coluna do arquivo, pela regra de cada entrada do spec."""
+    mapping: Dict[str, str] = {}
+    for std, candidates, mode in spec:
+        if mode == "first":
+            c = first_existing(df.columns, candidates)
+        else:
+            c = best_nonempty_col(df, candidates, n_sample)
+        if c:
+            mapping[std] = c
+    return mapping
+
+
+def resolve(
+    df: pd.DataFrame, spec: SchemaSpec, cache: Optional[SchemaCache] = None, n_sample: int = SAMPLE_ROWS
+) -> Tuple[Dict[str, str], bool]:
+    """
+    Mapeamento do df (cabeçalho já normalizado): do cache se esse cabeçalho já foi visto,
+    senão medido na amostra e guardado. Retorna (mapeamento, veio_do_cache).
+    """
+    signature = header_signature(df.columns, spec)
+    mapping = cache.get(signature) if cache is not None else None
+    if mapping is not None and all(c in df.columns for c in mapping.values()):
+        return mapping, True
+    mapping = resolve_mapping(df, spec, n_sample)
+    if cache is not None:
+        cache.put(signature, mapping)
+    return mapping, False
+
+
+def apply_schema(
+    df: pd.DataFrame,
+    spec: SchemaSpec,
+    cache: Optional[SchemaCache] = None,
+    who: str = "Schema",
+    n_sample: int = SAMPLE_ROWS,
+) -> Tuple[pd.DataFrame, Dict[str, str], bool]:
+    """
+    Normaliza/desduplica o cabeçalho, resolve o mapeamento e renomeia para as colunas
+    padrão. Retorna (df, mapeamento, veio_do_cache).
+    """
+    df = normalize_cols(make_unique_columns(df, who))
+    mapping, cached = resolve(df, spec, cache, n_sample)
+    df = df.rename(columns={v: k for k, v in mapping.items()})
+    df = make_unique_columns(df, who)
+    return df, mapping, cached
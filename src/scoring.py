@@ -0,0 +1,51 @@
+# src/scoring.py
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from src.keyword_matcher import KeywordMatcher
+
+
+def price_impulse_scores(
+    price,
+    price_min: float,
+    price_max: float,
+    ideal_low: float,
+    ideal_high: float,
+) -> np.ndarray:
+    """
+    Curva de preço por trechos (vetorizada):
+    - fora de [price_min, price_max] ou vazio -> 0
+    - dentro da faixa ideal -> 1
+    - abaixo/acima da faixa ideal -> rampa linear até 0 nas pontas
+    """
+    p = np.asarray(pd.to_numeric(pd.Series(price), errors="coerce"), dtype="float64")
+
+    out_of_range = np.isnan(p) | (p < price_min) | (p > price_max)
+    ideal = (p >= ideal_low) & (p <= ideal_high)
+    below = p < ideal_low
+
+    with np.errstate(invalid="ignore"):
+        ramp_low = np.clip((p - price_min) / max(1.0, (ideal_low - price_min)), 0.0, 1.0)
+        ramp_high = np.clip((price_max - p) / max(1.0, (price_max - ideal_high)), 0.0, 1.0)
+
+    return np.select([out_of_range, ideal, below], [0.0, 1.0, ramp_low], default=ramp_high)
+
+
+def trust_scores(rating, empty_score: float = 0.35) -> np.ndarray:
+    """Rating 4.0 -> 0, 5.0 -> 1 (clipado). Rating vazio não mata o item."""
+    r = np.asarray(pd.to_numeric(pd.Series(rating), errors="coerce"), dtype="float64")
+    with np.errstate(invalid="ignore"):
+        s = np.clip((r - 4.0) / 1.0, 0.0, 1.0)
+    return np.where(np.isnan(r), empty_score, s)
+
+
+def decision_scores(titles: pd.Series, matcher: KeywordMatcher, group_counts: np.ndarray = None) -> np.ndarray:
+    """
+    base + pesos das palavras encontradas (ex.: 0.55 + 0.10 por "fácil" - 0.15 por "difícil"),
+    clipado em [0, 1]. `group_counts` (ex.: do feature store) evita rodar o autômato de novo.
+    """
+    if group_counts is not None:
+        return np.clip(matcher.scores_from_counts(group_counts), 0.0, 1.0)
+    return np.clip(matcher.weighted_scores(titles), 0.0, 1.0)
@@ -0,0 +1,100 @@
+# src/selection.py
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+
+_NOISE_WORDS = r"\b(novo|promoção|oferta|frete|grátis|original)\b"
+
+DEFAULT_CATEGORY = "sem_categoria"
+
+
+def normalize_titles(titles: pd.Series) -> pd.Series:
+    """
+    Chave de dedupe do título (vetorizado): lower, espaços colapsados, sem palavras de "ruído"
+    (novo/promoção/oferta/frete/grátis/original).
+    """
+    t = pd.Series(titles).astype(str).str.lower()
+    t = t.str.replace(r"\s+", " ", regex=True).str.strip()
+    t = t.str.replace(_NOISE_WORDS, "", regex=True)
+    return t.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def category_keys(categories: pd.Series) -> pd.Series:
+    """Categoria sem espaços nas pontas; vazia -> "sem_categoria"."""
+    cats = pd.Series(categories).astype(str).str.strip()
+    return cats.where(cats.str.len() > 0, DEFAULT_CATEGORY)
+
+
+def dense_codes(title_keys: pd.Series, categories: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Códigos inteiros densos para (chave do título, categoria).
+    Título vazio -> -1 (nunca é escolhido); categoria vazia -> "sem_categoria".
+    """
+    keys = pd.Series(title_keys).astype(str)
+    t_codes, _ = pd.factorize(keys)
+    t_codes = np.where(keys.str.len().to_numpy() > 0, t_codes, -1).astype(np.int64)
+
+    c_codes, _ = pd.factorize(category_keys(categories))
+    return t_codes, c_codes.astype(np.int64)
+
+
+def pick_capped(
+    t_codes: np.ndarray,
+    c_codes: np.ndarray,
+    max_items: int,
+    max_per_category: int,
+    return_first_pass: bool = False,
+):
+    """
+    Seleção em ordem de score (as linhas já devem vir ordenadas), sem título repetido:
+
+    PASSO 1: respeita o cap por categoria (contador acumulado por código de categoria).
+    PASSO 2: completa até max_items ignorando o cap.
+
+    Uma única varredura sobre os códigos inteiros faz o passo 1 e separa as linhas barradas
+    só pelo cap; o passo 2 é vetorizado sobre elas (primeira ocorrência de cada título ainda
+    livre). Retorna as posições das linhas escolhidas, na ordem de escolha
+    (com return_first_pass=True: (posições, quantas vieram do passo 1)).
+    """
+    n = len(t_codes)
+    n_titles = int(t_codes.max(initial=-1)) + 1
+    n_cats = int(c_codes.max(initial=-1)) + 1
+
+    used = bytearray(n_titles)
+    per_cat = [0] * n_cats
+    picked: list[int] = []
+    deferred: list[int] = []
+
+    t_list = t_codes.tolist()
+    c_list = c_codes.tolist()
+    for i in range(n):
+        t = t_list[i]
+        if t < 0 or used[t]:
+            continue
+        c = c_list[i]
+        if per_cat[c] >= max_per_category:
+            deferred.append(i)
+            continue
+        picked.append(i)
+        used[t] = 1
+        per_cat[c] += 1
+        if len(picked) >= max_items:
+            break
+
+    first = np.asarray(picked, dtype=np.int64)
+    needed = max_items - len(picked)
+    if needed <= 0 or not deferred:
+        return (first, len(first)) if return_first_pass else first
+
+    # PASSO 2: só linhas barradas pelo cap podem entrar (as demais já têm título usado)
+    cand = np.asarray(deferred, dtype=np.int64)
+    used_arr = np.frombuffer(bytes(used), dtype=np.uint8).astype(bool)
+    cand = cand[~used_arr[t_codes[cand]]]
+    _, first_pos = np.unique(t_codes[cand], return_index=True)
+    second = cand[np.sort(first_pos)][:needed]
+    out = np.concatenate([first, second])
+    return (out, len(first)) if return_first_pass else out
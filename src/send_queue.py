@@ -0,0 +1,261 @@
+# src/send_queue.py
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.whatsapp_web import PhaseTimer, SendUnconfirmed
+
+
+# estados de um job
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+UNCONFIRMED = "unconfirmed"  # interrompido depois do Enter: pode ter saído, nunca é reenviado
+
+DONE = (SENT, FAILED, UNCONFIRMED)
+
+# daemon sem heartbeat há mais que isso = fora do ar (cobre um login/reabertura lenta)
+HEARTBEAT_MAX_AGE_S = 180.0
+
+
+@dataclass
+class SendJob:
+    id: int
+    group_name: str
+    caption: str
+    image_url: str
+    itemid: str
+    source: str
+    attempts: int
+
+
+class SendQueue:
+    """
+    Fila local de envios (SQLite, um arquivo compartilhado entre processos).
+
+    Produtores (scheduler, envio avulso) chamam enqueue() e, se quiserem o resultado,
+    wait(); o daemon de envio (pipeline/step6_sender_daemon.py) faz claim() do próximo
+    job, envia com o browser que mantém aberto e marca sent/failed.
+
+    Job com prazo (expires_at) que ninguém pegou a tempo é descartado no claim: o
+    produtor já desistiu de esperar e tratou a falha do jeito dele. Job que estava em
+    sending quando o daemon caiu vira unconfirmed, não volta para a fila.
+
+    O daemon grava um heartbeat na tabela meta; daemon_alive() é o health check de
+    quem enfileira.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # autocommit: cada escrita é uma transação curta (BEGIN IMMEDIATE no claim)
+        self.con = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at  REAL NOT NULL,
+                group_name  TEXT NOT NULL,
+                caption     TEXT NOT NULL,
+                image_url   TEXT NOT NULL DEFAULT '',
+                itemid      TEXT NOT NULL DEFAULT '',
+                source      TEXT NOT NULL DEFAULT '',
+                priority    INTEGER NOT NULL DEFAULT 0,
+                status      TEXT NOT NULL,
+                attempts    INTEGER NOT NULL DEFAULT 0,
+                error       TEXT NOT NULL DEFAULT '',
+                phases      TEXT NOT NULL DEFAULT '',
+                started_at  REAL,
+                finished_at REAL,
+                expires_at  REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_next ON jobs (status, priority, id);
+            CREATE TABLE IF NOT EXISTS meta (
+                key   TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        cols = {r[1] for r in self.con.execute("PRAGMA table_info(jobs)")}
+        if "expires_at" not in cols:
+            # fila criada antes do prazo por job
+            self.con.execute("ALTER TABLE jobs ADD COLUMN expires_at REAL")
+
+    def close(self) -> None:
+        self.con.close()
+
+    # ---------- produtores ----------
+    def enqueue(
+        self,
+        group_name: str,
+        caption: str,
+        image_url: str = "",
+        itemid: str = "",
+        source: str = "",
+        priority: int = 0,
+        ttl: Optional[float] = None,
+    ) -> int:
+        """`ttl` (s): se o daemon não pegar o job nesse prazo, descarta (ninguém espera mais)."""
+        now = time.time()
+        cur = self.con.execute(
+            "INSERT INTO jobs (created_at, group_name, caption, image_url, itemid, source, priority, status, "
+            "expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                now, group_name, caption, image_url or "", itemid or "", source, int(priority), QUEUED,
+                now + ttl if ttl is not None else None,
+            ),
+        )
+        return int(cur.lastrowid)
+
+    def job_status(self, job_id: int) -> Dict:
+        row = self.con.execute(
+            "SELECT status, error, phases, attempts FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"job {job_id} não existe")
+        return {"status": row[0], "error": row[1], "phases": json.loads(row[2] or "{}"), "attempts": row[3]}
+
+    def wait(self, job_id: int, timeout: float = 300.0, poll: float = 0.25) -> Dict:
+        """Espera o job terminar (sent/failed/unconfirmed). Estourou o prazo -> TimeoutError."""
+        deadline = time.monotonic() + timeout
+        while True:
+            st = self.job_status(job_id)
+            if st["status"] in DONE:
+                return st
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"job {job_id} ainda '{st['status']}' após {timeout:.0f}s")
+            time.sleep(poll)
+
+    def cancel(self, job_id: int, reason: str = "cancelado") -> bool:
+        """
+        Tira da fila um job que ainda não começou (quem enfileirou desistiu de esperar).
+        Job já em sending não tem como ser retirado -> False.
+        """
+        cur = self.con.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (FAILED, reason, time.time(), job_id, QUEUED),
+        )
+        return cur.rowcount > 0
+
+    def pending(self) -> int:
+        return int(
+            self.con.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, SENDING)).fetchone()[0]
+        )
+
+    # ---------- daemon ----------
+    def claim(self) -> Optional[SendJob]:
+        """
+        Pega o próximo job (maior prioridade, depois o mais antigo) e marca como sending.
+        Jobs queued com prazo vencido saem antes como failed.
+        """
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            self.con.execute(
+                "UPDATE jobs SET status = ?, error = 'expirado: nenhum produtor esperando', finished_at = ? "
+                "WHERE status = ? AND expires_at IS NOT NULL AND expires_at < ?",
+                (FAILED, now, QUEUED, now),
+            )
+            row = self.con.execute(
+                "SELECT id, group_name, caption, image_url, itemid, source, attempts FROM jobs "
+                "WHERE status = ? ORDER BY priority DESC, id LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                self.con.execute("COMMIT")
+                return None
+            self.con.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (SENDING, time.time(), row[0]),
+            )
+            self.con.execute("COMMIT")
+        except BaseException:
+            self.con.execute("ROLLBACK")
+            raise
+        job = SendJob(*row)
+        job.attempts += 1
+        return job
+
+    def mark_sent(self, job_id: int, timer: Optional[PhaseTimer] = None) -> None:
+        phases = json.dumps({k: round(v, 1) for k, v in (timer.phases if timer else {}).items()})
+        self.con.execute(
+            "UPDATE jobs SET status = ?, error = '', phases = ?, finished_at = ? WHERE id = ?",
+            (SENT, phases, time.time(), job_id),
+        )
+
+    def mark_failed(self, job_id: int, error: str) -> None:
+        self.con.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (FAILED, error[:500], time.time(), job_id),
+        )
+
+    def mark_unconfirmed(self, job_id: int, error: str) -> None:
+        self.con.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (UNCONFIRMED, error[:500], time.time(), job_id),
+        )
+
+    def fail_stale(self) -> int:
+        """
+        Na subida do daemon: jobs que ficaram em sending (daemon anterior morreu no meio)
+        viram unconfirmed - podem ter saído, e o produtor já tratou o timeout dele.
+        """
+        cur = self.con.execute(
+            "UPDATE jobs SET status = ?, error = 'daemon interrompido durante o envio', finished_at = ? "
+            "WHERE status = ?",
+            (UNCONFIRMED, time.time(), SENDING),
+        )
+        return cur.rowcount
+
+    def heartbeat(self, state: str = "ok") -> None:
+        value = json.dumps({"ts": time.time(), "pid": os.getpid(), "state": state})
+        self.con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('daemon', ?)", (value,))
+
+    def daemon_info(self) -> Dict:
+        row = self.con.execute("SELECT value FROM meta WHERE key = 'daemon'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def daemon_alive(self, max_age_s: float = HEARTBEAT_MAX_AGE_S) -> bool:
+        info = self.daemon_info()
+        if not info or info.get("state") == "stopped":
+            return False
+        return time.time() - float(info.get("ts", 0)) <= max_age_s
+
+
+class QueueSender:
+    """Lado produtor: enfileira e espera o daemon enviar (mesma interface de retorno do envio direto)."""
+
+    def __init__(self, queue: SendQueue, source: str, timeout: float = 300.0):
+        self.queue = queue
+        self.source = source
+        self.timeout = timeout
+
+    def send(self, group_name: str, caption: str, image_url: str = "", itemid: str = "", priority: int = 0) -> PhaseTimer:
+        if not self.queue.daemon_alive():
+            raise RuntimeError(f"daemon de envio fora do ar (sem heartbeat em {self.queue.path})")
+        # o prazo do job é o mesmo da espera: depois dele o daemon descarta sozinho
+        job_id = self.queue.enqueue(group_name, caption, image_url, itemid, self.source, priority, ttl=self.timeout)
+        try:
+            st = self.queue.wait(job_id, self.timeout)
+        except TimeoutError:
+            # ainda na fila: cancela (seguro tentar de novo); já em envio: não dá para retirar
+            if self.queue.cancel(job_id, f"sem resposta do daemon em {self.timeout:.0f}s"):
+                raise
+            raise SendUnconfirmed(
+                "daemon", TimeoutError(f"job {job_id} ainda em envio após {self.timeout:.0f}s")
+            ) from None
+        if st["status"] == UNCONFIRMED:
+            raise SendUnconfirmed("daemon", RuntimeError(f"job {job_id}: {st['error']}"))
+        if st["status"] != SENT:
+            raise RuntimeError(f"job {job_id} falhou: {st['error']}")
+        timer = PhaseTimer()
+        timer.phases.update(st["phases"])
+        return timer
@@ -0,0 +1,183 @@
+# src/senders.py
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from src.whatsapp_web import (
+    CHAT_TIMEOUT_MS,
+    MEDIA_TIMEOUT_MS,
+    SEARCH_TIMEOUT_MS,
+    SEND_TIMEOUT_MS,
+    WHATSAPP_URL,
+    PhaseTimer,
+    open_whatsapp_and_group,
+    send_image_with_caption_via_clipboard,
+    send_image_with_caption_via_event,
+    send_text_only,
+)
+
+# formato da imagem que o backend quer receber (mesmos nomes de src/image_cache.DIB/JPG)
+PAYLOAD_DIB = "dib"
+PAYLOAD_JPG = "jpg"
+
+# como a imagem chega no composer
+PASTE_CLIPBOARD = "clipboard"  # clipboard do Windows + Ctrl+V (WhatsApp de verdade)
+PASTE_EVENT = "event"          # evento de paste sintético (qualquer SO, headless)
+
+
+class Sender:
+    """
+    Backend de envio. O scheduler só chama open(grupo), send(...) por item e close().
+
+    send() recebe a legenda e, se houver, a imagem já no formato `payload_kind`;
+    itemid/image_url/priority servem a backends que não recebem os bytes (fila do daemon).
+    Devolve o PhaseTimer do envio; falha -> exceção.
+    """
+
+    name = "base"
+    payload_kind = PAYLOAD_DIB
+
+    def open(self, group_name: str) -> None:
+        self.group_name = group_name
+
+    def send(
+        self,
+        caption: str,
+        image: Optional[bytes] = None,
+        *,
+        itemid: str = "",
+        image_url: str = "",
+        priority: int = 0,
+    ) -> PhaseTimer:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullSender(Sender):
+    """Não envia nada: guarda o que seria enviado (mede o custo do resto do scheduler)."""
+
+    name = "null"
+
+    def __init__(self):
+        self.sent: List[Dict] = []
+
+    def send(self, caption, image=None, *, itemid="", image_url="", priority=0) -> PhaseTimer:
+        self.sent.append({"itemid": itemid, "caption": caption, "image_bytes": len(image or b"")})
+        return PhaseTimer()
+
+
+class PlaywrightSender(Sender):
+    """
+    Chromium + página do WhatsApp Web (ou a página falsa de tools/fake_whatsapp_server.py,
+    que tem o mesmo DOM). Com profile_dir, contexto persistente (login salvo); sem ele,
+    contexto descartável.
+
+    paste=PASTE_CLIPBOARD usa o clipboard do Windows (DIB); PASTE_EVENT cola a imagem por
+    evento sintético (JPEG), o que roda headless no Linux.
+    """
+
+    name = "playwright"
+
+    def __init__(
+        self,
+        url: str = WHATSAPP_URL,
+        profile_dir: Optional[str] = None,
+        headless: bool = False,
+        paste: str = PASTE_CLIPBOARD,
+        search_timeout_ms: int = SEARCH_TIMEOUT_MS,
+        chat_timeout_ms: int = CHAT_TIMEOUT_MS,
+        media_timeout_ms: int = MEDIA_TIMEOUT_MS,
+        send_timeout_ms: int = SEND_TIMEOUT_MS,
+        wait_sent: bool = False,
+    ):
+        if paste not in (PASTE_CLIPBOARD, PASTE_EVENT):
+            raise ValueError(f"paste inválido: {paste!r}")
+        self.url = url
+        self.profile_dir = profile_dir
+        self.headless = headless
+        self.paste = paste
+        self.payload_kind = PAYLOAD_DIB if paste == PASTE_CLIPBOARD else PAYLOAD_JPG
+        self.search_timeout_ms = search_timeout_ms
+        self.chat_timeout_ms = chat_timeout_ms
+        self.media_timeout_ms = media_timeout_ms
+        self.send_timeout_ms = send_timeout_ms
+        self.wait_sent = wait_sent
+        self._pw = None
+        self._browser = None
+        self.context = None
+        self.page = None
+
+    def open(self, group_name: str) -> None:
+        from playwright.sync_api import sync_playwright
+
+        super().open(group_name)
+        self._pw = sync_playwright().start()
+        args = ["--disable-blink-features=AutomationControlled"]
+        if self.profile_dir:
+            self.context = self._pw.chromium.launch_persistent_context(
+                user_data_dir=self.profile_dir, headless=self.headless, args=args
+            )
+        else:
+            self._browser = self._pw.chromium.launch(headless=self.headless, args=args)
+            self.context = self._browser.new_context()
+        self.page = self.context.new_page()
+        open_whatsapp_and_group(
+            self.page, group_name, self.search_timeout_ms, self.chat_timeout_ms, url=self.url
+        )
+
+    def send(self, caption, image=None, *, itemid="", image_url="", priority=0) -> PhaseTimer:
+        if image is None:
+            return send_text_only(self.page, caption, self.send_timeout_ms, sent=self.wait_sent)
+        send_media = (
+            send_image_with_caption_via_clipboard if self.paste == PASTE_CLIPBOARD
+            else send_image_with_caption_via_event
+        )
+        return send_media(
+            self.page, image, caption, self.media_timeout_ms, self.send_timeout_ms, sent=self.wait_sent
+        )
+
+    def close(self) -> None:
+        for obj in (self.context, self._browser):
+            if obj is not None:
+                try:
+                    obj.close()
+                except Exception:
+                    pass
+        if self._pw is not None:
+            self._pw.stop()
+        self._pw = self._browser = self.context = self.page = None
+
+
+class DaemonSender(Sender):
+    """Enfileira no daemon de envio (step6_sender_daemon.py) e espera o resultado."""
+
+    name = "daemon"
+
+    def __init__(self, queue_file, timeout: float = 300.0, source: str = "scheduler"):
+        self.queue_file = queue_file
+        self.timeout = timeout
+        self.source = source
+        self.queue = None
+        self._sender = None
+
+    def open(self, group_name: str) -> None:
+        from src.send_queue import QueueSender, SendQueue
+
+        super().open(group_name)
+        self.queue = SendQueue(self.queue_file)
+        if not self.queue.daemon_alive():
+            raise RuntimeError(f"daemon de envio não está no ar ({self.queue_file}).")
+        self._sender = QueueSender(self.queue, source=self.source, timeout=self.timeout)
+
+    def send(self, caption, image=None, *, itemid="", image_url="", priority=0) -> PhaseTimer:
+        # o daemon lê a imagem do cache em disco (pela URL), não recebe os bytes
+        return self._sender.send(
+            self.group_name, caption, image_url if image is not None else "", itemid, priority=priority
+        )
+
+    def close(self) -> None:
+        if self.queue is not None:
+            self.queue.close()
+            self.queue = None
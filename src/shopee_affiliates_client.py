@@ -2,12 +2,20 @@ import os
 import time
 import json
 import hashlib
+import threading
 import requests
 from dotenv import load_dotenv
 
 
 class ShopeeAffiliatesClientError(Exception):
-    pass
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        # True: vale tentar de novo (limite de taxa, 5xx, timeout)
+        self.retryable = retryable
+
+
+# trechos de mensagem de erro da API que indicam limite de taxa
+_RATE_LIMIT_HINTS = ("rate limit", "too many", "frequency", "limit exceeded")
 
 
 class ShopeeAffiliatesClient:
@@ -35,7 +43,16 @@ class ShopeeAffiliatesClient:
                 "Config inválida: base_url/app_id/secret não podem estar vazios."
             )
 
-        self.session = requests.Session()
+        # uma Session por thread (requests.Session não é garantidamente thread-safe)
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        sess = getattr(self._local, "session", None)
+        if sess is None:
+            sess = requests.Session()
+            self._local.session = sess
+        return sess
 
     @staticmethod
     def from_env() -> "ShopeeAffiliatesClient":
@@ -93,19 +110,43 @@ class ShopeeAffiliatesClient:
             print("DEBUG SECRET_LEN:", len(self.secret))
             print("DEBUG PAYLOAD:", payload[:120] + ("..." if len(payload) > 120 else ""))
 
-        resp = self.session.post(
-            self.base_url,
-            headers=headers,
-            data=payload,
-            timeout=self.timeout_s,
-        )
+        try:
+            resp = self.session.post(
+                self.base_url,
+                headers=headers,
+                data=payload.encode("utf-8"),
+                timeout=self.timeout_s,
+            )
+        except requests.RequestException as e:
+            raise ShopeeAffiliatesClientError(f"Falha de rede: {e}", retryable=True) from e
 
         if resp.status_code != 200:
-            raise ShopeeAffiliatesClientError(f"HTTP {resp.status_code}: {resp.text}")
+            retryable = resp.status_code == 429 or resp.status_code >= 500
+            raise ShopeeAffiliatesClientError(f"HTTP {resp.status_code}: {resp.text}", retryable=retryable)
 
         data = resp.json()
 
         if "errors" in data and data["errors"]:
-            raise ShopeeAffiliatesClientError(f"GraphQL Error: {data['errors']}")
+            text = json.dumps(data["errors"], ensure_ascii=False).lower()
+            retryable = any(h in text for h in _RATE_LIMIT_HINTS)
+            raise ShopeeAffiliatesClientError(f"GraphQL Error: {data['errors']}", retryable=retryable)
 
         return data.get("data", {})
+
+    def generate_short_link(self, origin_url: str, sub_ids: list[str] | None = None) -> str:
+        """
+        Link curto de afiliado (mutation generateShortLink) para `origin_url`, com até
+        5 sub-ids de rastreio (canal, campanha...).
+        """
+        # strings via json.dumps: aspas/barras escapadas do mesmo jeito que o GraphQL espera
+        sub = ",".join(json.dumps(str(x), ensure_ascii=False) for x in (sub_ids or [])[:5])
+        query = (
+            "mutation{generateShortLink(input:{"
+            f"originUrl:{json.dumps(origin_url, ensure_ascii=False)},subIds:[{sub}]"
+            "}){shortLink}}"
+        )
+        data = self.execute(query)
+        short = ((data or {}).get("generateShortLink") or {}).get("shortLink") or ""
+        if not short:
+            raise ShopeeAffiliatesClientError(f"generateShortLink sem shortLink para: {origin_url}")
+        return short
@@ -0,0 +1,151 @@
+# src/short_links.py
+from __future__ import annotations
+
+import csv
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.rate_limit import RateLimiter
+from src.shopee_affiliates_client import ShopeeAffiliatesClient, ShopeeAffiliatesClientError
+
+
+_CACHE_COLS = ["origin_url", "sub_ids", "short_link", "created"]
+
+# a API aceita até 5 sub-ids alfanuméricos
+MAX_SUB_IDS = 5
+_SUB_ID_BAD = re.compile(r"[^0-9A-Za-z]")
+
+# falhas seguidas sem nenhum sucesso antes de desistir do lote
+_GIVE_UP_ERRORS = 10
+
+
+def clean_sub_ids(sub_ids: Iterable[str]) -> Tuple[str, ...]:
+    """Só letras/dígitos, sem vazios, no máximo 5 (o resto é descartado)."""
+    out = [_SUB_ID_BAD.sub("", str(s)) for s in sub_ids]
+    return tuple(s for s in out if s)[:MAX_SUB_IDS]
+
+
+class ShortLinkCache:
+    """
+    Links curtos já gerados, por (link original, sub-ids), em CSV só de acréscimo:
+    link visto em outro dia não custa chamada de API. Links curtos da Shopee não expiram.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self._links: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+        self._new: List[Tuple[str, Tuple[str, ...], str]] = []
+        self._lock = threading.Lock()
+        if path is not None and path.exists():
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    url, short = row.get("origin_url") or "", row.get("short_link") or ""
+                    if url and short:
+                        self._links[(url, tuple(filter(None, (row.get("sub_ids") or "").split("|"))))] = short
+
+    def __len__(self) -> int:
+        return len(self._links)
+
+    def get(self, url: str, sub_ids: Tuple[str, ...]) -> Optional[str]:
+        return self._links.get((url, sub_ids))
+
+    def put(self, url: str, sub_ids: Tuple[str, ...], short: str) -> None:
+        with self._lock:
+            if (url, sub_ids) not in self._links:
+                self._links[(url, sub_ids)] = short
+                self._new.append((url, sub_ids, short))
+
+    def save(self) -> None:
+        """Acrescenta só as entradas novas (arquivo nunca é reescrito inteiro)."""
+        if self.path is None or not self._new:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_header = not self.path.exists() or self.path.stat().st_size == 0
+        today = date.today().isoformat()
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            if write_header:
+                w.writerow(_CACHE_COLS)
+            for url, sub_ids, short in self._new:
+                w.writerow([url, "|".join(sub_ids), short, today])
+        self._new = []
+
+
+def generate_short_links(
+    client: ShopeeAffiliatesClient,
+    urls: Sequence[str],
+    sub_ids: Sequence[str],
+    cache: ShortLinkCache,
+    workers: int = 8,
+    rate_per_s: float = 5.0,
+    max_retries: int = 3,
+) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    Link curto para cada URL distinta (com os mesmos sub-ids), consultando o cache antes.
+    As que faltam vão para a API em paralelo (`workers` threads) sob um limite global de
+    `rate_per_s` chamadas/s; limite de taxa/5xx/timeout -> tenta de novo com espera crescente.
+
+    Retorna ({url: link curto}, contadores). URL que falhou fica de fora do dict.
+    """
+    subs = clean_sub_ids(sub_ids)
+    unique = list(dict.fromkeys(u for u in urls if u))
+    result: Dict[str, str] = {}
+    todo: List[str] = []
+    for u in unique:
+        hit = cache.get(u, subs)
+        if hit:
+            result[u] = hit
+        else:
+            todo.append(u)
+
+    stats = {"urls": len(unique), "cache": len(result), "api": 0, "retries": 0, "errors": 0}
+    if not todo:
+        return result, stats
+
+    limiter = RateLimiter(rate_per_s)
+    lock = threading.Lock()
+    first_error: List[str] = []
+    # só falhas e nenhum sucesso (credencial/assinatura errada): não adianta continuar
+    give_up = threading.Event()
+
+    def one(url: str) -> None:
+        if give_up.is_set():
+            with lock:
+                stats["errors"] += 1
+            return
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            try:
+                short = client.generate_short_link(url, list(subs))
+            except ShopeeAffiliatesClientError as e:
+                if e.retryable and attempt < max_retries:
+                    # todas as threads seguram um pouco: o limite é da conta, não da thread
+                    limiter.penalize(0.5 * (2 ** attempt))
+                    with lock:
+                        stats["retries"] += 1
+                    time.sleep(0.5 * (2 ** attempt))
+                    continue
+                with lock:
+                    stats["errors"] += 1
+                    if not first_error:
+                        first_error.append(str(e)[:200])
+                    if stats["errors"] >= _GIVE_UP_ERRORS and stats["api"] == 0:
+                        give_up.set()
+                return
+            cache.put(url, subs, short)
+            with lock:
+                result[url] = short
+                stats["api"] += 1
+            return
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        list(ex.map(one, todo))
+
+    if first_error:
+        print(f"WARN short links: {stats['errors']} falha(s); primeira: {first_error[0]}")
+    return result, stats
@@ -0,0 +1,113 @@
+# src/simulation.py
+from __future__ import annotations
+
+import csv
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.clock import VirtualClock
+from src.senders import Sender
+from src.whatsapp_web import PhaseTimer
+
+
+def parse_range(spec: str, default: Tuple[float, float]) -> Tuple[float, float]:
+    """"8-40" -> (8.0, 40.0); "20" -> (20.0, 20.0); vazio -> default."""
+    spec = (spec or "").strip()
+    if not spec:
+        return default
+    lo, _, hi = spec.partition("-")
+    lo_f = float(lo)
+    return lo_f, float(hi) if hi else lo_f
+
+
+def synthetic_picks(n: int) -> List[Dict]:
+    """Linhas no formato do CSV de picks, sem imagem (a simulação não baixa nada)."""
+    return [
+        {
+            "itemid": f"sim{i:04d}",
+            "title": f"Produto simulado {i}",
+            "sale_price": f"R$ {10 + i % 90},90",
+            "original_price": "",
+            "discount_pct": "",
+            "image_link": "",
+            "product_link": f"https://s.shopee.com.br/sim{i:04d}",
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+class FakeSender(Sender):
+    """
+    Envio simulado: gasta uma latência sorteada no relógio virtual e falha com
+    probabilidade fail_rate (a falha também gasta tempo: metade da latência).
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        clock: VirtualClock,
+        latency_s: Tuple[float, float] = (8.0, 40.0),
+        fail_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.clock = clock
+        self.latency_s = latency_s
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def send(self, caption, image=None, *, itemid="", image_url="", priority=0) -> PhaseTimer:
+        self.calls += 1
+        latency = self.rng.uniform(*self.latency_s)
+        if self.rng.random() < self.fail_rate:
+            self.clock.advance(latency / 2)
+            raise RuntimeError(f"falha simulada (item {itemid})")
+        self.clock.advance(latency)
+        timer = PhaseTimer()
+        timer.phases["simulado"] = latency * 1000
+        return timer
+
+
+class Timeline:
+    """Eventos da simulação (um por linha) + resumo do dia."""
+
+    FIELDS = ["ts", "event", "itemid", "seconds", "detail"]
+
+    def __init__(self):
+        self.events: List[Dict] = []
+
+    def add(self, ts: datetime, event: str, itemid: str = "", seconds: float = 0.0, detail: str = "") -> None:
+        self.events.append(
+            {"ts": ts.isoformat(timespec="seconds"), "event": event, "itemid": itemid,
+             "seconds": round(float(seconds), 1), "detail": detail}
+        )
+
+    def save_csv(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=self.FIELDS)
+            w.writeheader()
+            w.writerows(self.events)
+
+    def summary(self, target: int, window_end: datetime) -> List[str]:
+        sent = [e for e in self.events if e["event"] == "sent"]
+        counts = Counter(e["event"] for e in self.events)
+        lines = [f"envios: {len(sent)}/{target} | retry: {counts['retry']} | dead: {counts['dead']}"]
+        if sent:
+            times = [datetime.fromisoformat(e["ts"]) for e in sent]
+            gaps = [(b - a).total_seconds() / 60 for a, b in zip(times, times[1:])]
+            last_end = max(datetime.fromisoformat(e["ts"]) + timedelta(seconds=e["seconds"]) for e in sent)
+            slack = (window_end - last_end).total_seconds() / 60
+            lines.append(
+                f"primeiro {times[0]:%H:%M:%S} | último {times[-1]:%H:%M:%S} | "
+                f"folga até o fim da janela: {slack:.0f} min"
+            )
+            if gaps:
+                lines.append(f"intervalo: médio {sum(gaps) / len(gaps):.1f} min | min {min(gaps):.1f} | max {max(gaps):.1f}")
+            per_hour = Counter(t.hour for t in times)
+            lines.append("por hora: " + " ".join(f"{h:02d}h={per_hour[h]}" for h in sorted(per_hour)))
+        return lines
@@ -0,0 +1,146 @@
+# src/slot_planner.py
+from __future__ import annotations
+
+import bisect
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+# (início "HH:MM", fim "HH:MM", peso): peso 2 = o dobro de envios por hora nesse trecho
+Peak = Tuple[str, str, float]
+
+
+def parse_peaks(spec: str) -> List[Peak]:
+    """"12:00-14:00:2,19:00-22:30:3" -> [("12:00", "14:00", 2.0), ("19:00", "22:30", 3.0)]."""
+    peaks: List[Peak] = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        span, _, weight = part.rpartition(":")
+        start, _, end = span.partition("-")
+        try:
+            peaks.append((start.strip(), end.strip(), float(weight)))
+        except ValueError:
+            raise ValueError(f"pico inválido '{part}' (esperado HH:MM-HH:MM:peso)") from None
+    return peaks
+
+
+def _at(day: datetime, hhmm: str) -> datetime:
+    h, m = [int(x) for x in hhmm.split(":")]
+    return day.replace(hour=h, minute=m, second=0, microsecond=0)
+
+
+class SlotPlanner:
+    """
+    Distribui os envios do dia dentro da janela [start, end] para caber exatamente a meta.
+
+    O tempo é "esticado" pelos pesos dos picos (densidade constante por trecho); os slots
+    ficam igualmente espaçados nesse tempo ponderado, então num pico de peso 2 os envios
+    saem com metade do intervalo. O último envio precisa terminar até `end`: a janela útil
+    desconta a latência média de envio, medida a cada envio real (observe()).
+
+    Replaneja a cada chamada de next_slot() a partir do instante atual e do que falta,
+    então atraso/adiantamento de um envio se dilui nos intervalos seguintes.
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        end: datetime,
+        jitter_s: float = 0.0,
+        peaks: Optional[List[Peak]] = None,
+        latency_s: float = 20.0,
+        rng: Optional[random.Random] = None,
+        alpha: float = 0.3,
+    ):
+        if end <= start:
+            raise ValueError(f"janela vazia: {start:%H:%M} -> {end:%H:%M}")
+        self.start = start
+        self.end = end
+        self.jitter_s = max(0.0, float(jitter_s))
+        self.latency_s = max(0.0, float(latency_s))
+        self.alpha = alpha
+        self.rng = rng or random.Random()
+        self._build_segments(peaks or [])
+
+    def _build_segments(self, peaks: List[Peak]) -> None:
+        # trechos [a, b) com peso: picos recortados na janela; sobreposição -> vale o maior peso
+        cuts = {self.start, self.end}
+        spans = []
+        for p_start, p_end, w in peaks:
+            a = max(self.start, _at(self.start, p_start))
+            b = min(self.end, _at(self.start, p_end))
+            if b > a and w > 0:
+                spans.append((a, b, float(w)))
+                cuts.update((a, b))
+        points = sorted(cuts)
+        self._t: List[float] = []   # início de cada trecho (s desde start)
+        self._w: List[float] = []   # peso do trecho
+        self._cum: List[float] = [0.0]  # tempo ponderado acumulado no início de cada trecho
+        for a, b in zip(points, points[1:]):
+            w = max([s[2] for s in spans if s[0] <= a and b <= s[1]], default=1.0)
+            self._t.append((a - self.start).total_seconds())
+            self._w.append(w)
+            self._cum.append(self._cum[-1] + w * (b - a).total_seconds())
+        self._t.append((self.end - self.start).total_seconds())
+
+    # tempo real (s desde start) <-> tempo ponderado
+    def _weighted(self, sec: float) -> float:
+        sec = min(max(sec, 0.0), self._t[-1])
+        i = min(bisect.bisect_right(self._t, sec) - 1, len(self._w) - 1)
+        return self._cum[i] + self._w[i] * (sec - self._t[i])
+
+    def _real(self, x: float) -> float:
+        x = min(max(x, 0.0), self._cum[-1])
+        i = min(bisect.bisect_right(self._cum, x) - 1, len(self._w) - 1)
+        return self._t[i] + (x - self._cum[i]) / self._w[i]
+
+    def observe(self, latency_s: float) -> None:
+        """Latência medida de um envio real (média móvel exponencial)."""
+        self.latency_s = (1 - self.alpha) * self.latency_s + self.alpha * max(0.0, float(latency_s))
+
+    def plan(self, now: datetime, remaining: int, first: bool = False) -> List[datetime]:
+        """
+        Horários dos `remaining` envios que faltam, sem jitter.
+
+        first=True (nenhum envio ainda): o primeiro sai já no início (ou agora, se a janela
+        já começou) e os demais dividem o resto igualmente. Depois de um envio, o próximo
+        fica a um intervalo dele: é o que mantém o plano estável entre replanejamentos.
+        """
+        if remaining <= 0:
+            return []
+        t0 = max(0.0, (now - self.start).total_seconds())
+        usable_end = max(t0, self._t[-1] - self.latency_s)
+        x0, x1 = self._weighted(t0), self._weighted(usable_end)
+        if first:
+            xs = [x0 + (x1 - x0) * k / remaining for k in range(remaining)]
+        else:
+            xs = [x0 + (x1 - x0) * k / (remaining + 1) for k in range(1, remaining + 1)]
+        # mesmo com pesos, dois envios não se sobrepõem
+        out: List[datetime] = []
+        prev = None
+        for x in xs:
+            sec = self._real(x)
+            if prev is not None:
+                sec = max(sec, prev + self.latency_s)
+            prev = sec
+            out.append(self.start + timedelta(seconds=sec))
+        return out
+
+    def fits(self, now: datetime, remaining: int, first: bool = False) -> int:
+        """Quantos dos envios planejados terminam dentro da janela."""
+        return sum(1 for t in self.plan(now, remaining, first) if t + timedelta(seconds=self.latency_s) <= self.end)
+
+    def next_slot(self, now: datetime, remaining: int, first: bool = False) -> datetime:
+        """Próximo horário de envio (replanejado a partir de agora), com jitter ± jitter_s."""
+        plan = self.plan(now, remaining, first)
+        if not plan:
+            return now
+        slot = plan[0]
+        if self.jitter_s:
+            # jitter limitado a um terço do intervalo, para não embolar com o vizinho
+            gap = ((plan[1] - plan[0]).total_seconds() if len(plan) > 1 else (self.end - slot).total_seconds())
+            j = min(self.jitter_s, max(0.0, gap) / 3)
+            slot += timedelta(seconds=self.rng.uniform(-j, j))
+        return max(now, min(slot, self.end))
@@ -1,17 +1,24 @@
 import os
 import re
+import sys
 from datetime import datetime
+from pathlib import Path
+import numpy as np
 import pandas as pd
 
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.money import column_cents, cents_to_reais  # noqa: E402
+from src.catalog import ABA_BASE, CENTS_COL, load_base, save_sheets, type_base, parse_ids  # noqa: E402
+
 # ==========================
 # CONFIG
 # ==========================
 CSV_PICKS = os.getenv("PICKS_REFINADOS_CSV", "picks_refinados.csv")
-import os
 ARQUIVO_CONTROLE = os.getenv("CONTROLE_PRODUTOS_XLSX", "data/controle_produtos.xlsx")
 
-ABA_BASE = "produtos_base"
-
 MIN_AVALIACAO = 4.5
 
 # Quantos itens importar por execução (evita inflar a base sem controle)
@@ -24,14 +31,15 @@ MIN_POR_GERACAO = 5
 # ==========================
 # HELPERS
 # ==========================
-def to_float(x):
-    if pd.isna(x):
-        return None
-    try:
-        s = str(x).replace("R$", "").strip().replace(",", ".")
-        return float(s)
-    except Exception:
-        return None
+def add_preco(df: pd.DataFrame) -> pd.DataFrame:
+    """Preço (sale_price, senão price) numa passada só, em centavos e em reais; vazio -> NA."""
+    cents = column_cents(df, "sale_price").fillna(column_cents(df, "price"))
+    df["_preco_cents"] = cents
+    df["_preco"] = cents_to_reais(cents)
+    return df
+
+def to_preco(x):
+    return None if x is None or pd.isna(x) else float(x)
 
 def clean_title(title: str, max_len: int = 60) -> str:
     if title is None or (isinstance(title, float) and pd.isna(title)):
@@ -64,9 +72,7 @@ def decide_geracao(row) -> str:
     """
     Heurística inicial (pode ser refinada depois).
     """
-    price = to_float(row.get("sale_price"))
-    if price is None:
-        price = to_float(row.get("price")) or 0.0
+    price = to_preco(row.get("_preco")) or 0.0
 
     util = int(row.get("util_hits", 0) or 0)
     niche = int(row.get("niche_hits", 0) or 0)
@@ -149,14 +155,8 @@ def load_picks(csv_path: str) -> pd.DataFrame:
     return df
 
 def load_existing_base(xlsx_path: str) -> pd.DataFrame:
-    try:
-        df = pd.read_excel(xlsx_path, sheet_name=ABA_BASE)
-        return df
-    except Exception:
-        return pd.DataFrame(columns=[
-            "produto_id", "nome_curto", "link_afiliado", "preco_atual", "avaliacao",
-            "categoria", "geracao", "ultimo_envio", "status"
-        ])
+    # arquivo/aba ainda não existe -> base vazia (já com os dtypes do catálogo)
+    return load_base(xlsx_path, missing_ok=True)
 
 def merge_base(existing: pd.DataFrame, incoming: pd.DataFrame) -> pd.DataFrame:
     """
@@ -164,53 +164,33 @@ def merge_base(existing: pd.DataFrame, incoming: pd.DataFrame) -> pd.DataFrame:
     - Atualiza campos para ids já existentes.
     - Mantém ultimo_envio do existente.
     - Mantém status "pausado" se já estava pausado (prioriza bloqueio manual).
+    Casamento por produto_id inteiro (sem re-stringificar as duas bases).
     """
-    existing = existing.copy()
-    incoming = incoming.copy()
-
-    existing["produto_id"] = existing["produto_id"].astype(str).str.strip()
-    incoming["produto_id"] = incoming["produto_id"].astype(str).str.strip()
-
-    existing.set_index("produto_id", inplace=True, drop=False)
-    incoming.set_index("produto_id", inplace=True, drop=False)
-
-    for pid, row in incoming.iterrows():
-        if pid in existing.index:
-            last_send = existing.at[pid, "ultimo_envio"]
-            old_status = str(existing.at[pid, "status"]).strip().lower()
-            new_status = str(row["status"]).strip().lower()
-            final_status = "pausado" if old_status == "pausado" else new_status
-
-            existing.loc[pid, ["nome_curto", "link_afiliado", "preco_atual", "avaliacao",
-                               "categoria", "geracao", "status"]] = [
-                row["nome_curto"], row["link_afiliado"], row["preco_atual"], row["avaliacao"],
-                row["categoria"], row["geracao"], final_status
-            ]
-            existing.at[pid, "ultimo_envio"] = last_send
-        else:
-            existing.loc[pid] = row
-
-    existing.reset_index(drop=True, inplace=True)
-    return existing
+    upd_cols = ["nome_curto", "link_afiliado", CENTS_COL, "avaliacao", "categoria", "geracao", "status"]
 
-def save_base(xlsx_path: str, df_base: pd.DataFrame):
-    # regrava o arquivo inteiro mantendo outras abas se existirem
-    try:
-        xls = pd.ExcelFile(xlsx_path)
-        sheets = xls.sheet_names
-    except Exception:
-        sheets = []
+    # mesmo id repetido na entrada: vale o último
+    incoming = incoming[incoming["produto_id"].notna()].drop_duplicates("produto_id", keep="last")
 
-    with pd.ExcelWriter(xlsx_path, engine="openpyxl", mode="w") as writer:
-        df_base.to_excel(writer, sheet_name=ABA_BASE, index=False)
+    first = existing.drop_duplicates("produto_id")
+    pos_map = pd.Series(first.index.to_numpy(), index=first["produto_id"].to_numpy())
+    pos = pos_map.reindex(incoming["produto_id"].to_numpy()).to_numpy()
+    known = ~pd.isna(pos)
 
-        for s in sheets:
-            if s == ABA_BASE:
-                continue
-            try:
-                pd.read_excel(xlsx_path, sheet_name=s).to_excel(writer, sheet_name=s, index=False)
-            except Exception:
-                pass
+    # categorias de cada lado podem diferir: atualiza como objeto e re-tipa no fim
+    merged = existing.astype({c: object for c in upd_cols})
+    rows = pos[known].astype(np.int64)
+    upd = incoming[known]
+    old_paused = (merged.loc[rows, "status"] == "pausado").to_numpy()
+    for c in upd_cols:
+        merged.loc[rows, c] = upd[c].astype(object).to_numpy()
+    merged.loc[rows[old_paused], "status"] = "pausado"
+
+    merged = pd.concat([merged, incoming[~known]], ignore_index=True)
+    return type_base(merged)
+
+def save_base(xlsx_path: str, df_base: pd.DataFrame):
+    # regrava o arquivo inteiro mantendo outras abas se existirem
+    save_sheets(xlsx_path, {ABA_BASE: df_base})
 
 
 # ==========================
@@ -224,16 +204,17 @@ def main():
         df["score_num"] = pd.to_numeric(df["score"], errors="coerce").fillna(0.0)
         df = df.sort_values("score_num", ascending=False)
     df = df.head(MAX_ITENS).copy()
+    df = add_preco(df)
+
+    df["_pid"] = parse_ids(df["itemid"]).to_numpy()
 
     base_rows = []
     for _, r in df.iterrows():
-        pid = str(r.get("itemid", "")).strip()
-        if not pid or pid.lower() == "nan":
+        pid = r.get("_pid")
+        if pd.isna(pid):
             continue
 
-        preco = to_float(r.get("sale_price"))
-        if preco is None:
-            preco = to_float(r.get("price"))
+        preco_cents = r.get("_preco_cents")
 
         avaliacao = pd.to_numeric(r.get("item_rating"), errors="coerce")
         avaliacao = float(avaliacao) if pd.notna(avaliacao) else None
@@ -249,7 +230,7 @@ def main():
             "produto_id": pid,
             "nome_curto": clean_title(r.get("title", "")),
             "link_afiliado": pick_link(r),
-            "preco_atual": preco,
+            CENTS_COL: None if pd.isna(preco_cents) else int(preco_cents),
             "avaliacao": avaliacao,
             "categoria": build_categoria(r),
             "geracao": decide_geracao(r),
@@ -267,6 +248,7 @@ def main():
     # não salvar score_num no Excel
     if "score_num" in df_in.columns:
         df_in = df_in.drop(columns=["score_num"])
+    df_in = type_base(df_in)
 
     df_existing = load_existing_base(ARQUIVO_CONTROLE)
     df_merged = merge_base(df_existing, df_in)
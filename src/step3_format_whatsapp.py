@@ -1,17 +1,22 @@
 import os
 import random
+import sys
 from datetime import datetime
+from pathlib import Path
 import pandas as pd
 
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.money import format_brl  # noqa: E402
+from src.catalog import ABA_BASE, ABA_AGENDA, load_sheet  # noqa: E402
+
 # ==========================
 # CONFIG
 # ==========================
-import os
 ARQUIVO_CONTROLE = os.getenv("CONTROLE_PRODUTOS_XLSX", "data/controle_produtos.xlsx")
 
-ABA_BASE = "produtos_base"
-ABA_AGENDA = "agenda_dia"
-
 # Saída (arquivo do dia)
 HOJE_STR = datetime.now().date().isoformat()
 ARQUIVO_SAIDA = os.getenv("MENSAGENS_WHATSAPP_XLSX", f"mensagens_whatsapp_{HOJE_STR}.xlsx")
@@ -24,33 +29,19 @@ CTA_REACOES = [
 ]
 
 # Template principal (curto, direto, parecido com canais grandes)
-def formatar_preco(x):
-    if x is None or (isinstance(x, float) and pd.isna(x)) or pd.isna(x):
-        return ""
-    try:
-        v = float(x)
-        # Formato BR simples: 24,99
-        return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except Exception:
-        return str(x)
+def formatar_preco(cents):
+    # Formato BR: 1.234,56 (preço da base já vem em centavos)
+    return format_brl(cents)
 
 def safe_str(x):
     if x is None or (isinstance(x, float) and pd.isna(x)) or pd.isna(x):
         return ""
     return str(x).strip()
 
-def carregar_aba(path: str, sheet: str) -> pd.DataFrame:
-    return pd.read_excel(path, sheet_name=sheet)
-
-def validar_colunas(df: pd.DataFrame, required_cols: list, nome: str):
-    faltando = [c for c in required_cols if c not in df.columns]
-    if faltando:
-        raise ValueError(f"Colunas faltando em '{nome}': {faltando}")
-
 def montar_mensagem(prod: dict) -> str:
     nome = safe_str(prod.get("nome_curto"))
     link = safe_str(prod.get("link_afiliado"))
-    preco = formatar_preco(prod.get("preco_atual"))
+    preco = formatar_preco(prod.get("preco_cents"))
     avaliacao = prod.get("avaliacao")
     categoria = safe_str(prod.get("categoria"))
 
@@ -86,36 +77,27 @@ def montar_mensagem(prod: dict) -> str:
     return "\n".join(linhas).strip()
 
 def main():
-    # Carrega dados
-    df_base = carregar_aba(ARQUIVO_CONTROLE, ABA_BASE)
-    df_agenda = carregar_aba(ARQUIVO_CONTROLE, ABA_AGENDA)
-
-    # Valida colunas essenciais
-    validar_colunas(df_base, ["produto_id", "nome_curto", "link_afiliado", "preco_atual", "avaliacao", "categoria"], ABA_BASE)
-    validar_colunas(df_agenda, ["horario", "produto_id", "geracao", "valido"], ABA_AGENDA)
+    # Carrega dados (já tipados: produto_id inteiro, preço em centavos)
+    df_base = load_sheet(ARQUIVO_CONTROLE, ABA_BASE, required=["produto_id", "nome_curto", "link_afiliado", "preco_atual", "avaliacao", "categoria"])
+    df_agenda = load_sheet(ARQUIVO_CONTROLE, ABA_AGENDA, required=["horario", "produto_id", "geracao", "valido"])
 
     # Filtra apenas os itens do dia que devem ser postados
-    agenda_ok = df_agenda[df_agenda["valido"].astype(str).str.upper().str.strip() == "SIM"].copy()
+    agenda_ok = df_agenda[df_agenda["valido"] == "SIM"].copy()
     if agenda_ok.empty:
         print("⚠️ Nenhum item 'SIM' em agenda_dia. Nada para formatar.")
         return
 
-    # Normaliza IDs
-    df_base = df_base.copy()
-    df_base["produto_id"] = df_base["produto_id"].astype(str).str.strip()
-    agenda_ok["produto_id"] = agenda_ok["produto_id"].astype(str).str.strip()
-
-    # Index rápido por produto_id
-    base_idx = df_base.set_index("produto_id", drop=False)
+    # Index rápido por produto_id (inteiro: nada de re-stringificar)
+    base_idx = df_base[df_base["produto_id"].notna()].drop_duplicates("produto_id").set_index("produto_id", drop=False)
 
     # Monta mensagens
     saida = []
     for _, row in agenda_ok.iterrows():
-        pid = safe_str(row.get("produto_id"))
+        pid = row.get("produto_id")
         horario = safe_str(row.get("horario"))
         geracao = safe_str(row.get("geracao"))
 
-        if not pid:
+        if pd.isna(pid):
             continue
 
         if pid not in base_idx.index:
@@ -0,0 +1,166 @@
+# src/telemetry.py
+from __future__ import annotations
+
+import csv
+import json
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# fases de um envio, na ordem (ms):
+#   download/decode/encode/cache: imagem preparada pelo prefetch (em segundo plano)
+#   imagem: quanto o scheduler ficou parado esperando essa imagem ficar pronta
+#   clipboard/foco/colar/digitar/enviar/confirmar: no browser (src/whatsapp_web.PhaseTimer)
+PHASES = (
+    "download", "decode", "encode", "cache", "imagem",
+    "clipboard", "foco", "colar", "digitar", "enviar", "confirmar",
+)
+
+# eventos
+EV_SENT = "sent"
+EV_RETRY = "retry"   # tentativa falhou, item volta com backoff
+EV_DEAD = "dead"     # tentativa falhou e as tentativas acabaram
+EV_SKIP = "skip"     # imagem morta: item sai sem tentar enviar
+EV_UNCONFIRMED = "unconfirmed"  # falhou depois do Enter: pode ter saído, não é reenviado
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentil q (0-100) com interpolação linear; lista vazia -> 0."""
+    xs = sorted(values)
+    if not xs:
+        return 0.0
+    k = (len(xs) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+class SendTelemetry:
+    """
+    Eventos de envio do dia em JSONL (um objeto por linha, só append: reinícios no mesmo dia
+    vão somando no mesmo arquivo) + resumo do dia: p50/p95 de cada fase, envios x meta e
+    tempo perdido com tentativas que falharam.
+
+    path=None guarda só em memória (simulação/testes).
+    """
+
+    def __init__(self, path: Optional[Path], day: str):
+        self.path = Path(path) if path is not None else None
+        self.day = day
+        self.events: List[Dict] = []
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def record(
+        self,
+        ts: datetime,
+        event: str,
+        itemid: str = "",
+        seconds: float = 0.0,
+        phases: Optional[Dict[str, float]] = None,
+        error: str = "",
+        phase: str = "",
+    ) -> Dict:
+        """`seconds` = duração da tentativa; `phase` = fase em que a falha aconteceu (se se sabe)."""
+        ev = {
+            "ts": ts.isoformat(timespec="seconds"),
+            "day": self.day,
+            "event": event,
+            "itemid": itemid,
+            "seconds": round(float(seconds), 2),
+            "phases": {k: round(float(v), 1) for k, v in (phases or {}).items()},
+        }
+        if error:
+            ev["error"] = error[:300]
+        if phase:
+            ev["phase"] = phase
+        self.events.append(ev)
+        if self.path is not None:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+        return ev
+
+    def load(self) -> List[Dict]:
+        """Eventos do dia inteiro (todas as execuções); em memória, os desta execução."""
+        if self.path is None or not self.path.exists():
+            return list(self.events)
+        out: List[Dict] = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    continue  # linha cortada por queda do processo
+                if ev.get("day", self.day) == self.day:
+                    out.append(ev)
+        return out
+
+    def summary(self, target: int) -> Dict:
+        """Resumo plano (uma linha de CSV por dia): contagens, perdas e <fase>_p50/_p95 em ms."""
+        events = self.load()
+        counts = Counter(e["event"] for e in events)
+        sent = [e for e in events if e["event"] == EV_SENT]
+        failed = [e for e in events if e["event"] in (EV_RETRY, EV_DEAD)]
+        out: Dict = {
+            "day": self.day,
+            "target": int(target),
+            "sent": counts[EV_SENT],
+            "sent_pct": round(100 * counts[EV_SENT] / target, 1) if target else 0.0,
+            "retries": counts[EV_RETRY],
+            "dead": counts[EV_DEAD],
+            "skipped": counts[EV_SKIP],
+            "unconfirmed": counts[EV_UNCONFIRMED],
+            "lost_s": round(sum(e["seconds"] for e in failed), 1),
+            "send_s_p50": round(percentile([e["seconds"] for e in sent], 50), 2),
+            "send_s_p95": round(percentile([e["seconds"] for e in sent], 95), 2),
+        }
+        by_phase = Counter(e.get("phase") or "outro" for e in failed)
+        out["errors_by_phase"] = " ".join(f"{k}={v}" for k, v in by_phase.most_common())
+
+        seen = {k for e in sent for k in e["phases"]}
+        for ph in [p for p in PHASES if p in seen] + sorted(seen - set(PHASES)):
+            vals = [e["phases"][ph] for e in sent if ph in e["phases"]]
+            out[f"{ph}_p50"] = round(percentile(vals, 50), 1)
+            out[f"{ph}_p95"] = round(percentile(vals, 95), 1)
+        return out
+
+    @staticmethod
+    def lines(summary: Dict) -> List[str]:
+        """Resumo legível para o log."""
+        lines = [
+            f"envios: {summary['sent']}/{summary['target']} ({summary['sent_pct']:.0f}%) | "
+            f"retry: {summary['retries']} | dead: {summary['dead']} | sem confirmação: {summary['unconfirmed']} | "
+            f"imagem morta: {summary['skipped']} | "
+            f"perdido em falhas: {summary['lost_s'] / 60:.1f} min",
+            f"envio: p50 {summary['send_s_p50']:.1f}s | p95 {summary['send_s_p95']:.1f}s",
+        ]
+        phases = [k[:-4] for k in summary if k.endswith("_p50") and not k.startswith("send_s")]
+        if phases:
+            lines.append(
+                "fases (ms p50/p95): "
+                + " ".join(f"{ph}={summary[f'{ph}_p50']:.0f}/{summary[f'{ph}_p95']:.0f}" for ph in phases)
+            )
+        if summary["errors_by_phase"]:
+            lines.append(f"falhas por fase: {summary['errors_by_phase']}")
+        return lines
+
+    def save_daily(self, path: Path, summary: Dict) -> None:
+        """Grava/substitui a linha do dia no CSV de resumos (um dia por linha, fácil de plotar)."""
+        rows: List[Dict] = []
+        if path.exists():
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = [r for r in csv.DictReader(f) if r.get("day") != summary["day"]]
+        rows.append(summary)
+        rows.sort(key=lambda r: r["day"])
+        fields: List[str] = []
+        for r in [summary] + rows:
+            fields += [k for k in r if k not in fields]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=fields, restval="")
+            w.writeheader()
+            w.writerows(rows)
@@ -0,0 +1,66 @@
+# src/topk_pool.py
+from __future__ import annotations
+
+from typing import List, Optional
+
+import pandas as pd
+
+
+class TopKPool:
+    """
+    Guarda as K melhores linhas vistas até agora, em ordem de score (desc) e, no empate,
+    de posição global no feed (asc) — a mesma ordem do caminho em memória.
+
+    Os blocos recebidos ficam pendentes e o pool só é compactado quando passa de 2K linhas,
+    então a memória fica limitada em ~2K linhas. k=None -> sem limite (guarda tudo).
+    """
+
+    def __init__(self, k: Optional[int], score_col: str = "_score", order_col: str = "_row"):
+        self.k = k
+        self.score_col = score_col
+        self.order_col = order_col
+        self.seen = 0
+        self.truncated = False  # True se alguma linha já foi descartada
+        self._parts: List[pd.DataFrame] = []
+        self._pending = 0
+
+    def push(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        self.seen += len(df)
+        self._parts.append(df)
+        self._pending += len(df)
+        if self.k is not None and self._pending > 2 * self.k:
+            self._compact()
+
+    def merge(self, other: "TopKPool") -> None:
+        """Junta outro pool (ex.: de outro bloco/processo): top-K da união dos top-K."""
+        if other._parts:
+            part = other.frame()
+            self.push(part)
+            self.seen += other.seen - len(part)
+        self.truncated = self.truncated or other.truncated
+
+    def _compact(self) -> None:
+        df = self._sorted()
+        if self.k is not None and len(df) > self.k:
+            df = df.iloc[: self.k]
+            self.truncated = True
+        self._parts = [df]
+        self._pending = len(df)
+
+    def _sorted(self) -> pd.DataFrame:
+        df = self._parts[0] if len(self._parts) == 1 else pd.concat(self._parts, ignore_index=True)
+        return df.sort_values(
+            [self.score_col, self.order_col], ascending=[False, True], kind="mergesort"
+        ).reset_index(drop=True)
+
+    def frame(self) -> pd.DataFrame:
+        """Linhas do pool (no máximo K), já ordenadas."""
+        if not self._parts:
+            return pd.DataFrame()
+        self._compact()
+        return self._parts[0]
+
+    def __len__(self) -> int:
+        return min(self._pending, self.k) if self.k is not None else self._pending
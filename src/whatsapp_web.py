@@ -0,0 +1,399 @@
+# src/whatsapp_web.py
+from __future__ import annotations
+
+import base64
+import re
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from src.clipboard import set_clipboard_dib
+
+
+class ComposerTextError(RuntimeError):
+    """O campo de mensagem/legenda não ficou com o texto esperado."""
+
+
+# texto do elemento com foco (composer do chat ou campo de legenda da mídia)
+_ACTIVE_TEXT_JS = "() => { const el = document.activeElement; return el ? (el.innerText || el.textContent || '') : ''; }"
+
+# o WhatsApp desenha emoji como <img alt=...> e troca espaços/quebras: compara só letras/dígitos
+_NON_WORD = re.compile(r"\W+", re.UNICODE)
+
+
+def _text_key(s: str) -> str:
+    return _NON_WORD.sub("", s or "")
+
+
+def shift_enter(page) -> None:
+    page.keyboard.down("Shift")
+    page.keyboard.press("Enter")
+    page.keyboard.up("Shift")
+
+
+def composer_text(page) -> str:
+    try:
+        return page.evaluate(_ACTIVE_TEXT_JS) or ""
+    except Exception:
+        return ""
+
+
+def _clear_composer(page) -> None:
+    page.keyboard.press("Control+A")
+    page.keyboard.press("Backspace")
+
+
+def _insert_lines(page, lines) -> None:
+    # uma inserção por linha (evento "input" único, sem keydown por caractere: emoji
+    # com par substituto chega inteiro); quebra continua sendo Shift+Enter
+    for i, line in enumerate(lines):
+        if i:
+            shift_enter(page)
+        if line:
+            page.keyboard.insert_text(line)
+
+
+def _type_lines(page, lines, delay: int = 10) -> None:
+    for i, line in enumerate(lines):
+        if i:
+            shift_enter(page)
+        if line:
+            page.keyboard.type(line, delay=delay)
+
+
+def insert_multiline(page, text: str, verify: bool = True) -> float:
+    """
+    Escreve `text` no campo com foco, uma linha por vez com insert_text e Shift+Enter entre
+    elas (a mesma mensagem que a digitação tecla a tecla produzia, em milissegundos).
+
+    Com verify, confere o texto do campo depois; se não pegou, limpa e digita do jeito
+    antigo (keyboard.type); se ainda assim não pegar -> ComposerTextError.
+    Retorna os segundos gastos.
+    """
+    t0 = time.perf_counter()
+    lines = text.splitlines()
+    if not lines:
+        return 0.0
+
+    _insert_lines(page, lines)
+    if not verify or _text_key(composer_text(page)) == _text_key(text):
+        return time.perf_counter() - t0
+
+    print("[WARN] Composer não recebeu o texto inserido; digitando tecla a tecla.", flush=True)
+    _clear_composer(page)
+    _type_lines(page, lines)
+    got = composer_text(page)
+    if _text_key(got) != _text_key(text):
+        raise ComposerTextError(
+            f"texto no composer não confere (esperado {len(text)} chars, ficou {len(got)}: {got[:60]!r})"
+        )
+    return time.perf_counter() - t0
+
+
+# ==========================
+# Esperas por estado do DOM (no lugar de wait_for_timeout fixo)
+# ==========================
+SEARCH_TIMEOUT_MS = 10_000
+CHAT_TIMEOUT_MS = 30_000
+MEDIA_TIMEOUT_MS = 15_000
+SEND_TIMEOUT_MS = 20_000
+
+
+class PhaseTimeout(RuntimeError):
+    """O WhatsApp não chegou no estado esperado dentro do limite da fase."""
+
+    def __init__(self, phase: str, timeout_ms: int, cause: Optional[BaseException] = None):
+        self.phase = phase
+        self.timeout_ms = timeout_ms
+        detail = f" ({type(cause).__name__})" if cause is not None else ""
+        super().__init__(f"fase '{phase}' não concluiu em {timeout_ms} ms{detail}")
+
+
+class SendUnconfirmed(RuntimeError):
+    """
+    Falhou depois do Enter (fase enviar/confirmar): a mensagem pode ter saído. Não é para
+    reenviar - quem chama registra como enviado sem confirmação.
+    """
+
+    def __init__(self, phase: str, cause: Optional[BaseException] = None):
+        self.phase = phase
+        detail = f": {cause}" if cause is not None else ""
+        super().__init__(f"envio sem confirmação na fase '{phase}'{detail}")
+
+
+class PhaseTimer:
+    """
+    Latência medida de cada fase do envio (ms), na ordem em que aconteceram:
+    clipboard, foco, colar (até o editor de mídia abrir), digitar (legenda), enviar (Enter)
+    e confirmar (bolha com relógio/check).
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (time.perf_counter() - t0) * 1000
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.phases.values())
+
+    def summary(self) -> str:
+        return " ".join(f"{k}={v:.0f}ms" for k, v in self.phases.items())
+
+
+# resultado da busca com o nome exato do grupo
+_SEARCH_RESULT_JS = """(name) => [...document.querySelectorAll('#pane-side span[title]')].some(s => s.title === name)"""
+
+# conversa aberta: cabeçalho com o nome do grupo e composer no rodapé
+_CHAT_OPEN_JS = """(name) => {
+  const header = document.querySelector('#main header');
+  return !!header && header.innerText.includes(name) && !!document.querySelector("#main footer div[role='textbox']");
+}"""
+
+# mídia colada: o editor de mídia abre por cima da conversa e o foco vai para o campo de
+# legenda (contenteditable fora do rodapé da conversa)
+_MEDIA_READY_JS = """() => {
+  const el = document.activeElement;
+  if (!el || !el.isContentEditable) return false;
+  const footer = document.querySelector('#main footer');
+  return !(footer && footer.contains(el));
+}"""
+
+# data-id da última mensagem de saída visível ('' se nenhuma)
+_LAST_OUT_JS = """() => {
+  const out = document.querySelectorAll('#main div.message-out');
+  if (!out.length) return '';
+  const row = out[out.length - 1].closest('[data-id]');
+  return row ? row.getAttribute('data-id') : String(out.length);
+}"""
+
+_TICKS_PENDING = "span[data-icon='msg-time']"
+_TICKS_SENT = "span[data-icon='msg-check'], span[data-icon='msg-dblcheck'], span[data-icon='msg-dblcheck-ack']"
+
+# nova mensagem de saída (data-id diferente do último antes do Enter) com o relógio ou os checks
+_OUTGOING_JS = """([before, ticks]) => {
+  const out = document.querySelectorAll('#main div.message-out');
+  if (!out.length) return false;
+  const last = out[out.length - 1];
+  const row = last.closest('[data-id]');
+  const id = row ? row.getAttribute('data-id') : String(out.length);
+  return id !== before && !!last.querySelector(ticks);
+}"""
+
+
+def wait_dom(page, phase: str, js: str, arg=None, timeout_ms: int = SEND_TIMEOUT_MS) -> None:
+    try:
+        page.wait_for_function(js, arg=arg, timeout=timeout_ms)
+    except Exception as e:
+        raise PhaseTimeout(phase, timeout_ms, e) from e
+
+
+def wait_search_result(page, group_name: str, timeout_ms: int = SEARCH_TIMEOUT_MS) -> bool:
+    """Espera o grupo aparecer na busca. Não achou no prazo -> False (o Enter ainda pode acertar)."""
+    try:
+        wait_dom(page, "busca", _SEARCH_RESULT_JS, group_name, timeout_ms)
+        return True
+    except PhaseTimeout:
+        return False
+
+
+def wait_chat_open(page, group_name: str, timeout_ms: int = CHAT_TIMEOUT_MS) -> None:
+    wait_dom(page, "conversa", _CHAT_OPEN_JS, group_name, timeout_ms)
+
+
+def wait_media_attached(page, timeout_ms: int = MEDIA_TIMEOUT_MS) -> None:
+    """Depois do Ctrl+V: prévia da mídia aberta e campo de legenda com foco."""
+    wait_dom(page, "midia", _MEDIA_READY_JS, None, timeout_ms)
+
+
+def last_outgoing_id(page) -> str:
+    try:
+        return page.evaluate(_LAST_OUT_JS) or ""
+    except Exception:
+        return ""
+
+
+def wait_outgoing(page, before_id: str, timeout_ms: int = SEND_TIMEOUT_MS, sent: bool = False) -> None:
+    """
+    Depois do Enter: a bolha nova de saída aparece com o relógio (pendente) ou os checks.
+    Com sent=True só vale check (a mídia terminou de subir) - necessário antes de fechar o browser.
+    """
+    ticks = _TICKS_SENT if sent else f"{_TICKS_PENDING}, {_TICKS_SENT}"
+    wait_dom(page, "envio", _OUTGOING_JS, [before_id, ticks], timeout_ms)
+
+
+# ==========================
+# Operações na página (scheduler e daemon de envio)
+# ==========================
+WHATSAPP_URL = "https://web.whatsapp.com/"
+LOGIN_TIMEOUT_MS = 120_000
+
+
+def open_whatsapp_and_group(
+    page,
+    group_name: str,
+    search_timeout_ms: int = SEARCH_TIMEOUT_MS,
+    chat_timeout_ms: int = CHAT_TIMEOUT_MS,
+    load: bool = True,
+    url: str = WHATSAPP_URL,
+) -> None:
+    """
+    Abre o WhatsApp Web (load=False: a página já está carregada, só troca de conversa) e o
+    grupo. `url` aponta para outra página com o mesmo DOM (tools/fake_whatsapp_server.py).
+    """
+    if load:
+        page.goto(url, wait_until="domcontentloaded")
+        page.wait_for_selector("#pane-side, div[role='textbox']", timeout=LOGIN_TIMEOUT_MS)
+
+    for sel in [
+        "div[contenteditable='true'][data-tab='3']",
+        "div[role='textbox'][contenteditable='true']",
+        "#side div[contenteditable='true']",
+        "div[contenteditable='true']",
+    ]:
+        try:
+            loc = page.locator(sel).first
+            if loc.count() > 0:
+                loc.click(timeout=2500)
+                break
+        except Exception:
+            pass
+
+    if not load:
+        # busca anterior ainda no campo
+        _clear_composer(page)
+    page.keyboard.type(group_name, delay=25)
+    if not wait_search_result(page, group_name, search_timeout_ms):
+        print(f"[WARN] '{group_name}' não apareceu na busca em {search_timeout_ms} ms; tentando Enter.", flush=True)
+    page.keyboard.press("Enter")
+
+    wait_chat_open(page, group_name, chat_timeout_ms)
+
+
+def focus_footer_box(page) -> None:
+    try:
+        page.locator("footer div[role='textbox']").last.focus(timeout=2500)
+        return
+    except Exception:
+        pass
+
+    try:
+        page.locator("footer").first.click(timeout=2000, position={"x": 260, "y": 20})
+    except Exception:
+        pass
+
+
+# cola um arquivo de imagem no elemento com foco, como o Ctrl+V faria (sem clipboard do SO)
+_PASTE_FILE_JS = """([b64, mime]) => {
+  const bin = atob(b64);
+  const bytes = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  const dt = new DataTransfer();
+  dt.items.add(new File([bytes], 'imagem.jpg', { type: mime }));
+  const target = document.activeElement || document.body;
+  target.dispatchEvent(new ClipboardEvent('paste', { clipboardData: dt, bubbles: true, cancelable: true }));
+}"""
+
+
+def paste_image_event(page, image: bytes, mime: str = "image/jpeg") -> None:
+    """Evento de paste sintético com a imagem (JPEG): funciona fora do Windows e em headless."""
+    page.evaluate(_PASTE_FILE_JS, [base64.b64encode(image).decode("ascii"), mime])
+
+
+def _press_send(page, timer: PhaseTimer, before: str, send_timeout_ms: int, sent: bool) -> None:
+    # do Enter em diante qualquer falha vira SendUnconfirmed: a mensagem pode ter saído
+    try:
+        with timer.phase("enviar"):
+            page.keyboard.press("Enter")
+    except Exception as e:
+        raise SendUnconfirmed("enviar", e) from e
+    try:
+        with timer.phase("confirmar"):
+            wait_outgoing(page, before, send_timeout_ms, sent=sent)
+    except Exception as e:
+        raise SendUnconfirmed("confirmar", e) from e
+
+
+def _send_media(
+    page, paste, caption: str, media_timeout_ms: int, send_timeout_ms: int, sent: bool,
+    timer: Optional[PhaseTimer] = None,
+) -> PhaseTimer:
+    timer = timer or PhaseTimer()
+    before = last_outgoing_id(page)
+
+    with timer.phase("foco"):
+        focus_footer_box(page)
+    try:
+        with timer.phase("colar"):
+            paste()
+            wait_media_attached(page, media_timeout_ms)
+        with timer.phase("digitar"):
+            insert_multiline(page, caption)
+    except Exception:
+        # sem a prévia a legenda sairia como texto solto; com ela aberta, a retentativa
+        # colaria uma segunda imagem no mesmo editor: fecha o que tiver aberto e desiste
+        try:
+            page.keyboard.press("Escape")
+        except Exception:
+            pass
+        raise
+
+    _press_send(page, timer, before, send_timeout_ms, sent)
+    return timer
+
+
+def send_image_with_caption_via_clipboard(
+    page,
+    dib: bytes,
+    caption: str,
+    media_timeout_ms: int = MEDIA_TIMEOUT_MS,
+    send_timeout_ms: int = SEND_TIMEOUT_MS,
+    sent: bool = False,
+) -> PhaseTimer:
+    timer = PhaseTimer()
+    with timer.phase("clipboard"):
+        set_clipboard_dib(dib)
+    return _send_media(
+        page, lambda: page.keyboard.press("Control+V"), caption, media_timeout_ms, send_timeout_ms, sent, timer
+    )
+
+
+def send_image_with_caption_via_event(
+    page,
+    jpg: bytes,
+    caption: str,
+    media_timeout_ms: int = MEDIA_TIMEOUT_MS,
+    send_timeout_ms: int = SEND_TIMEOUT_MS,
+    sent: bool = False,
+) -> PhaseTimer:
+    return _send_media(page, lambda: paste_image_event(page, jpg), caption, media_timeout_ms, send_timeout_ms, sent)
+
+
+def send_text_only(page, caption: str, send_timeout_ms: int = SEND_TIMEOUT_MS, sent: bool = False) -> PhaseTimer:
+    timer = PhaseTimer()
+    before = last_outgoing_id(page)
+    with timer.phase("foco"):
+        focus_footer_box(page)
+    with timer.phase("digitar"):
+        insert_multiline(page, caption)
+    _press_send(page, timer, before, send_timeout_ms, sent)
+    return timer
+
+
+def page_alive(page, timeout_ms: int = 5000) -> bool:
+    """Health check: aba aberta, respondendo JS e com a conversa (composer) na tela."""
+    try:
+        if page.is_closed():
+            return False
+        page.wait_for_function(
+            "() => !!document.querySelector(\"#main footer div[role='textbox']\")", timeout=timeout_ms
+        )
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,122 @@
+# tools/fake_affiliate_server.py
+"""
+Servidor local que imita a API GraphQL de afiliados da Shopee (só generateShortLink),
+para rodar o Step3 sem credenciais reais nem gastar cota.
+
+Uso:
+  python tools/fake_affiliate_server.py --port 8765 --rate 5 --latency-ms 120
+
+  SHOPEE_AFF_BASE_URL=http://127.0.0.1:8765/graphql
+  SHOPEE_AFF_APP_ID=teste
+  SHOPEE_AFF_SECRET=segredo
+  python pipeline/step3_generate_short_links.py
+
+Confere a assinatura (SHA256(AppId + Timestamp + Payload + Secret)), responde um link
+curto determinístico por (originUrl, subIds) e, acima de --rate req/s, devolve o erro de
+limite de taxa — igual à API de verdade, com HTTP 200 e "errors" no corpo.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ORIGIN = re.compile(r'originUrl\s*:\s*("(?:[^"\\]|\\.)*")')
+_SUBS = re.compile(r"subIds\s*:\s*\[([^\]]*)\]")
+_AUTH = re.compile(r"Credential=([^,]+),\s*Signature=([0-9a-f]+),\s*Timestamp=(\d+)")
+
+
+class _State:
+    def __init__(self, app_id: str, secret: str, rate: float, latency_s: float):
+        self.app_id = app_id
+        self.secret = secret
+        self.rate = rate
+        self.latency_s = latency_s
+        self.lock = threading.Lock()
+        self.window: list = []
+        self.calls = 0
+        self.limited = 0
+
+
+def _short_link(url: str, subs: list) -> str:
+    h = hashlib.sha1(f"{url}|{'|'.join(subs)}".encode("utf-8")).hexdigest()[:10]
+    return f"https://s.shopee.com.br/{h}"
+
+
+def make_handler(state: _State):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):  # silencioso
+            pass
+
+        def _reply(self, code: int, body: dict) -> None:
+            raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_POST(self):
+            payload = self.rfile.read(int(self.headers.get("Content-Length", "0"))).decode("utf-8")
+
+            m = _AUTH.search(self.headers.get("Authorization", ""))
+            if not m or m.group(1) != state.app_id:
+                return self._reply(401, {"errors": [{"message": "Invalid Credential"}]})
+            expected = hashlib.sha256(f"{state.app_id}{m.group(3)}{payload}{state.secret}".encode("utf-8")).hexdigest()
+            if m.group(2) != expected:
+                return self._reply(200, {"errors": [{"message": "Invalid Signature", "extensions": {"code": 10020}}]})
+
+            now = time.monotonic()
+            with state.lock:
+                state.window = [t for t in state.window if now - t < 1.0]
+                if state.rate > 0 and len(state.window) >= state.rate:
+                    state.limited += 1
+                    return self._reply(
+                        200, {"errors": [{"message": "Rate limit exceeded", "extensions": {"code": 10030}}]}
+                    )
+                state.window.append(now)
+                state.calls += 1
+
+            if state.latency_s > 0:
+                time.sleep(state.latency_s)
+
+            query = json.loads(payload).get("query", "")
+            origin = _ORIGIN.search(query)
+            if "generateShortLink" not in query or not origin:
+                return self._reply(200, {"errors": [{"message": "only generateShortLink is supported"}]})
+            url = json.loads(origin.group(1))
+            subs_m = _SUBS.search(query)
+            subs = json.loads(f"[{subs_m.group(1)}]") if subs_m else []
+            self._reply(200, {"data": {"generateShortLink": {"shortLink": _short_link(url, subs)}}})
+
+    return Handler
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--app-id", default="teste")
+    ap.add_argument("--secret", default="segredo")
+    ap.add_argument("--rate", type=float, default=5.0, help="req/s aceitas (0 = sem limite)")
+    ap.add_argument("--latency-ms", type=float, default=120.0)
+    args = ap.parse_args()
+
+    state = _State(args.app_id, args.secret, args.rate, args.latency_ms / 1000.0)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"fake affiliate API em http://{args.host}:{args.port}/graphql (rate={args.rate}/s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"chamadas={state.calls} | limitadas={state.limited}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
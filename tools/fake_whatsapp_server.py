@@ -0,0 +1,298 @@
+# tools/fake_whatsapp_server.py
+"""
+Servidor local com uma página que imita o WhatsApp Web no que o envio usa (busca de
+grupo, conversa, composer, editor de mídia com legenda e os ticks da bolha de saída),
+para rodar o envio headless no Linux/CI sem conta nem risco de banimento.
+
+Uso:
+  python tools/fake_whatsapp_server.py --port 8790 --groups "Ofertas Shopee" --tick-ms 300
+
+  WA_WHATSAPP_URL=http://127.0.0.1:8790/
+  WA_PASTE_MODE=event
+  WA_GROUP_NAME="Ofertas Shopee"
+  python pipeline/step6_scheduler_daily.py
+
+Mesmos seletores do WhatsApp Web que src/whatsapp_web.py espera:
+  - busca: #side div[contenteditable][data-tab='3'] + lista #pane-side span[title]
+  - conversa: #main header (nome) + #main footer div[role='textbox']
+  - paste com arquivo (Ctrl+V ou evento sintético) abre o editor de mídia depois de
+    --preview-ms, com o foco no campo de legenda; com probabilidade --paste-fail o paste
+    é ignorado (o envio tem que detectar pelo timeout da fase "midia")
+  - Enter envia; Shift+Enter quebra linha; Escape fecha o editor
+  - bolha: [data-id] > div.message-out com span[data-icon] msg-time -> msg-check ->
+    msg-dblcheck (a cada --tick-ms)
+
+Cada envio vai para window.__sent na página e para GET /api/sent no servidor (legenda
+exatamente como ficou no campo, tipo, bytes da imagem).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_PAGE = """<!doctype html>
+<html lang="pt-br">
+<head>
+<meta charset="utf-8">
+<title>WhatsApp (fake)</title>
+<style>
+  body { margin: 0; font-family: sans-serif; display: flex; height: 100vh; }
+  #side { width: 300px; border-right: 1px solid #ccc; display: flex; flex-direction: column; }
+  #side [data-tab='3'] { border: 1px solid #999; margin: 8px; padding: 6px; min-height: 18px; }
+  #pane-side div.chat { padding: 10px; cursor: pointer; border-bottom: 1px solid #eee; }
+  #main { flex: 1; display: flex; flex-direction: column; }
+  #main header { padding: 10px; background: #eee; }
+  #messages { flex: 1; overflow-y: auto; padding: 10px; }
+  div.message-out { background: #dcf8c6; margin: 4px 0 4px auto; padding: 6px; max-width: 60%; white-space: pre-wrap; }
+  #main footer div[role='textbox'] { border: 1px solid #999; margin: 8px; padding: 6px; min-height: 18px; }
+  #media-editor { position: fixed; inset: 0; background: rgba(0,0,0,.7); display: flex;
+                  flex-direction: column; align-items: center; justify-content: center; }
+  #media-editor img { max-width: 60%; max-height: 60%; }
+  #media-editor div[contenteditable] { background: #fff; width: 50%; margin-top: 10px; padding: 6px; min-height: 18px; }
+</style>
+</head>
+<body>
+<div id="side">
+  <div contenteditable="true" role="textbox" data-tab="3" title="Pesquisar"></div>
+  <div id="pane-side"></div>
+</div>
+<div id="main-wrap" style="flex:1; display:flex"></div>
+<script>
+const CFG = __CONFIG__;
+const qs = new URLSearchParams(location.search);
+const groups = (qs.get('groups') || CFG.groups).split(',').map(s => s.trim()).filter(Boolean);
+const previewMs = Number(qs.get('preview_ms') || CFG.preview_ms);
+const tickMs = Number(qs.get('tick_ms') || CFG.tick_ms);
+const pasteFail = Number(qs.get('paste_fail') || CFG.paste_fail);
+
+window.__sent = [];
+window.__stats = { pastes: 0, pastes_dropped: 0, sent: 0 };
+let seq = 0;
+let pending = null;  // imagem colada aguardando legenda
+
+const search = document.querySelector("#side [data-tab='3']");
+const pane = document.getElementById('pane-side');
+
+function renderList(filter) {
+  pane.innerHTML = '';
+  for (const g of groups) {
+    if (filter && !g.toLowerCase().includes(filter.toLowerCase())) continue;
+    const row = document.createElement('div');
+    row.className = 'chat';
+    const span = document.createElement('span');
+    span.title = g;
+    span.textContent = g;
+    row.appendChild(span);
+    row.onclick = () => openChat(g);
+    pane.appendChild(row);
+  }
+}
+
+function openChat(name) {
+  const wrap = document.getElementById('main-wrap');
+  wrap.innerHTML = '';
+  const main = document.createElement('div');
+  main.id = 'main';
+  const header = document.createElement('header');
+  header.textContent = name;
+  const msgs = document.createElement('div');
+  msgs.id = 'messages';
+  const footer = document.createElement('footer');
+  const box = document.createElement('div');
+  box.contentEditable = 'true';
+  box.setAttribute('role', 'textbox');
+  box.setAttribute('data-tab', '10');
+  footer.appendChild(box);
+  main.append(header, msgs, footer);
+  wrap.appendChild(main);
+  box.addEventListener('keydown', e => {
+    if (e.key === 'Enter' && !e.shiftKey) {
+      e.preventDefault();
+      const text = box.innerText.trim();
+      if (text) addOutgoing('text', text, 0);
+      box.innerHTML = '';
+    }
+  });
+  box.focus();
+}
+
+function addOutgoing(kind, caption, imageBytes, imageUrl) {
+  const id = 'true_fake_' + (++seq);
+  const row = document.createElement('div');
+  row.setAttribute('data-id', id);
+  const bubble = document.createElement('div');
+  bubble.className = 'message-out';
+  if (imageUrl) {
+    const img = document.createElement('img');
+    img.src = imageUrl;
+    img.style.maxWidth = '240px';
+    bubble.appendChild(img);
+    bubble.appendChild(document.createElement('br'));
+  }
+  const text = document.createElement('span');
+  text.className = 'selectable-text';
+  text.textContent = caption;
+  const tick = document.createElement('span');
+  tick.setAttribute('data-icon', 'msg-time');
+  bubble.append(text, tick);
+  row.appendChild(bubble);
+  document.getElementById('messages').appendChild(row);
+
+  const rec = { id, kind, caption, image_bytes: imageBytes, t: Date.now() };
+  window.__sent.push(rec);
+  window.__stats.sent++;
+  setTimeout(() => {
+    tick.setAttribute('data-icon', 'msg-check');
+    fetch('/api/sent', { method: 'POST', body: JSON.stringify(rec) }).catch(() => {});
+    setTimeout(() => tick.setAttribute('data-icon', 'msg-dblcheck'), tickMs);
+  }, tickMs);
+}
+
+function openEditor(file) {
+  const url = URL.createObjectURL(file);
+  const ed = document.createElement('div');
+  ed.id = 'media-editor';
+  const img = document.createElement('img');
+  img.src = url;
+  const cap = document.createElement('div');
+  cap.contentEditable = 'true';
+  cap.setAttribute('role', 'textbox');
+  cap.setAttribute('aria-label', 'Adicionar legenda');
+  ed.append(img, cap);
+  document.body.appendChild(ed);
+  pending = { file, url, ed };
+  cap.addEventListener('keydown', e => {
+    if (e.key === 'Enter' && !e.shiftKey) {
+      e.preventDefault();
+      const caption = cap.innerText.trim();
+      closeEditor();
+      addOutgoing('media', caption, file.size, url);
+    }
+  });
+  cap.focus();
+}
+
+function closeEditor() {
+  if (!pending) return;
+  pending.ed.remove();
+  pending = null;
+  const box = document.querySelector("#main footer div[role='textbox']");
+  if (box) box.focus();
+}
+
+search.addEventListener('input', () => renderList(search.innerText.trim()));
+search.addEventListener('keydown', e => {
+  if (e.key === 'Enter') {
+    e.preventDefault();
+    const first = pane.querySelector('span[title]');
+    if (first) openChat(first.title);
+  }
+});
+
+document.addEventListener('paste', e => {
+  const files = e.clipboardData ? [...e.clipboardData.files] : [];
+  const file = files.find(f => f.type.startsWith('image/'));
+  if (!file || !document.getElementById('main') || pending) return;
+  e.preventDefault();
+  window.__stats.pastes++;
+  if (Math.random() < pasteFail) { window.__stats.pastes_dropped++; return; }
+  setTimeout(() => openEditor(file), previewMs);
+});
+
+document.addEventListener('keydown', e => {
+  if (e.key === 'Escape') closeEditor();
+});
+
+renderList('');
+</script>
+</body>
+</html>
+"""
+
+
+class _State:
+    def __init__(self, groups: str, preview_ms: int, tick_ms: int, paste_fail: float):
+        self.config = {"groups": groups, "preview_ms": preview_ms, "tick_ms": tick_ms, "paste_fail": paste_fail}
+        self.lock = threading.Lock()
+        self.sent: list = []
+
+
+def make_handler(state: _State):
+    page = _PAGE.replace("__CONFIG__", json.dumps(state.config, ensure_ascii=False)).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):  # silencioso
+            pass
+
+        def _reply(self, code: int, body: bytes, ctype: str) -> None:
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/api/sent":
+                with state.lock:
+                    sent = list(state.sent)
+                if parse_qs(url.query).get("clear"):
+                    with state.lock:
+                        state.sent.clear()
+                return self._reply(200, json.dumps(sent, ensure_ascii=False).encode("utf-8"), "application/json")
+            if url.path in ("/", "/index.html"):
+                return self._reply(200, page, "text/html; charset=utf-8")
+            self._reply(404, b"not found", "text/plain")
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/api/sent":
+                return self._reply(404, b"not found", "text/plain")
+            raw = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+            try:
+                rec = json.loads(raw.decode("utf-8"))
+            except ValueError:
+                return self._reply(400, b"json invalido", "text/plain")
+            with state.lock:
+                state.sent.append(rec)
+            self._reply(204, b"", "text/plain")
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8790, groups: str = "Ofertas Shopee",
+          preview_ms: int = 150, tick_ms: int = 300, paste_fail: float = 0.0):
+    """Sobe o servidor numa thread (para benchmarks). Retorna (server, state); server.shutdown() para."""
+    state = _State(groups, preview_ms, tick_ms, paste_fail)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    threading.Thread(target=server.serve_forever, name="fake-wa", daemon=True).start()
+    return server, state
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8790)
+    ap.add_argument("--groups", default="Ofertas Shopee", help="grupos na lista, separados por vírgula")
+    ap.add_argument("--preview-ms", type=int, default=150, help="atraso até o editor de mídia abrir")
+    ap.add_argument("--tick-ms", type=int, default=300, help="relógio -> check -> check duplo")
+    ap.add_argument("--paste-fail", type=float, default=0.0, help="probabilidade de o paste ser ignorado")
+    args = ap.parse_args()
+
+    state = _State(args.groups, args.preview_ms, args.tick_ms, args.paste_fail)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"fake WhatsApp Web em http://{args.host}:{args.port}/ (grupos: {args.groups})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"envios={len(state.sent)}", flush=True)
+
+
+if __name__ == "__main__":
+    main()